@@ -0,0 +1,168 @@
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from urllib.parse import quote, unquote
+
+from wiki_race_challenge import SearchStats, find_path
+
+## -- Benchmark of the find_path search modes -- ##
+
+
+def load_graph(path: str) -> Dict[str, List[str]]:
+    """Loads a recorded link graph.
+
+    Args:
+        path (str):
+            json file with the titles each article links to,
+            on the form {"title": ["linked title", ...], ...}
+    Returns:
+        graph (dict):
+            the links of every article
+    """
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def graph_fetchers(
+    graph: Dict[str, List[str]],
+    base_url: str = "https://en.wikipedia.org",
+    delay: float = 0.0,
+) -> Tuple[Callable[[str], Set[str]], Callable[[str], Set[str]]]:
+    """Makes `get_links` and `get_backlinks` functions reading a local graph.
+
+    Args:
+        graph (dict):
+            the titles each article links to
+        base_url (str, optional):
+            wiki the article URLs are on
+        delay (float, optional):
+            seconds to sleep per call, to stand in for the network round trip
+    Returns:
+        get_links, get_backlinks (tuple):
+            functions to pass to `find_path`
+    """
+
+    backlinks = {}
+    for title, links in graph.items():
+        for link in links:
+            backlinks.setdefault(link, set()).add(title)
+
+    def url(title):
+        return f"{base_url}/wiki/{quote(title)}"
+
+    def title(url):
+        return unquote(url.split("/wiki/", 1)[1])
+
+    def get_links(article: str) -> Set[str]:
+        time.sleep(delay)
+        return {url(link) for link in graph.get(title(article), [])}
+
+    def get_backlinks(article: str) -> Set[str]:
+        time.sleep(delay)
+        return {url(link) for link in backlinks.get(title(article), [])}
+
+    return get_links, get_backlinks
+
+
+def benchmark(
+    pairs: Iterable[Tuple[str, str]],
+    get_links: Callable[[str], Iterable[str]],
+    get_backlinks: Callable[[str], Iterable[str]],
+    modes: Iterable[str] = ("bfs", "bidirectional", "best_first"),
+    **kwargs,
+) -> List[Dict]:
+    """Runs `find_path` with each search mode on every start/finish pair.
+
+    Args:
+        pairs (iterable):
+            (start, finish) article URLs
+        get_links, get_backlinks (callable):
+            passed on to `find_path`
+        modes (iterable of str, optional):
+            search modes to compare
+        **kwargs:
+            passed on to `find_path`
+    Returns:
+        results (list of dicts):
+            one per pair and mode, with the keys start, finish, mode,
+            length (None if no path was found), pages_fetched and seconds
+    """
+
+    results = []
+
+    for start, finish in pairs:
+        for mode in modes:
+            stats = SearchStats()
+            try:
+                path = find_path(
+                    start,
+                    finish,
+                    get_links=get_links,
+                    get_backlinks=get_backlinks,
+                    mode=mode,
+                    stats=stats,
+                    **kwargs,
+                )
+            except ValueError:
+                path = None
+
+            results.append(
+                {
+                    "start": start,
+                    "finish": finish,
+                    "mode": mode,
+                    "length": None if path is None else len(path),
+                    "pages_fetched": stats.pages_fetched,
+                    "seconds": stats.seconds,
+                }
+            )
+
+    return results
+
+
+def summarize(results: List[Dict]) -> str:
+    """Renders the total pages fetched and time of each mode as markdown.
+
+    Args:
+        results (list of dicts):
+            results from `benchmark`
+    Returns:
+        markdown (str):
+            table with a row per mode
+    """
+
+    import pandas as pd
+
+    df = pd.DataFrame(results)
+    summary = df.groupby("mode", sort=False).agg(
+        pairs=("start", "size"),
+        found=("length", "count"),
+        mean_length=("length", "mean"),
+        pages_fetched=("pages_fetched", "sum"),
+        seconds=("seconds", "sum"),
+        p95_seconds=("seconds", lambda s: s.quantile(0.95)),
+    )
+
+    return summary.to_markdown(tablefmt="grid")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the search modes of find_path")
+    parser.add_argument("graph", help="recorded graph, see load_graph")
+    parser.add_argument("pairs", help="file with a start and finish title per line, tab separated")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds per fetch")
+    parser.add_argument("--modes", nargs="+", default=["bfs", "bidirectional", "best_first"])
+    args = parser.parse_args()
+
+    get_links, get_backlinks = graph_fetchers(load_graph(args.graph), delay=args.delay)
+    with open(args.pairs) as f:
+        pairs = [
+            tuple(f"https://en.wikipedia.org/wiki/{quote(title)}" for title in line.split("\t"))
+            for line in f.read().splitlines()
+            if line
+        ]
+
+    print(summarize(benchmark(pairs, get_links, get_backlinks, modes=args.modes)))
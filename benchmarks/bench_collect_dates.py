@@ -0,0 +1,14 @@
+import pytest
+from collect_dates import find_dates
+
+
+@pytest.mark.parametrize("scale", [1, 10])
+def test_find_dates(measure, pages, scale):
+    html = pages["article"] * scale
+    measure(find_dates, html, size=len(html))
+
+
+@pytest.mark.parametrize("scale", [1, 10])
+def test_find_dates_bytes(measure, pages, scale):
+    html = pages["article"].encode("utf-8") * scale
+    measure(find_dates, html, size=len(html))
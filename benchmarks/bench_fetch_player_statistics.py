@@ -0,0 +1,17 @@
+import pytest
+from fetch_player_statistics import get_player_stats, get_players, get_teams
+from pages import team, urls
+
+
+def test_get_teams(measure, offline, pages):
+    measure(get_teams, urls["playoffs"], size=len(pages["playoffs"]))
+
+
+def test_get_players(measure, offline, pages):
+    measure(get_players, urls["team"], size=len(pages["team"]))
+
+
+@pytest.mark.parametrize("fast", [True, False], ids=["fast", "full"])
+def test_get_player_stats(measure, offline, pages, fast):
+    stats = measure(get_player_stats, urls["player"], team, fast, size=len(pages["player"]))
+    assert stats
@@ -0,0 +1,16 @@
+import pytest
+from filter_urls import find_articles, find_img_src, find_urls
+
+
+@pytest.mark.parametrize("scale", [1, 10])
+@pytest.mark.parametrize("func", [find_urls, find_articles, find_img_src])
+def test_filter_urls(measure, pages, func, scale):
+    html = pages["article"] * scale
+    measure(func, html, size=len(html))
+
+
+@pytest.mark.parametrize("scale", [1, 10])
+@pytest.mark.parametrize("func", [find_urls, find_articles, find_img_src])
+def test_filter_urls_bytes(measure, pages, func, scale):
+    html = pages["article"].encode("utf-8") * scale
+    measure(func, html, size=len(html))
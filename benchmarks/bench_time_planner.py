@@ -0,0 +1,45 @@
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+from pages import made_up_calendar
+from time_planner import TableEntry, expand_row_col_span, extract_events, render_schedule
+
+
+def calendar_table(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.find(id="Calendar").find_next("table", {"class": "wikitable sortable"})
+
+
+@pytest.fixture(params=[1, 10], ids=["page", "x10"])
+def calendar(request, pages):
+    """The calendar table of the page, or a made up one with 10 times the events."""
+
+    if request.param == 1:
+        return calendar_table(pages["calendar"])
+
+    return calendar_table(made_up_calendar(random.Random("x10"), events=400))
+
+
+def test_extract_events(measure, calendar):
+    measure(extract_events, calendar, size=len(calendar.find_all("tr")))
+
+
+@pytest.mark.parametrize("rows", [100, 10_000])
+def test_expand_row_col_span(measure, rows):
+    def table():
+        data = []
+        for i in range(0, rows, 2):
+            data.append([TableEntry(str(i), 1, 1), TableEntry("date", 2, 1), TableEntry("x", 1, 3)])
+            data.append([TableEntry(str(i + 1), 1, 1), TableEntry("y", 1, 2), TableEntry("z", 1, 1)])
+        return data
+
+    # the table is changed in place, so every call gets a new one
+    measure(lambda: expand_row_col_span(table()), size=rows)
+
+
+def test_render_schedule(measure, calendar):
+    events = extract_events(calendar)
+
+    # the schedule is changed in place, so every call gets a copy
+    measure(lambda: render_schedule(events.copy()), size=len(events))
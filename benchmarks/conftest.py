@@ -0,0 +1,106 @@
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+benchmarks = Path(__file__).parent.absolute()
+assignment4 = benchmarks.parent
+
+# Ensure assignment4 dir is on sys.path
+sys.path.insert(0, str(assignment4))
+sys.path.insert(0, str(benchmarks))
+
+from pages import load_pages, urls  # noqa: E402
+
+baseline_path = benchmarks / "memory_baseline.json"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--memory-threshold",
+        type=float,
+        default=0.25,
+        help="fail if peak memory grows by more than this fraction of the baseline",
+    )
+    parser.addoption(
+        "--update-memory-baseline",
+        action="store_true",
+        help=f"write the measured peak memory to {baseline_path.name}",
+    )
+
+
+@pytest.fixture(scope="session")
+def pages():
+    """The html of every benchmark page, by name, see pages.py."""
+
+    return load_pages()
+
+
+@pytest.fixture
+def offline(monkeypatch, pages):
+    """Serves the benchmark pages to the player statistics scraper, instead of wikipedia."""
+
+    import fetch_player_statistics
+
+    by_url = {url: pages[name] for name, url in urls.items()}
+    monkeypatch.setattr(fetch_player_statistics, "get_html", lambda url, **kwargs: by_url[url])
+
+
+@pytest.fixture(scope="session")
+def memory_baseline(request):
+    """Peak memory of every benchmark in the baseline, and as measured now, in KiB."""
+
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    measured = {}
+
+    yield baseline, measured
+
+    if request.config.getoption("--update-memory-baseline") and measured:
+        baseline.update(measured)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def measure(benchmark, request, memory_baseline):
+    """Benchmarks a function, recording its throughput and peak memory.
+
+    Usage: `measure(func, *args, size=len(html))`, where size is the size of
+    the input, e.g. bytes of html or rows of a table. The peak memory of one
+    call is measured with tracemalloc, after a warm up call and outside of the timed rounds, and the
+    benchmark fails if it has grown more than --memory-threshold over the baseline.
+    """
+
+    baseline, measured = memory_baseline
+    threshold = request.config.getoption("--memory-threshold")
+    key = request.node.nodeid.split("::", 1)[1]
+
+    def measure(func, *args, size=None):
+        # warm up first, so lazy imports and caches don't count as peak memory
+        func(*args)
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        peak_kib = round(peak / 1024, 1)
+        measured[key] = peak_kib
+        benchmark.extra_info["peak_kib"] = peak_kib
+
+        result = benchmark(func, *args)
+
+        if size is not None:
+            benchmark.extra_info["size"] = size
+            if benchmark.stats is not None:
+                benchmark.extra_info["size_per_second"] = size / benchmark.stats.stats.mean
+
+        limit = baseline.get(key, float("inf")) * (1 + threshold)
+        if peak_kib > limit and not request.config.getoption("--update-memory-baseline"):
+            pytest.fail(f"peak memory {peak_kib} KiB is over the baseline of {baseline[key]} KiB")
+
+        return result
+
+    return measure
@@ -0,0 +1,193 @@
+"""Pages for the benchmarks, recorded from wikipedia or made up.
+
+Recorded pages are read from pages/<name>.html.gz, written by running
+this file while online:
+
+    python benchmarks/pages.py
+
+Pages that have not been recorded are made up instead, with the same
+structure as the real pages and roughly the same size, so the benchmarks
+always run offline.
+"""
+
+import gzip
+import random
+from pathlib import Path
+from typing import Dict
+
+pages_dir = Path(__file__).parent / "pages"
+
+playoff_url = "https://en.wikipedia.org/wiki/2022_NBA_playoffs"
+
+# the recorded page of each benchmark input
+urls = {
+    "article": "https://en.wikipedia.org/wiki/Nobel_Prize",
+    "calendar": "https://en.wikipedia.org/wiki/2022–23_FIS_Alpine_Ski_World_Cup",
+    "playoffs": playoff_url,
+    "team": "https://en.wikipedia.org/wiki/2021–22_Milwaukee_Bucks_season",
+    "player": "https://en.wikipedia.org/wiki/Giannis_Antetokounmpo",
+}
+
+# team name and the team on the player page
+team = "Milwaukee"
+
+months = ["January", "March", "May", "July", "October", "December"]
+
+
+def filler(rng: random.Random, n: int) -> str:
+    """Paragraphs of article text, with links, images and dates."""
+
+    paragraphs = []
+    for i in range(n):
+        day, month, year = rng.randint(1, 28), rng.choice(months), rng.randint(1900, 2022)
+        paragraphs.append(
+            f'<p>Paragraph {i} was written on {day} {month} {year}, '
+            f'see <a href="/wiki/Topic_{rng.randint(0, 5 * n)}" title="Topic">topic</a>, '
+            f'<a href="/wiki/Topic_{i}#History">its history</a>, '
+            f'<a href="https://example.org/ref/{i}" rel="nofollow">a reference</a> '
+            f'and <a href="#cite_note-{i}">[{i}]</a>. '
+            f'Revised {year}-{rng.randint(10, 12)}-{day:02d} and {month} {day}, {year}.'
+            f'<img alt="" src="//upload.wikimedia.org/wikipedia/commons/{i % 97}/Image_{i}.jpg" '
+            f'width="220" height="160"></p>'
+        )
+
+    return "\n".join(paragraphs)
+
+
+def page(title: str, body: str) -> str:
+    return (
+        f"<!DOCTYPE html><html><head><title>{title} - Wikipedia</title></head>"
+        f'<body><div id="content"><h1>{title}</h1>{body}</div></body></html>'
+    )
+
+
+def made_up_article(rng: random.Random) -> str:
+    return page("Nobel Prize", filler(rng, 600))
+
+
+def made_up_calendar(rng: random.Random, events: int = 40) -> str:
+    headings = ["#", "Date", "Venue", "Type", "Winner", "Second", "Third"]
+    rows = []
+    for i in range(0, events, 2):
+        date = f"{rng.randint(1, 28)} {rng.choice(months)} 2023"
+        venue = f"Venue {rng.randint(0, 20)}"
+        for j, type_ in enumerate(rng.sample(["DH", "SL", "GS", "SG", "AC", "PG"], 2)):
+            spanned = (
+                f'<td rowspan="2">{date}</td><td rowspan="2">{venue}</td>' if j == 0 else ""
+            )
+            podium = (
+                '<td colspan="3">cancelled</td>'
+                if rng.random() < 0.1
+                else "".join(f"<td>Skier {rng.randint(0, 99)}</td>" for _ in range(3))
+            )
+            rows.append(f"<tr><td>{i + j + 1}</td>{spanned}<td>{type_}<sup>[{i}]</sup></td>{podium}</tr>")
+
+    table = (
+        '<table class="wikitable sortable"><tr>'
+        + "".join(f"<th>{heading}</th>" for heading in headings)
+        + "</tr>"
+        + "".join(rows)
+        + "</table>"
+    )
+    body = filler(rng, 100) + '<h2 id="Calendar">Calendar</h2>' + table + filler(rng, 100)
+
+    return page("World Cup", body)
+
+
+def made_up_playoffs(rng: random.Random) -> str:
+    rows = ["<tr><th>First round</th></tr>", "<tr><th>Seeds</th></tr>"]
+    names = [f"Team {i}" for i in range(16)]
+    names[0] = team
+
+    for i, name in enumerate(names):
+        seed = f"{'EW'[i // 8]}{i % 8 + 1}"
+        link = f'<a href="/wiki/2021–22_{name.replace(" ", "_")}_season">{name}</a>'
+        rows.append(f"<tr><td></td><td>{seed}</td><td>{link}</td><td>4</td></tr>")
+    for i, name in enumerate(names[::2]):
+        seed = f"{'EW'[i // 4]}{2 * (i % 4) + 1}"
+        rows.append(f"<tr><td></td><td></td><td>{seed}</td><td>{name}</td><td>4</td></tr>")
+
+    table = "<table>" + "".join(rows) + "</table>"
+    body = filler(rng, 200) + '<h2 id="Bracket">Bracket</h2>' + table + filler(rng, 200)
+
+    return page("2022 NBA playoffs", body)
+
+
+def made_up_team(rng: random.Random, players: int = 17) -> str:
+    rows = ["<tr><th>Players</th></tr>", "<tr><th>Roster</th></tr>", "<tr><th>Pos.</th></tr>"]
+    for i in range(players):
+        rows.append(
+            f"<tr><td>F</td><td>{i}</td>"
+            f'<td><a href="/wiki/Player_{i}">Player {i}</a> (TW)</td><td>6 ft 11 in</td></tr>'
+        )
+
+    table = "<table>" + "".join(rows) + "</table>"
+    body = filler(rng, 300) + '<h2 id="Roster">Roster</h2>' + table + filler(rng, 100)
+
+    return page("2021–22 Milwaukee Bucks season", body)
+
+
+def made_up_player(rng: random.Random, seasons: int = 10) -> str:
+    headings = "".join(
+        f"<th>{h}</th>"
+        for h in ["Year", "Team", "GP", "GS", "MPG", "FG%", "3P%", "FT%", "RPG", "APG", "SPG", "BPG", "PPG"]
+    )
+    rows = []
+    for i in range(seasons):
+        stats = "".join(f"<td>{rng.uniform(0, 40):.1f}</td>" for _ in range(11))
+        rows.append(f"<tr><td>{2012 + i}–{13 + i}</td><td>{team}</td>{stats}</tr>")
+
+    table = f'<table class="wikitable sortable"><tr>{headings}</tr>{"".join(rows)}</table>'
+    body = (
+        filler(rng, 400)
+        + '<h2 id="NBA_career_statistics">NBA career statistics</h2>'
+        + "<table><tr><td>Legend</td></tr></table>"
+        + table
+        + filler(rng, 100)
+    )
+
+    return page("Player", body)
+
+
+made_up = {
+    "article": made_up_article,
+    "calendar": made_up_calendar,
+    "playoffs": made_up_playoffs,
+    "team": made_up_team,
+    "player": made_up_player,
+}
+
+
+def load_pages() -> Dict[str, str]:
+    """Loads the html of every benchmark page, recorded or made up.
+
+    Returns:
+        pages (dict):
+            html by page name, see `urls`
+    """
+
+    pages = {}
+    for name in urls:
+        path = pages_dir / f"{name}.html.gz"
+        if path.exists():
+            pages[name] = gzip.decompress(path.read_bytes()).decode("utf-8")
+        else:
+            pages[name] = made_up[name](random.Random(name))
+
+    return pages
+
+
+def record_pages() -> None:
+    """Downloads every benchmark page to pages/<name>.html.gz."""
+
+    import requests
+
+    pages_dir.mkdir(exist_ok=True)
+    for name, url in urls.items():
+        print(f"Recording {url}")
+        html = requests.get(url).text
+        (pages_dir / f"{name}.html.gz").write_bytes(gzip.compress(html.encode("utf-8")))
+
+
+if __name__ == "__main__":
+    record_pages()
@@ -1,5 +1,7 @@
 import re
-from typing import Tuple
+from typing import Tuple, Union
+
+from tracing import traced
 
 ## -- Task 3 -- ##
 
@@ -71,11 +73,17 @@ def zero_pad(n: str) -> str:
    
     return "0" + n if len(f"{n}") == 1 else n
 
-def find_dates(text: str, output: str = None) -> list:
+@traced("extract", size=len)
+def find_dates(text: Union[str, bytes, bytearray, memoryview], output: str = None) -> list:
     """Finds all dates in a text using reg ex.
 
+    Undecoded utf-8 text, e.g. the bytes of a response or an mmap of a file,
+    is searched as it is, and only the found dates are decoded. In bytes,
+    \\s and \\b only know ascii, so e.g. dates split by non-breaking spaces
+    are not found.
+
     Args:
-        text (string): 
+        text (string or bytes-like): 
             A string containing html text from a website
     Return:
         results (list): 
@@ -100,7 +108,13 @@ def find_dates(text: str, output: str = None) -> list:
     dates = []
 
     for format in formats:
-        dates_ = re.findall(rf'{format}', text)
+        if isinstance(text, str):
+            dates_ = re.findall(rf'{format}', text)
+        else:
+            dates_ = [
+                date.group().decode("ascii")
+                for date in re.finditer(format.encode("ascii"), text)
+            ]
 
         for date in dates_:
             reformatted_date = date
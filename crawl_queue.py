@@ -0,0 +1,419 @@
+import os
+import socket
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from requesting_urls import get_html
+from wiki_race_challenge import article_links, split_article
+
+## -- Durable crawl frontier shared by worker processes -- ##
+
+
+@dataclass
+class CrawlStats:
+    """Data class recording the work done by one crawl worker.
+
+    Records pages crawled, pages that failed, new URLs added to the
+    frontier, and the time the worker ran.
+    """
+
+    pages: int = 0
+    errors: int = 0
+    added: int = 0
+    seconds: float = 0.0
+
+
+class CrawlQueue:
+    """Frontier and visited set of a link crawl, in an SQLite database.
+
+    Every URL ever seen has a row, so the table is also the visited set,
+    and a URL is only crawled once. Workers lease batches of pending URLs,
+    and a lease runs out after `lease_timeout` seconds, so the URLs of a
+    crashed worker are handed out again, up to `max_attempts` times in all.
+    Only the worker holding the lease of a URL can complete it or give it
+    back. The database runs in WAL mode, so any number of worker processes
+    on this machine can use it at once. WAL needs shared memory, so the
+    database must not be on a network file system. Leasing is one write
+    transaction, so no URL is leased by two workers at a time.
+
+    URLs are spread over `shards` shards by a hash of their host, and a
+    worker can lease from one shard only, e.g. one worker per shard to
+    keep each wiki to a single worker.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_timeout: float = 300.0,
+        max_attempts: int = 3,
+        shards: int = 1,
+    ):
+        """Opens the queue, creating it if it doesn't exist.
+
+        Args:
+            path (str):
+                path of the SQLite database
+            lease_timeout (float, optional):
+                seconds a worker has to finish a leased URL
+            max_attempts (int, optional):
+                how many times a URL is tried before it is marked failed
+            shards (int, optional):
+                number of shards, only used when the queue is created
+        """
+
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        # autocommit, transactions are begun explicitly
+        self.db = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+        with self.transaction():
+            self.db.execute(
+                """CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    depth INTEGER NOT NULL,
+                    shard INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    added REAL NOT NULL,
+                    finished REAL
+                )"""
+            )
+            # leasing reads the pending URLs in depth order, from one shard
+            # or all, and the expired leases, without sorting the frontier
+            self.db.execute("DROP INDEX IF EXISTS urls_state")
+            self.db.execute("CREATE INDEX IF NOT EXISTS urls_depth ON urls (state, depth)")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS urls_shard_depth ON urls (state, shard, depth)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS urls_expires ON urls (state, lease_expires)"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("INSERT OR IGNORE INTO meta VALUES ('shards', ?)", (str(shards),))
+            self.shards = int(
+                self.db.execute("SELECT value FROM meta WHERE key = 'shards'").fetchone()[0]
+            )
+
+    def transaction(self):
+        """Begins a write transaction, committed when the with statement ends."""
+
+        # BEGIN IMMEDIATE takes the write lock at once, so a read-then-update
+        # is never interleaved with another process
+        self.db.execute("BEGIN IMMEDIATE")
+
+        return self.db
+
+    def shard(self, url: str) -> int:
+        """Gets the shard of a URL, from a hash of its host."""
+
+        host = url.split("://", 1)[-1].split("/", 1)[0]
+
+        return zlib.crc32(host.encode("utf-8")) % self.shards
+
+    def add(self, urls: Iterable[str], depth: int = 0) -> int:
+        """Adds URLs to the frontier, skipping those seen before.
+
+        Args:
+            urls (iterable of str):
+                the URLs
+            depth (int, optional):
+                links followed from a seed URL to get to them
+        Returns:
+            count (int):
+                number of new URLs
+        """
+
+        with self.transaction():
+            return self._add(urls, depth, time.time())
+
+    def _add(self, urls: Iterable[str], depth: int, now: float) -> int:
+        before = self.db.total_changes
+        self.db.executemany(
+            "INSERT OR IGNORE INTO urls (url, depth, shard, added) VALUES (?, ?, ?, ?)",
+            ((url, depth, self.shard(url), now) for url in urls),
+        )
+
+        return self.db.total_changes - before
+
+    def lease(
+        self, worker: str, n: int = 10, shard: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """Leases up to n pending URLs, shallowest first.
+
+        URLs leased by a worker whose lease ran out are leased again first,
+        or marked failed if they have been leased `max_attempts` times, e.g.
+        because they crash the worker every time.
+
+        Args:
+            worker (str):
+                name of the worker, unique among the running workers
+            n (int, optional):
+                most URLs to lease
+            shard (int, optional):
+                only lease URLs of this shard
+        Returns:
+            urls (list of tuples):
+                (url, depth) of every leased URL, empty if there are none to lease
+        """
+
+        now = time.time()
+        shards = "" if shard is None else "AND shard = ?"
+        args = () if shard is None else (shard,)
+
+        with self.transaction():
+            expired = self.db.execute(
+                f"""SELECT url, depth, attempts FROM urls
+                WHERE state = 'leased' AND lease_expires < ? {shards} LIMIT ?""",
+                (now, *args, n),
+            ).fetchall()
+            self.db.executemany(
+                """UPDATE urls SET state = 'failed', lease_expires = NULL,
+                error = 'lease expired' WHERE url = ?""",
+                [(url,) for url, _, attempts in expired if attempts >= self.max_attempts],
+            )
+            rows = [(url, depth) for url, depth, attempts in expired if attempts < self.max_attempts]
+            rows += self.db.execute(
+                f"""SELECT url, depth FROM urls WHERE state = 'pending' {shards}
+                ORDER BY depth LIMIT ?""",
+                (*args, n - len(rows)),
+            ).fetchall()
+            self.db.executemany(
+                """UPDATE urls SET state = 'leased', worker = ?, lease_expires = ?,
+                attempts = attempts + 1 WHERE url = ?""",
+                [(worker, now + self.lease_timeout, url) for url, _ in rows],
+            )
+
+        return rows
+
+    def complete(
+        self,
+        worker: str,
+        url: str,
+        links: Iterable[str] = (),
+        max_depth: Optional[int] = None,
+    ) -> int:
+        """Marks a leased URL as crawled, and adds the links found on it.
+
+        Done in one transaction, so a crash never loses the links of a
+        crawled page. The links are not added if they would be deeper than max_depth.
+        Nothing is done if the worker's lease of the URL ran out and it was
+        leased again, since the URL is then crawled by someone else.
+
+        Args:
+            worker (str):
+                name of the worker
+            url (str):
+                the crawled URL
+            links (iterable of str, optional):
+                URLs found on the page
+            max_depth (int, optional):
+                deepest URLs to add
+        Returns:
+            count (int):
+                number of new URLs added
+        """
+
+        now = time.time()
+        with self.transaction():
+            updated = self.db.execute(
+                """UPDATE urls SET state = 'done', lease_expires = NULL, error = NULL,
+                finished = ? WHERE url = ? AND worker = ? AND state = 'leased'""",
+                (now, url, worker),
+            )
+            if updated.rowcount == 0:
+                return 0
+
+            row = self.db.execute("SELECT depth FROM urls WHERE url = ?", (url,)).fetchone()
+            depth = row[0] + 1
+            if max_depth is not None and depth > max_depth:
+                return 0
+
+            return self._add(links, depth, now)
+
+    def fail(self, worker: str, url: str, error: str) -> None:
+        """Gives a leased URL back after a failed crawl.
+
+        It is pending again, or marked failed after `max_attempts` attempts.
+        Nothing is done if the worker no longer holds the lease, see `complete`.
+        """
+
+        with self.transaction():
+            self.db.execute(
+                """UPDATE urls SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                lease_expires = NULL, error = ?
+                WHERE url = ? AND worker = ? AND state = 'leased'""",
+                (self.max_attempts, error, url, worker),
+            )
+
+    def renew(self, worker: str, urls: Iterable[str]) -> None:
+        """Extends the leases of a worker that needs more time for its URLs."""
+
+        with self.transaction():
+            self.db.executemany(
+                "UPDATE urls SET lease_expires = ? WHERE url = ? AND worker = ? AND state = 'leased'",
+                [(time.time() + self.lease_timeout, url, worker) for url in urls],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Counts the URLs in every state: pending, leased, done and failed."""
+
+        counts = dict.fromkeys(["pending", "leased", "done", "failed"], 0)
+        counts.update(self.db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"))
+
+        return counts
+
+    def finished(self) -> bool:
+        """Tells if no URL is pending or leased, so the crawl is over."""
+
+        row = self.db.execute(
+            "SELECT 1 FROM urls WHERE state IN ('pending', 'leased') LIMIT 1"
+        ).fetchone()
+
+        return row is None
+
+    def close(self) -> None:
+        """Closes the database."""
+
+        self.db.close()
+
+
+def page_links(url: str) -> Set[str]:
+    """Fetches a page and finds the links to articles on the same wiki."""
+
+    origin, _ = split_article(url)
+
+    return article_links(get_html(url), origin)
+
+
+def crawl(
+    path: str,
+    worker: Optional[str] = None,
+    batch: int = 16,
+    threads: int = 8,
+    max_depth: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    shard: Optional[int] = None,
+    poll: float = 1.0,
+    get_links: Callable[[str], Set[str]] = page_links,
+    **queue_args,
+) -> CrawlStats:
+    """Runs one crawl worker until the crawl is over.
+
+    Leases a batch of URLs at a time, fetches them and extracts their links
+    in threads, and records every page with its links in the queue. Start
+    as many of these, in as many processes or machines, as wanted. When
+    there is nothing to lease but other workers still hold leases, the
+    worker waits for them, since their URLs may have new links or their
+    leases may run out.
+
+    Args:
+        path (str):
+            path of the queue database, see `CrawlQueue`
+        worker (str, optional):
+            name of the worker, host and process id if not given
+        batch (int, optional):
+            URLs leased at a time
+        threads (int, optional):
+            number of fetch threads
+        max_depth (int, optional):
+            deepest links to follow from the seed URLs
+        max_pages (int, optional):
+            stop after crawling this many pages
+        shard (int, optional):
+            only crawl the URLs of this shard
+        poll (float, optional):
+            seconds to wait when there is nothing to lease
+        get_links (callable, optional):
+            gets the links of a URL, articles on the same wiki by default
+        **queue_args:
+            passed on to `CrawlQueue`, e.g. lease_timeout
+    Returns:
+        stats (CrawlStats):
+            the work done by this worker
+    """
+
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    queue = CrawlQueue(path, **queue_args)
+    stats = CrawlStats()
+    start = time.perf_counter()
+
+    def fetch(url):
+        try:
+            return get_links(url), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while max_pages is None or stats.pages < max_pages:
+                n = batch if max_pages is None else min(batch, max_pages - stats.pages)
+                leased = queue.lease(worker, n, shard=shard)
+                if not leased:
+                    if queue.finished():
+                        break
+                    time.sleep(poll)
+                    continue
+
+                urls = [url for url, _ in leased]
+                for url, (links, error) in zip(urls, pool.map(fetch, urls)):
+                    if error is not None:
+                        queue.fail(worker, url, error)
+                        stats.errors += 1
+                        continue
+                    stats.added += queue.complete(worker, url, links, max_depth=max_depth)
+                    stats.pages += 1
+    finally:
+        stats.seconds = time.perf_counter() - start
+        queue.close()
+
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Link crawl shared by worker processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed = commands.add_parser("seed", help="add start URLs to a crawl")
+    seed.add_argument("queue")
+    seed.add_argument("urls", nargs="+")
+    seed.add_argument("--shards", type=int, default=1)
+    work = commands.add_parser("work", help="run a worker until the crawl is over")
+    work.add_argument("queue")
+    work.add_argument("--worker")
+    work.add_argument("--batch", type=int, default=16)
+    work.add_argument("--threads", type=int, default=8)
+    work.add_argument("--max-depth", type=int)
+    work.add_argument("--max-pages", type=int)
+    work.add_argument("--shard", type=int)
+    work.add_argument("--lease-timeout", type=float, default=300.0)
+    status = commands.add_parser("status", help="count the URLs in every state")
+    status.add_argument("queue")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        print(f"{CrawlQueue(args.queue, shards=args.shards).add(args.urls)} URLs added")
+    elif args.command == "work":
+        print(
+            crawl(
+                args.queue,
+                worker=args.worker,
+                batch=args.batch,
+                threads=args.threads,
+                max_depth=args.max_depth,
+                max_pages=args.max_pages,
+                shard=args.shard,
+                lease_timeout=args.lease_timeout,
+            )
+        )
+    else:
+        print(CrawlQueue(args.queue).counts())
@@ -0,0 +1,371 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar, Union
+
+## -- Deadlines and hedged requests for the fetch layer -- ##
+
+T = TypeVar("T")
+
+# seconds to wait for a connection, and for each read from the server,
+# unless the deadline is sooner
+default_timeout: Tuple[float, float] = (5.0, 30.0)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline of a job passes before its work is done."""
+
+
+@dataclass(frozen=True)
+class FetchContext:
+    """How the fetches of the current job are done, see `deadline` and `hedging`.
+
+    `expires` is the deadline of the job, in `time.monotonic` seconds, and
+    `cached` is False while fetches bypass requests_cache, see
+    `requesting_urls.uncached`.
+    """
+
+    expires: Optional[float] = None
+    hedger: Optional["Hedger"] = None
+    cached: bool = True
+
+
+# the fetch context of the running thread or task. Threads don't inherit
+# it, so `Pipeline` hands it to its fetch threads
+fetch_context: ContextVar[FetchContext] = ContextVar("fetch_context", default=FetchContext())
+
+
+@contextmanager
+def fetch_context_set(context: FetchContext) -> Iterator[FetchContext]:
+    """Makes a fetch context current for the body of the with statement."""
+
+    token = fetch_context.set(context)
+    try:
+        yield context
+    finally:
+        fetch_context.reset(token)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Gives the body of the with statement a deadline, seconds from now.
+
+    Every fetch in the body gets at most the time left as its timeout, and
+    raises `DeadlineExceeded` once the deadline has passed, so a stalled
+    server can't hold up the job. Nested deadlines can only make it sooner.
+
+    Args:
+        seconds (float or None):
+            time the job may take, no deadline if None
+    Yields:
+        expires (float or None):
+            the deadline, in `time.monotonic` seconds
+    """
+
+    context = fetch_context.get()
+    expires = context.expires
+    if seconds is not None:
+        until = time.monotonic() + seconds
+        expires = until if expires is None else min(expires, until)
+
+    with fetch_context_set(replace(context, expires=expires)):
+        yield expires
+
+
+def time_left(expires: Optional[float] = None) -> Optional[float]:
+    """Seconds until the deadline, of the current job if expires isn't given, None if there is none."""
+
+    expires = fetch_context.get().expires if expires is None else expires
+
+    return None if expires is None else expires - time.monotonic()
+
+
+def check_deadline(expires: Optional[float] = None) -> None:
+    """Raises `DeadlineExceeded` if the deadline has passed."""
+
+    left = time_left(expires)
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline passed {-left:.2f} seconds ago")
+
+
+def request_timeout(
+    timeout: Union[float, Tuple[float, float], None] = default_timeout,
+    expires: Optional[float] = None,
+) -> Union[float, Tuple[float, float], None]:
+    """Gets the timeout of a request, capped by the time left before the deadline.
+
+    Args:
+        timeout (float or tuple, optional):
+            seconds to wait, or (connect, read) seconds, as for `requests`
+        expires (float, optional):
+            the deadline, that of the current job if not given
+    Returns:
+        timeout (float or tuple):
+            the timeout to use
+    Raises:
+        DeadlineExceeded:
+            if the deadline has passed
+    """
+
+    check_deadline(expires)
+    left = time_left(expires)
+    if left is None:
+        return timeout
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) for t in timeout)
+
+    return min(timeout, left)
+
+
+class Hedger:
+    """Sends a second copy of slow requests, and takes whichever answers first.
+
+    The latencies of the requests are recorded, per key (e.g. the host).
+    When a request takes longer than the `quantile` of the recent ones,
+    a duplicate is sent, as long as the duplicates stay within `budget`
+    of all requests. This cuts the tail latency caused by a slow server
+    or a stalled connection, at the cost of a few extra requests.
+
+    Blocking calls run in a thread pool. A duplicate that isn't needed
+    any more is cancelled if it hasn't started, otherwise it runs until
+    its timeout and its answer is dropped. Async calls are cancelled.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 1000,
+        max_workers: int = 32,
+    ):
+        """Sets up a hedger.
+
+        Args:
+            quantile (float, optional):
+                send a duplicate when a request is slower than this quantile
+            budget (float, optional):
+                most duplicates, as a fraction of the requests
+            min_samples (int, optional):
+                requests to observe for a key before hedging them
+            window (int, optional):
+                latencies of recent requests kept per key
+            max_workers (int, optional):
+                threads running the blocking calls
+        """
+
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.requests = 0
+        self.hedges = 0
+        # duplicates that answered first
+        self.wins = 0
+        self.lock = threading.Lock()
+        self.pool: Optional[ThreadPoolExecutor] = None
+
+    def delay(self, key: str = "") -> Optional[float]:
+        """Seconds after which a request is hedged, None until enough are observed."""
+
+        with self.lock:
+            latencies = sorted(self.latencies.get(key, ()))
+
+        if len(latencies) < self.min_samples:
+            return None
+
+        return latencies[min(int(self.quantile * len(latencies)), len(latencies) - 1)]
+
+    def record(self, key: str, seconds: float) -> None:
+        """Records the latency of a request that succeeded."""
+
+        with self.lock:
+            self.latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def may_hedge(self) -> bool:
+        """Takes a duplicate out of the budget, if there is one left."""
+
+        with self.lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+
+        return True
+
+    def timed(self, key: str, func: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = func()
+        self.record(key, time.perf_counter() - start)
+
+        return result
+
+    def call(self, func: Callable[[], T], key: str = "", expires: Optional[float] = None) -> T:
+        """Calls func, and a duplicate of it if it is slow, returning the first answer.
+
+        If the first call to finish raised, the other one is waited for.
+
+        Args:
+            func (callable):
+                the request, called without arguments, possibly twice at once
+            key (str, optional):
+                what latencies to compare with, e.g. the host
+            expires (float, optional):
+                the deadline, that of the current job if not given
+        Returns:
+            result:
+                the answer of the first call to succeed
+        Raises:
+            DeadlineExceeded:
+                if the deadline passes first
+        """
+
+        expires = fetch_context.get().expires if expires is None else expires
+        with self.lock:
+            self.requests += 1
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="hedger")
+
+        delay = self.delay(key)
+        first = self.pool.submit(self.timed, key, func)
+        pending = {first}
+
+        def wait_until(delay):
+            left = time_left(expires)
+            timeout = left if delay is None else delay if left is None else min(delay, left)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                check_deadline(expires)
+            return done
+
+        try:
+            if not wait_until(delay) and self.may_hedge():
+                pending.add(self.pool.submit(self.timed, key, func))
+
+            error = None
+            while pending:
+                for future in wait_until(None):
+                    pending.discard(future)
+                    if future.exception() is None:
+                        with self.lock:
+                            self.wins += future is not first
+                        return future.result()
+                    error = error or future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def call_async(
+        self, func: Callable[[], Awaitable[T]], key: str = "", expires: Optional[float] = None
+    ) -> T:
+        """Like `call`, for a coroutine function. The call that isn't needed is cancelled."""
+
+        import asyncio
+
+        expires = fetch_context.get().expires if expires is None else expires
+        with self.lock:
+            self.requests += 1
+
+        async def timed():
+            start = time.perf_counter()
+            result = await func()
+            self.record(key, time.perf_counter() - start)
+            return result
+
+        delay = self.delay(key)
+        first = asyncio.ensure_future(timed())
+        pending = {first}
+
+        async def wait_until(delay):
+            left = time_left(expires)
+            timeout = left if delay is None else delay if left is None else min(delay, left)
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                check_deadline(expires)
+            return done
+
+        try:
+            if not await wait_until(delay) and self.may_hedge():
+                pending.add(asyncio.ensure_future(timed()))
+
+            error = None
+            while pending:
+                for task in await wait_until(None):
+                    pending.discard(task)
+                    if task.exception() is None:
+                        with self.lock:
+                            self.wins += task is not first
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __str__(self) -> str:
+        return f"{self.hedges} hedged of {self.requests} requests, {self.wins} answered first"
+
+    def close(self) -> None:
+        """Stops the threads, without waiting for the requests still running."""
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+@contextmanager
+def hedging(hedger: Optional[Hedger] = None, **kwargs) -> Iterator[Hedger]:
+    """Hedges the fetches in the body of the with statement, see `Hedger`.
+
+    Args:
+        hedger (Hedger, optional):
+            the hedger to use, e.g. to keep its latencies between jobs.
+            A new one is made, and closed at the end, if not given
+        **kwargs:
+            passed on to the new `Hedger`, e.g. budget
+    Yields:
+        hedger (Hedger):
+            the hedger, with its counts of hedged requests
+    """
+
+    owned = hedger is None
+    hedger = Hedger(**kwargs) if owned else hedger
+    try:
+        with fetch_context_set(replace(fetch_context.get(), hedger=hedger)):
+            yield hedger
+    finally:
+        if owned:
+            hedger.close()
+
+
+@contextmanager
+def job_limits(
+    seconds: Optional[float] = None, hedge: Union[bool, Hedger] = False
+) -> Iterator[Optional[Hedger]]:
+    """Gives a job a deadline and hedges its fetches, as asked by the arguments of a batch driver.
+
+    Args:
+        seconds (float, optional):
+            deadline of the job, see `deadline`
+        hedge (bool or Hedger, optional):
+            hedge the fetches, with this hedger or a new one, see `hedging`
+    Yields:
+        hedger (Hedger or None):
+            the hedger, None if not hedging
+    """
+
+    with deadline(seconds):
+        if not hedge:
+            yield None
+            return
+
+        with hedging(None if hedge is True else hedge) as hedger:
+            yield hedger
@@ -1,28 +1,52 @@
 import os
 import re
-from operator import itemgetter
-from typing import Dict, List
-from urllib.parse import urljoin
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urljoin
 
-import numpy as np
-from bs4 import BeautifulSoup
-from matplotlib import pyplot as plt
-from requesting_urls import get_html
+from deadlines import job_limits
+from memory import release
+from requesting_urls import get_html, get_html_async, get_section_html, uncached
+from tracing import traced
+
+# pandas, bs4 and matplotlib are slow to import, so they are imported
+# where they are used, and importing this module stays cheap
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    import pandas as pd
 
 ## --- Task 8, 9 and 10 --- ##
 
-try:
-    import requests_cache
-except ImportError:
-    print("install requests_cache to improve performance")
-    pass
-else:
-    requests_cache.install_cache()
+
+def install_cache() -> None:
+    """Caches all HTTP requests with requests_cache, if it is installed."""
+
+    try:
+        import requests_cache
+    except ImportError:
+        print("install requests_cache to improve performance")
+    else:
+        if not requests_cache.is_installed():
+            requests_cache.install_cache()
+
 
 base_url = "https://en.wikipedia.org"
 
 
-def find_best_players(url: str) -> None:
+@traced("run")
+def find_best_players(
+    url: str,
+    cache: bool = True,
+    parallel: bool = False,
+    low_memory: bool = False,
+    report_memory: bool = False,
+    section: bool = False,
+    freshness: Optional[str] = None,
+    season: Optional[str] = None,
+    deadline: Optional[float] = None,
+    hedge: bool = False,
+) -> None:
     """Finds the best players in the semifinals of the nba and plots their stats.
 
     This is the top 3 scorers from every team in semifinals.
@@ -30,52 +54,304 @@ def find_best_players(url: str) -> None:
 
     Args:
         - html (str) : html string from wiki basketball
+        - cache (bool) : cache the fetched pages with requests_cache
+        - parallel (bool) : fetch the player pages in threads and parse them
+            in worker processes, with a `pipeline.Pipeline`
+        - low_memory (bool) : free every parsed page as soon as the stats
+            are taken out of it, see `memory.release`
+        - report_memory (bool) : print the peak memory and the top
+            allocating lines when done, see `memory.memory_report`
+        - section (bool) : only download the sections with the tables,
+            see `requesting_urls.get_section_html`
+        - freshness (str) : json file with the last seen revision of every
+            page and what was scraped from it. The revisions of the team and
+            player pages are looked up in bulk, and only the pages that
+            changed since the last run are fetched, see `freshness.RevisionLog`.
+            The changed pages are never taken from requests_cache,
+            so `cache` is ignored
+        - season (str) : the season to get the stats of, e.g. 2021–22,
+            found from the url if not given, 2021–22 if it can't be
+        - deadline (float) : seconds the scraping may take, after which
+            `deadlines.DeadlineExceeded` is raised, see `deadlines.deadline`
+        - hedge (bool) : send a second request for fetches slower than
+            most, and take the first answer, see `deadlines.hedging`
     """
-    
-    # find all teams 
-    teams = get_teams(url)
-    assert len(teams) == 8
 
-    all_players = {}
+    season = season or playoff_season(url) or "2021–22"
+    best = best_players(
+        {season: url},
+        cache=cache,
+        parallel=parallel,
+        low_memory=low_memory,
+        report_memory=report_memory,
+        section=section,
+        freshness=freshness,
+        deadline=deadline,
+        hedge=hedge,
+    )
 
-    # find all players from team and add to dict with name as key and url as value
-    for team in teams:
-        name = team['name']
-        team_url = team['url']
-        all_players[name] = get_players(team_url)
+    stats_to_plot = ["points", "assists", "rebounds"]
+    render_best(best[season], stats=stats_to_plot)
 
-    # append the value of players with the player stats
-    for team, players in all_players.items():
-        for player in players:
-            player_url = player['url']
-            player.update(get_player_stats(player_url, team))
 
-    best = {}
-    top_stat = "points"
+@traced("run")
+def find_best_players_seasons(
+    urls: Iterable[str],
+    stats_dir: str = "NBA_player_statistics",
+    processes: Optional[int] = None,
+    **kwargs,
+) -> Dict[str, Dict[str, List[Dict]]]:
+    """Finds the best players of many playoffs and plots their stats.
 
-    # loops through all players, finding the top 3 players for each team
-    for team, players in all_players.items():
-        top_3 = []
+    Every player page is fetched once, however many of the seasons the
+    player was in, see `best_players`. The plots of each season are
+    rendered in parallel, see `render_seasons`.
 
-        players_with_points = []
-        for player in players:
-            if top_stat in player.keys():
-                players_with_points.append(player)
-        
-        # convert to sorted list and get the last 3 indexes to find top 3
-        sorted_by_points = sorted(players_with_points, key=itemgetter(top_stat))
-        
-        top_3.append(sorted_by_points[-1])
-        top_3.append(sorted_by_points[-2])
-        top_3.append(sorted_by_points[-3])
-        best[team] = top_3
+    Args:
+        urls (iterable of str):
+            urls of the playoffs pages, e.g. .../wiki/2022_NBA_playoffs
+        stats_dir (str, optional):
+            the plots of each season are written to a subdirectory named after the season
+        processes (int, optional):
+            number of worker processes for the plots, one per cpu if not given
+        **kwargs:
+            passed on to `best_players`, e.g. parallel=True
+    Returns:
+        best_by_season (dict):
+            the top 3 scorers of every team, by season
+    """
 
-    stats_to_plot = ["points", "assists", "rebounds"]
+    playoffs = {}
+    for url in urls:
+        season = playoff_season(url)
+        if season is None:
+            raise ValueError(f"can't tell the season of {url}")
+        playoffs[season] = url
+
+    best_by_season = best_players(playoffs, **kwargs)
+    render_seasons(
+        best_by_season,
+        stats_dir=stats_dir,
+        processes=processes,
+        stats=["points", "assists", "rebounds"],
+    )
+
+    return best_by_season
+
+
+# the year a playoffs page is about, e.g. 2022 in 2022_NBA_playoffs
+playoffs_year_pat = re.compile(r"(\d{4})_NBA_playoffs")
+
+
+def playoff_season(url: str) -> Optional[str]:
+    """Gets the season of a playoffs page, e.g. 2021–22 for .../wiki/2022_NBA_playoffs.
+
+    Returns None if the url doesn't say.
+    """
+
+    match = playoffs_year_pat.search(unquote(url))
+    if match is None:
+        return None
+
+    year = int(match.group(1))
+
+    return f"{year - 1}–{year % 100:02d}"
+
+
+def best_players(
+    playoffs: Dict[str, str],
+    cache: bool = True,
+    parallel: bool = False,
+    low_memory: bool = False,
+    report_memory: bool = False,
+    section: bool = False,
+    freshness: Optional[str] = None,
+    deadline: Optional[float] = None,
+    hedge: bool = False,
+) -> Dict[str, Dict[str, List[Dict]]]:
+    """Finds the top 3 scorers of every team in the semifinals of many playoffs.
+
+    The teams and rosters of every season are found first. Then the page
+    of every distinct player is fetched and parsed once, and the stats of
+    all the seasons the player was in are taken from it, so the work grows
+    with the number of players rather than player seasons. All seasons
+    are ranked at once.
+
+    Args:
+        playoffs (dict):
+            url of the playoffs page of every season, e.g.
+            {"2021–22": "https://en.wikipedia.org/wiki/2022_NBA_playoffs"}
+        cache, parallel, low_memory, report_memory, section, freshness, deadline, hedge:
+            see `find_best_players`
+    Returns:
+        best_by_season (dict):
+            the best players of every season, on the form
+            {season: {team name: [{"name", "url", "points", "assists", "rebounds"}, ...]}}
+    """
+
+    import pandas as pd
+    from memory import memory_report
+
+    if cache and freshness is None:
+        install_cache()
+
+    log = None
+    if freshness is not None:
+        from freshness import RevisionLog
+
+        log = RevisionLog(freshness)
+
+    def scrape(kind, page_url, func):
+        return func(page_url) if log is None else log.cached(page_url, kind, func)
+
+    fetch_career = partial(get_career_stats, low_memory=low_memory, section=section)
+
+    limits = job_limits(deadline, hedge)
+    bypass = uncached(log is not None)
+
+    # the results so far are kept if the deadline passes
+    try:
+        with memory_report(enabled=report_memory) as report, bypass, limits as hedger:
+            # find all teams of every season
+            teams = {}
+            if log is not None:
+                log.check(playoffs.values())
+            for season, url in playoffs.items():
+                teams[season] = scrape(
+                    "teams", url, partial(get_teams, low_memory=low_memory, section=section)
+                )
+                assert len(teams[season]) == 8
+
+            team_urls = [team['url'] for season_teams in teams.values() for team in season_teams]
+            if log is not None:
+                changed = log.check(team_urls)
+                print(f"{len(changed)} of {len(team_urls)} team pages changed")
+
+            # find all players from team and add to dict with (season, name) as key
+            all_players = {}
+            for season, season_teams in teams.items():
+                for team in season_teams:
+                    players = partial(get_players, low_memory=low_memory, section=section)
+                    all_players[season, team['name']] = scrape("players", team['url'], players)
+                    report.sample()
+
+            urls = list(
+                dict.fromkeys(
+                    player['url'] for players in all_players.values() for player in players
+                )
+            )
+            seasons = {}
+            if log is not None:
+                changed = log.check(urls)
+                print(f"{len(changed)} of {len(urls)} player pages changed")
+                seasons = {url: log.get(url, "career") for url in urls if log.fresh(url, "career")}
+
+            # the stats of every season of every player
+            if parallel:
+                from pipeline import Pipeline
+
+                pipeline = Pipeline(
+                    fetch=partial(get_section_html, heading=career_id_re) if section else get_html,
+                    parse=partial(career_stats, low_memory=low_memory),
+                )
+                for player_url, stats in pipeline.run(url for url in urls if url not in seasons):
+                    seasons[player_url] = stats
+                    if log is not None:
+                        log.put(player_url, "career", stats)
+                    report.sample()
+                print(pipeline.report())
+            else:
+                for player_url in urls:
+                    if player_url not in seasons:
+                        seasons[player_url] = scrape("career", player_url, fetch_career)
+                    report.sample()
+
+            if hedger is not None:
+                print(hedger)
+    finally:
+        if log is not None:
+            log.save()
+
+    if report_memory:
+        print(report)
+
+    rows = [
+        dict(player, season=season, team=team, **season_stats(seasons[player['url']], team, season))
+        for (season, team), players in all_players.items()
+        for player in players
+    ]
+    df = pd.DataFrame(
+        rows, columns=["season", "team", "name", "url", "points", "assists", "rebounds"]
+    )
+
+    # the top 3 scorers for each team, teams with fewer players with stats get fewer
+    top = rank_players(df, stats=["points"], n=3, by=["season", "team"])
+    best_by_season = {season: {} for season in playoffs}
+    for (season, team), group in top.groupby(["season", "team"], sort=False):
+        best_by_season[season][team] = group.drop(
+            columns=["season", "stat", "rank", "value"]
+        ).to_dict("records")
+
+    return best_by_season
+
+
+@traced("aggregate", size=len)
+def rank_players(
+    players: "pd.DataFrame",
+    stats: Optional[List[str]] = None,
+    n: int = 3,
+    by: str = "team",
+    ties: str = "first",
+) -> "pd.DataFrame":
+    """Finds the top n players of every group for each of the given stats.
+
+    Every stat is ranked within all groups at once with a grouped rank,
+    instead of sorting the players of each group separately.
+    Players missing a stat are left out of the ranking for that stat,
+    so groups with fewer than n players with the stat get fewer rows.
+
+    Args:
+        players (DataFrame):
+            one row per player, with the column `by` and a column per stat
+        stats (list of str, optional):
+            the stats to rank by, only points if not given
+        n (int, optional):
+            how many players to pick from each group
+        by (str or list, optional):
+            column(s) to group by, e.g. "team" or ["season", "team"]
+        ties (str, optional):
+            "first" picks exactly n players, breaking ties by row order,
+            "min" also includes everyone tied with the n-th player
+    Returns:
+        top (DataFrame):
+            the rows of the picked players, with the added columns
+            "stat", "rank" (1 is best) and "value", sorted by stat, group and rank
+    """
+
+    import pandas as pd
+
+    stats = ["points"] if stats is None else stats
+    by_ = [by] if isinstance(by, str) else list(by)
+    frames = []
+
+    for stat in stats:
+        ranks = players.groupby(by_, sort=False)[stat].rank(method=ties, ascending=False)
+        picked = ranks <= n
 
-    for stat in stats_to_plot:
-        plot_best(best, stat=stat)
+        top = players[picked].assign(
+            stat=stat,
+            rank=ranks[picked].astype(int),
+            value=players.loc[picked, stat],
+        )
+        frames.append(top.sort_values(by_ + ["rank"], kind="stable"))
 
+    if not frames:
+        return players.iloc[:0].assign(stat=None, rank=None, value=None)
 
+    return pd.concat(frames)
+
+
+@traced("render")
 def plot_best(best: Dict[str, List[Dict]], stat: str = "points") -> None:
     """Plots a single stat for the top 3 players from every team.
 
@@ -102,6 +378,8 @@ def plot_best(best: Dict[str, List[Dict]], stat: str = "points") -> None:
             Should be a key in the player info dictionary.
     """
 
+    from matplotlib import pyplot as plt
+
     stats_dir = "NBA_player_statistics"
     count = 0
     all_names = []
@@ -136,19 +414,208 @@ def plot_best(best: Dict[str, List[Dict]], stat: str = "points") -> None:
     plt.close()
 
 
-def get_teams(url: str) -> list:
+@traced("render", size=len)
+def render_best(
+    best: Dict[str, List[Dict]],
+    stats: Optional[List[str]] = None,
+    stats_dir: str = "NBA_player_statistics",
+    fmt: str = "png",
+    dpi: Optional[float] = None,
+    subplots: bool = False,
+) -> List[str]:
+    """Renders plots of several stats for the top players from every team.
+
+    Does the same plots as `plot_best`, but without pyplot: the figure is drawn
+    on an Agg canvas directly, so no interactive backend is ever loaded, and one
+    figure is reused for all stats. All bars of a stat are drawn with one call.
+
+    Args:
+        best (dict) : dict with the top players from every team,
+            same form as for `plot_best`
+        stats (list of str, optional) : which stats to plot,
+            points, assists and rebounds if not given
+        stats_dir (str, optional) : directory to write the plots to
+        fmt (str, optional) : file format, e.g. "png" or "svg"
+        dpi (float, optional) : resolution, lower it for quick previews
+        subplots (bool, optional) : draw all stats as subplots of a single
+            figure, written to best.<fmt>, instead of one file per stat
+    Returns:
+        filenames (list) : paths of the written files
+    """
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    stats = ["points", "assists", "rebounds"] if stats is None else stats
+    os.makedirs(stats_dir, exist_ok=True)
+    filenames = []
+
+    def save(fig, name):
+        filename = os.path.join(stats_dir, f"{name}.{fmt}")
+        print(f"Creating {filename}")
+        fig.savefig(filename, format=fmt, dpi=dpi or "figure", bbox_inches="tight")
+        filenames.append(filename)
+
+    if subplots:
+        fig = Figure(figsize=(6.4, 4.8 * len(stats)))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(len(stats), 1, squeeze=False)[:, 0]
+
+        for ax, stat in zip(axes, stats):
+            draw_stat(ax, best, stat)
+        save(fig, "best")
+
+        return filenames
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+
+    for stat in stats:
+        fig.clear()
+        draw_stat(fig.add_subplot(), best, stat)
+        save(fig, stat)
+
+    return filenames
+
+
+def draw_stat(ax, best: Dict[str, List[Dict]], stat: str) -> None:
+    """Draws the bar plot of one stat on the given axes.
+
+    Args:
+        ax (matplotlib.axes.Axes) : axes to draw on
+        best (dict) : dict with the top players from every team
+        stat (str) : which stat to plot
+    """
+
+    from matplotlib import rcParams
+    from matplotlib.patches import Patch
+
+    cycle = rcParams["axes.prop_cycle"].by_key()["color"]
+    names = []
+    values = []
+    colors = []
+    handles = []
+
+    for i, (team, players) in enumerate(best.items()):
+        color = cycle[i % len(cycle)]
+        handles.append(Patch(color=color, label=team))
+
+        for player in players:
+            names.append(player["name"])
+            values.append(player[stat])
+            colors.append(color)
+
+    bars = ax.bar(range(len(names)), values, color=colors)
+    ax.bar_label(bars, label_type="edge", padding=0, fontsize=7)
+    ax.set_xticks(range(len(names)))
+    ax.set_xticklabels(names, rotation=90)
+    ax.legend(handles=handles, bbox_to_anchor=(1, 1), loc="best", borderaxespad=0, fontsize=9)
+    ax.grid(True)
+    ax.set_title(f"{stat} per game")
+
+
+def render_seasons(
+    best_by_season: Dict[str, Dict[str, List[Dict]]],
+    stats_dir: str = "NBA_player_statistics",
+    processes: Optional[int] = None,
+    **kwargs,
+) -> Dict[str, List[str]]:
+    """Renders the plots of many seasons in parallel worker processes.
+
+    Args:
+        best_by_season (dict) : `best` dict for `render_best`, for every season
+        stats_dir (str, optional) : the plots of each season are written
+            to a subdirectory named after the season
+        processes (int, optional) : number of worker processes,
+            one per cpu if not given
+        **kwargs : passed on to `render_best`
+    Returns:
+        filenames (dict) : the written files of each season
+    """
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {
+            season: pool.submit(
+                render_best, best, stats_dir=os.path.join(stats_dir, season), **kwargs
+            )
+            for season, best in best_by_season.items()
+        }
+
+        return {season: future.result() for season, future in futures.items()}
+
+
+@traced("extract", size=len)
+def get_teams(url: str, low_memory: bool = False, section: bool = False) -> list:
     """Extracts all the teams that were in the semi finals in nba.
 
     Args:
         - url (str): 
             url of the nba finals wikipedia page
+        - low_memory (bool, optional):
+            free the parsed page right after use
+        - section (bool, optional):
+            only download the Bracket section
     Returns:
         teams (list): 
             list with all teams
             Each team is a dictionary of {'name': team name, 'url': team page}
     """
 
-    html = get_html(url)
+    html = get_section_html(url, "Bracket") if section else get_html(url)
+
+    return teams_from_html(html, low_memory=low_memory)
+
+
+@traced("extract", size=len)
+async def get_teams_async(
+    url: str, low_memory: bool = False, executor: Optional["Executor"] = None
+) -> list:
+    """Extracts all the teams that were in the semi finals, without blocking the event loop.
+
+    Same as `get_teams`, but the page is fetched with `get_html_async`,
+    and parsed in an executor.
+
+    Args:
+        - url (str):
+            url of the nba finals wikipedia page
+        - low_memory (bool, optional):
+            free the parsed page right after use
+        - executor (concurrent.futures.Executor, optional):
+            where to parse the page, the default thread pool of the event loop
+            if not given, a ProcessPoolExecutor parses outside the GIL
+    Returns:
+        teams (list):
+            list with all teams, see `get_teams`
+    """
+
+    import asyncio
+
+    html = await get_html_async(url)
+    parse = partial(teams_from_html, html, low_memory=low_memory)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, parse)
+
+
+@traced("parse", size=len)
+def teams_from_html(html: str, low_memory: bool = False) -> list:
+    """Finds the teams that were in the semi finals in the html of the playoffs page.
+
+    Only needs the html, so it can run in a worker process.
+
+    Args:
+        html (str):
+            html of the playoffs page, or of its Bracket section
+        low_memory (bool, optional):
+            free the parsed page right after use
+    Returns:
+        teams (list):
+            list with all teams, see `get_teams`
+    """
+
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     table = soup.find(id="Bracket").find_next("table")
 
@@ -178,6 +645,9 @@ def get_teams(url: str) -> list:
             team_col = cols[4]
             in_semifinal.add(team_col.get_text(strip=True))
 
+    if low_memory:
+        release(soup)
+
     assert len(in_semifinal) == 8
     return [
         {
@@ -188,11 +658,14 @@ def get_teams(url: str) -> list:
     ]
 
 
-def get_players(team_url: str) -> list:
+@traced("extract", size=len)
+def get_players(team_url: str, low_memory: bool = False, section: bool = False) -> list:
     """Gets all the players from a team that were in the roster for semi finals.
     
     Args:
         team_url (str) : the url for the team
+        low_memory (bool, optional) : free the parsed page right after use
+        section (bool, optional) : only download the Roster section
     Returns:
         player_infos (list) : list of player info dictionaries
             with form: {'name': player name, 'url': player wikipedia page url}
@@ -200,7 +673,54 @@ def get_players(team_url: str) -> list:
 
     print(f"Finding players in {team_url}")
 
-    html = get_html(team_url)
+    html = get_section_html(team_url, "Roster") if section else get_html(team_url)
+
+    return players_from_html(html, low_memory=low_memory)
+
+
+@traced("extract", size=len)
+async def get_players_async(
+    team_url: str, low_memory: bool = False, executor: Optional["Executor"] = None
+) -> list:
+    """Gets all the players from a team, without blocking the event loop.
+
+    Same as `get_players`, but the page is fetched with `get_html_async`,
+    and parsed in an executor.
+
+    Args:
+        team_url (str) : the url for the team
+        low_memory (bool, optional) : free the parsed page right after use
+        executor (Executor, optional) : where to parse the page,
+            see `get_teams_async`
+    Returns:
+        player_infos (list) : list of player info dictionaries, see `get_players`
+    """
+
+    import asyncio
+
+    print(f"Finding players in {team_url}")
+
+    html = await get_html_async(team_url)
+    parse = partial(players_from_html, html, low_memory=low_memory)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, parse)
+
+
+@traced("parse", size=len)
+def players_from_html(html: str, low_memory: bool = False) -> list:
+    """Finds the players in the roster table in the html of a team page.
+
+    Only needs the html, so it can run in a worker process.
+
+    Args:
+        html (str) : html of the team page, or of its Roster section
+        low_memory (bool, optional) : free the parsed page right after use
+    Returns:
+        player_infos (list) : list of player info dictionaries, see `get_players`
+    """
+
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     table = soup.find(id="Roster").find_next("table")
 
@@ -221,10 +741,21 @@ def get_players(team_url: str) -> list:
         player = {'name': name, 'url': urljoin(base_url, name_link)}
         players.append(player)
 
+    if low_memory:
+        release(soup)
+
     return players
 
 
-def get_player_stats(player_url: str, team: str) -> dict:
+@traced("extract", size=len)
+def get_player_stats(
+    player_url: str,
+    team: str,
+    fast: bool = True,
+    low_memory: bool = False,
+    section: bool = False,
+    season: str = "2021–22",
+) -> dict:
     """Gets the player stats for a player in a given team
     
     Args:
@@ -232,38 +763,275 @@ def get_player_stats(player_url: str, team: str) -> dict:
             url for the wiki page of player
         team (str): 
             the name of the team the player plays for
+        fast (bool, optional):
+            only parse the career statistics table instead of the whole page
+        low_memory (bool, optional):
+            free the parsed page right after use
+        section (bool, optional):
+            only download the career statistics section
+        season (str, optional):
+            the season to get the stats of, e.g. 2021–22
     Returns:
         stats (dict): 
             dictionary with the keys (at least): points, assists, and rebounds keys
     """
+
+    seasons = get_career_stats(player_url, fast=fast, low_memory=low_memory, section=section)
+
+    return season_stats(seasons, team, season)
+
+
+@traced("extract", size=len)
+async def get_player_stats_async(
+    player_url: str,
+    team: str,
+    fast: bool = True,
+    low_memory: bool = False,
+    season: str = "2021–22",
+    executor: Optional["Executor"] = None,
+) -> dict:
+    """Gets the player stats for a player in a given team, without blocking the event loop.
+
+    Same as `get_player_stats`, but the page is fetched with `get_html_async`,
+    and parsed in an executor.
+
+    Args:
+        player_url (str):
+            url for the wiki page of player
+        team (str):
+            the name of the team the player plays for
+        fast (bool, optional):
+            only parse the career statistics table instead of the whole page
+        low_memory (bool, optional):
+            free the parsed page right after use
+        season (str, optional):
+            the season to get the stats of, e.g. 2021–22
+        executor (concurrent.futures.Executor, optional):
+            where to parse the page, see `get_teams_async`
+    Returns:
+        stats (dict):
+            dictionary with the keys (at least): points, assists, and rebounds keys
+    """
+
+    import asyncio
+
     print(f"Fetching stats for player in {player_url}")
 
-    html = get_html(player_url)
-    soup = BeautifulSoup(html, "html.parser")
-    id_ = re.compile("(NBA_)?[Cc]areer_statistics")
-    #NBA = soup.find(id="NBA")
-    #table = NBA.find_next("table", {"class":"wikitable sortable"})
-    table = soup.find(id=id_).find_next('table').find_next('table')
-    stats = {}
+    html = await get_html_async(player_url)
+    parse = partial(career_stats, html, fast=fast, low_memory=low_memory)
+    seasons = await asyncio.get_running_loop().run_in_executor(executor, parse)
+
+    return season_stats(seasons, team, season)
+
+
+def get_career_stats(
+    player_url: str, fast: bool = True, low_memory: bool = False, section: bool = False
+) -> List[Dict]:
+    """Fetches a player page and parses the stats of every season, see `career_stats`.
+
+    Args:
+        player_url (str):
+            url for the wiki page of player
+        fast (bool, optional):
+            only parse the career statistics table instead of the whole page
+        low_memory (bool, optional):
+            free the parsed page right after use
+        section (bool, optional):
+            only download the career statistics section
+    Returns:
+        seasons (list of dicts):
+            {"season", "team", "points", "assists", "rebounds"} for every season
+    """
+
+    print(f"Fetching stats for player in {player_url}")
+
+    fetch = partial(get_section_html, heading=career_id_re) if section else get_html
+
+    return career_stats(fetch(player_url), fast=fast, low_memory=low_memory)
+
+
+@traced("parse", size=len)
+def career_stats(html: str, fast: bool = True, low_memory: bool = False) -> List[Dict]:
+    """Parses points, assists and rebounds of every season on a player page.
+
+    Only needs the html, so it can run in a worker process of a `Pipeline`.
+
+    Args:
+        html (str):
+            html of the player page
+        fast (bool, optional):
+            only parse the career statistics table instead of the whole page
+        low_memory (bool, optional):
+            free the parsed table right after use
+    Returns:
+        seasons (list of dicts):
+            {"season", "team", "points", "assists", "rebounds"} for every row
+            of the career statistics table, rows without stats are skipped
+    """
+
+    table = find_career_table(html, fast=fast)
+    seasons = []
 
     rows = table.find_all("tr")
     rows = rows[1:]
 
     for row in rows:
         cols = row.find_all("td")
-        season = cols[0].get_text(strip=True)
-        team_ = cols[1].get_text(strip=True)
-        
-        # find relevant stats for season 2021-22
-        if team_.lower() == team.lower() and season.startswith('2021–22'):
-
-            stats['points'] = float(cols[12].get_text(strip=True).strip('*')) # PPG
-            stats['assists'] = float(cols[9].get_text(strip=True).strip('*')) # APG
-            stats['rebounds'] = float(cols[8].get_text(strip=True).strip('*')) # RPG   
-        
+        if len(cols) < 13:
+            continue
+
+        try:
+            seasons.append(
+                {
+                    "season": cols[0].get_text(strip=True),
+                    "team": cols[1].get_text(strip=True),
+                    "points": float(cols[12].get_text(strip=True).strip('*')), # PPG
+                    "assists": float(cols[9].get_text(strip=True).strip('*')), # APG
+                    "rebounds": float(cols[8].get_text(strip=True).strip('*')), # RPG
+                }
+            )
+        except ValueError:
+            continue
+
+    if low_memory:
+        release(table)
+
+    return seasons
+
+
+def season_stats(seasons: List[Dict], team: str, season: str = "2021–22") -> dict:
+    """Picks the stats of a player for one team and season.
+
+    Args:
+        seasons (list of dicts):
+            stats of every season, from `career_stats`
+        team (str):
+            the name of the team the player plays for
+        season (str, optional):
+            the season, e.g. 2021–22
+    Returns:
+        stats (dict):
+            points, assists and rebounds, empty if the player has no such season
+    """
+
+    stats = {}
+
+    for row in seasons:
+        # find relevant stats for the season
+        if row["team"].lower() == team.lower() and row["season"].startswith(season):
+            stats = {key: row[key] for key in ["points", "assists", "rebounds"]}
+
     return stats
 
 
+@traced("parse")
+def find_career_table(html: str, fast: bool = True):
+    """Finds the career statistics table of a player page.
+
+    This is the second table after the career statistics heading.
+    In fast mode the raw html is searched for the heading, and only the
+    table itself is parsed, with lxml if it is installed.
+    Falls back to parsing the whole page if the table can't be found this way.
+
+    Args:
+        html (str):
+            html of the player page
+        fast (bool, optional):
+            only parse the table fragment
+    Returns:
+        table (bs4.element.Tag):
+            the career statistics table
+    """
+
+    from bs4 import BeautifulSoup
+
+    if fast:
+        fragment = find_table_fragment(html, career_id_pat, n=2)
+
+        if fragment is not None:
+            soup = BeautifulSoup(fragment, fast_parser())
+            table = soup.find("table")
+
+            if table is not None:
+                return table
+
+    soup = BeautifulSoup(html, "html.parser")
+    id_ = career_id_re
+    #NBA = soup.find(id="NBA")
+    #table = NBA.find_next("table", {"class":"wikitable sortable"})
+    return soup.find(id=id_).find_next('table').find_next('table')
+
+
+# id of the career statistics heading
+career_id_re = re.compile("(NBA_)?[Cc]areer_statistics")
+# id attribute containing career statistics, same as the id search on the soup
+career_id_pat = re.compile(r"""\bid=["'][^"']*(?:NBA_)?[Cc]areer_statistics""")
+# opening or closing table tag
+table_tag_pat = re.compile(r"<(/?)table\b", flags=re.IGNORECASE)
+
+
+def find_table_fragment(html: str, anchor_pat: re.Pattern, n: int = 1):
+    """Cuts out the raw html of the n-th table after an anchor.
+
+    Tables are counted in document order from the anchor, like repeated
+    calls to bs4's find_next("table"). Scanning stops at the closing tag
+    of the wanted table, so the rest of the page is never looked at.
+
+    Args:
+        html (str):
+            html string to search
+        anchor_pat (re.Pattern):
+            pattern matching the anchor to start from
+        n (int, optional):
+            which table after the anchor to return, counting from 1
+    Returns:
+        fragment (str or None):
+            html of the table, or None if it wasn't found
+    """
+
+    anchor = anchor_pat.search(html)
+    if anchor is None:
+        return None
+
+    count = 0
+    depth = 0
+    start = None
+
+    for tag in table_tag_pat.finditer(html, anchor.end()):
+        closing = tag.group(1) == "/"
+
+        if start is None:
+            if not closing:
+                count += 1
+                if count == n:
+                    start = tag.start()
+                    depth = 1
+            continue
+
+        depth += -1 if closing else 1
+        if depth == 0:
+            end = html.find(">", tag.end())
+            return html[start:end + 1] if end != -1 else None
+
+    return None
+
+
+def fast_parser() -> str:
+    """Returns the fastest installed parser backend for BeautifulSoup.
+
+    Returns:
+        parser (str):
+            "lxml" if lxml is installed, otherwise "html.parser"
+    """
+
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+
+    return "lxml"
+
+
 # run the whole thing if called as a script, for quick testing
 if __name__ == "__main__":
     find_best_players('https://en.wikipedia.org/wiki/2022_NBA_playoffs')
\ No newline at end of file
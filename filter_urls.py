@@ -1,18 +1,78 @@
+import html as html_lib
 import re
+from typing import Optional, Union
 from urllib.parse import urljoin
 
+from tracing import traced
+
 ## -- Task 2 -- ##
 
+# pattern for finding anchor tags in html code
+anchor_pat = re.compile(r"<a[^>]+>", flags=re.IGNORECASE)
+# pattern for finding url in href attribute of anchor tags
+url_pat = re.compile(r'href="([^"]+)"', flags=re.IGNORECASE)
+# pattern for finding img tags, and the src attribute in them
+img_pat = re.compile(r"<img[^>]+>", flags=re.IGNORECASE)
+src_pat = re.compile(r'src="([^"]+)"', flags=re.IGNORECASE)
+# pattern for finding both anchor and img tags in one pass,
+# group 1 is the tag name
+tag_pat = re.compile(r"<(img|a)[^>]+>", flags=re.IGNORECASE)
+# pattern for generalised wikipedia wiki link
+article_pat = re.compile(r"(https*:\/\/)\w{2,3}\.(wikipedia\.org)\/wiki([\/\w+]+)")
+
+
+# html as text, or undecoded, e.g. the bytes of a response or a memory mapped file
+Html = Union[str, bytes, bytearray, memoryview]
+
+
+def bytes_pattern(pattern: re.Pattern) -> re.Pattern:
+    """Compiles the same regex for bytes, matching ascii only like \\w and \\s."""
+
+    return re.compile(pattern.pattern.encode("ascii"), pattern.flags & ~re.UNICODE)
+
+
+# the tag patterns, for scanning undecoded html. The tags and attributes
+# are ascii, so they match the same, and only the matches get decoded
+anchor_pat_bytes = bytes_pattern(anchor_pat)
+img_pat_bytes = bytes_pattern(img_pat)
+
+
+def find_tags(pattern: re.Pattern, html: Html) -> list:
+    """Finds all matches of a tag pattern, in text or undecoded utf-8 html.
+
+    Undecoded html, e.g. bytes or an mmap, is scanned as it is, without
+    decoding or copying the whole document, and only the found tags are decoded.
+
+    Args:
+        pattern (re.Pattern):
+            str pattern of the tags, without groups, e.g. `anchor_pat`
+        html (str or bytes-like):
+            html to search
+    Returns:
+        tags (list of str):
+            the matched tags
+    """
+
+    if isinstance(html, str):
+        return pattern.findall(html)
+
+    patterns = {anchor_pat: anchor_pat_bytes, img_pat: img_pat_bytes}
+    pattern = patterns.get(pattern) or bytes_pattern(pattern)
+
+    return [match.group().decode("utf-8", "replace") for match in pattern.finditer(html)]
+
+
+@traced("extract", size=len)
 def find_urls(
-    html: str,
+    html: Html,
     base_url: str = "https://en.wikipedia.org",
     output: str = None,
 ) -> set:
     """Finds all the url links in a html text using regex.
 
     Args:
-        html (str): 
-            html string to parse
+        html (str or bytes-like): 
+            html string to parse, or undecoded utf-8 html, see `find_tags`
         base_url (str, optional):
 
         output (str, optional): 
@@ -22,14 +82,35 @@ def find_urls(
             set with all the urls found in html text
     """
 
-    # pattern for finding anchor tags in html code
-    anchor_pat = re.compile(r"<a[^>]+>", flags=re.IGNORECASE)
-    # pattern for finding url in href attribute of anchor tags
-    url_pat = re.compile(r'href="([^"]+)"', flags=re.IGNORECASE)
+    urls = urls_in_anchors(find_tags(anchor_pat, html), base_url)
+
+    # write to file
+    if output:
+        print(f"Writing to: {output}")
+        
+        with open(output, 'w') as out:
+            out.write(urls)
+
+    return urls
+
+
+def urls_in_anchors(anchors: list, base_url: str = "https://en.wikipedia.org") -> set:
+    """Gets the urls in the href attributes of anchor tags.
+
+    Args:
+        anchors (list):
+            anchor tags, e.g. '<a href="/wiki/Peace">'
+        base_url (str, optional):
+            base url to add to relative urls
+    Returns:
+        urls (set):
+            the urls, without fragments
+    """
+
     urls = set()
 
     # find all urls in anchor tags
-    for a in anchor_pat.findall(html):
+    for a in anchors:
         url = set(url_pat.findall(a))
         
         for url_ in url:
@@ -43,35 +124,36 @@ def find_urls(
                 else:
                     urls.add(url_)
 
-    # write to file
-    if output:
-        print(f"Writing to: {output}")
-        
-        with open(output, 'w') as out:
-            out.write(urls)
-
     return urls
 
 
-def find_articles(html: str, output=None) -> set:
+def filter_articles(urls: set) -> set:
+    """Keeps the urls that are links to wikipedia articles.
+
+    Args:
+        urls (set):
+            urls to filter
+    Returns:
+        articles (set):
+            the urls to articles
+    """
+
+    return {url for url in urls if article_pat.search(url)}
+
+
+def find_articles(html: Html, output=None) -> set:
     """Finds all the wiki articles inside a html text. Make call to find urls, and filter
     
     Args:
-        - text (str):
-            the html text to parse
+        - text (str or bytes-like):
+            the html text to parse, or undecoded utf-8 html
     Returns:
         - (set): 
             a set with urls to all the articles found
     """
 
     urls = find_urls(html)
-    # pattern for generalised wikipedia wiki link
-    pattern = r"(https*:\/\/)\w{2,3}\.(wikipedia\.org)\/wiki([\/\w+]+)"
-    articles = set()
-    
-    for url in urls:
-        if re.search(pattern, url):
-            articles.add(url)
+    articles = filter_articles(urls)
 
     # write to file
     if output:
@@ -83,12 +165,12 @@ def find_articles(html: str, output=None) -> set:
     return articles
 
 
-def find_img_src(html: str):
+def find_img_src(html: Html):
     """Find all src attributes of img tags in an HTML string.
 
     Args:
-        html (str): 
-            A string containing some HTML.
+        html (str or bytes-like): 
+            A string containing some HTML, or undecoded utf-8 html, see `find_tags`
 
     Returns:
         src_set (set):
@@ -97,14 +179,67 @@ def find_img_src(html: str):
     The set contains every found src attibute of an img tag in the given HTML.
     """
 
-    img_pat = re.compile(r"<img[^>]+>", flags=re.IGNORECASE)
-    src_pat = re.compile(r'src="([^"]+)"', flags=re.IGNORECASE)
+    return srcs_in_img_tags(find_tags(img_pat, html))
+
+
+def srcs_in_img_tags(img_tags: list) -> set:
+    """Gets the src attributes of img tags.
+
+    Args:
+        img_tags (list):
+            img tags, e.g. '<img src="/foo.png">'
+    Returns:
+        src_set (set):
+            the image urls
+    """
+
     src_set = set()
 
-    for img_tag in img_pat.findall(html):
+    for img_tag in img_tags:
         src = set(src_pat.findall(img_tag))
 
         for element in src:
             src_set.add(element)
 
     return src_set
+
+
+def normalize_src(src: str, base_url: str = "https://en.wikipedia.org") -> Optional[str]:
+    """Turns the src attribute of an img tag into the URL to download the image from.
+
+    Relative srcs are resolved against the base url, so protocol relative ones,
+    e.g. //upload.wikimedia.org/..., get its scheme, and html entities are unescaped.
+
+    Args:
+        src (str):
+            src attribute, e.g. '//upload.wikimedia.org/wikipedia/commons/a/a9/Example.jpg'
+        base_url (str, optional):
+            url of the page the img tag is on
+    Returns:
+        url (str or None):
+            the image url, or None for images inlined as data: URLs
+    """
+
+    src = html_lib.unescape(src.strip()).split("#")[0]
+    if not src or src.startswith("data:"):
+        return None
+
+    return urljoin(base_url, src)
+
+
+def image_urls(html: Html, base_url: str = "https://en.wikipedia.org") -> set:
+    """Finds the URLs of all images in an HTML string, see `normalize_src`.
+
+    Args:
+        html (str or bytes-like):
+            A string containing some HTML, or undecoded utf-8 html
+        base_url (str, optional):
+            url of the page, to resolve relative srcs against
+    Returns:
+        urls (set):
+            the image urls
+    """
+
+    urls = (normalize_src(src, base_url) for src in find_img_src(html))
+
+    return {url for url in urls if url is not None}
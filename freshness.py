@@ -0,0 +1,133 @@
+import copy
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from requesting_urls import get_revision_ids
+
+## -- Skipping pages that didn't change since the last run -- ##
+
+
+class RevisionLog:
+    """The last seen revision of every page, and what was scraped from it.
+
+    Kept in a json file between runs. Before a batch run, `check` looks up
+    the current revision of all its pages with a few bulk API requests,
+    and only the pages that changed since their result was recorded
+    need to be fetched and parsed again.
+
+    Results are stored as json, so they must be json compatible,
+    e.g. lists and dicts of strings and numbers.
+    """
+
+    def __init__(self, path: str):
+        """Opens the log, starting an empty one if the file doesn't exist.
+
+        Args:
+            path (str):
+                json file of the log
+        """
+
+        self.path = path
+        self.pages: Dict[str, Dict] = {}
+        # current revision of every checked page, None if it doesn't exist
+        self.current: Dict[str, Optional[int]] = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.pages = json.load(f)["pages"]
+
+    def check(self, urls: Iterable[str]) -> List[str]:
+        """Looks up the current revision of the pages, in bulk.
+
+        Args:
+            urls (iterable of str):
+                URLs of the pages
+        Returns:
+            changed (list):
+                URLs of the pages that are new, changed or missing since the last run
+        """
+
+        urls = list(dict.fromkeys(urls))
+        self.current.update(get_revision_ids(urls))
+
+        return [
+            url
+            for url in urls
+            if self.current[url] is None or self.current[url] != self.pages.get(url, {}).get("revision")
+        ]
+
+    def fresh(self, url: str, kind: str) -> bool:
+        """Tells if a result of the page is recorded for its current revision.
+
+        The page is checked first if it wasn't already.
+
+        Args:
+            url (str):
+                URL of the page
+            kind (str):
+                what was scraped from the page, e.g. "players"
+        """
+
+        if url not in self.current:
+            self.check([url])
+
+        page = self.pages.get(url, {})
+        revision = self.current[url]
+
+        return revision is not None and page.get("revision") == revision and kind in page["results"]
+
+    def get(self, url: str, kind: str) -> Any:
+        """Gets the recorded result of a page, a copy that can be changed freely."""
+
+        return copy.deepcopy(self.pages[url]["results"][kind])
+
+    def put(self, url: str, kind: str, result: Any) -> None:
+        """Records a result of a page, for the revision found by `check`.
+
+        Nothing is recorded if the revision is unknown, so the page is
+        scraped again next time. The results of older revisions are dropped.
+        """
+
+        revision = self.current.get(url)
+        if revision is None:
+            return
+
+        page = self.pages.get(url)
+        if page is None or page["revision"] != revision:
+            page = self.pages[url] = {"revision": revision, "results": {}}
+        page["results"][kind] = json.loads(json.dumps(result))
+
+    def cached(self, url: str, kind: str, scrape: Callable[[str], Any]) -> Any:
+        """Gets the recorded result of a page if it didn't change, otherwise scrapes it.
+
+        Args:
+            url (str):
+                URL of the page
+            kind (str):
+                what is scraped from the page, e.g. "players"
+            scrape (callable):
+                scrapes the result from the URL
+        Returns:
+            result:
+                the result, recorded or new
+        """
+
+        if self.fresh(url, kind):
+            return self.get(url, kind)
+
+        result = scrape(url)
+        self.put(url, kind, result)
+
+        return result
+
+    def save(self) -> None:
+        """Writes the log to its file, replacing the old one atomically."""
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"pages": self.pages}, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
@@ -0,0 +1,249 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from deadlines import request_timeout
+from filter_urls import image_urls
+from requesting_urls import get_html, plain_session
+
+## -- Content addressed image archive -- ##
+
+
+@dataclass
+class DownloadStats:
+    """Data class recording the cost of a batch of image downloads.
+
+    Records images downloaded, images unchanged since they were stored
+    (answered 304 Not Modified), downloads whose content was already stored
+    from another URL, failed downloads, and the bytes downloaded.
+    """
+
+    downloaded: int = 0
+    not_modified: int = 0
+    duplicates: int = 0
+    errors: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+class ImageStore:
+    """On-disk archive of images, stored by the SHA-256 of their content.
+
+    Every distinct image is stored once, in objects/<hash[:2]>/<hash>, however
+    many URLs or pages it is found under. An SQLite index records the hash
+    of every downloaded URL, with its ETag and Last-Modified headers, so
+    images that are already stored are only checked with conditional requests.
+
+    The store can be shared by the download threads.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str):
+        """Opens the store, creating it if it doesn't exist.
+
+        Args:
+            path (str):
+                directory of the store
+        """
+
+        self.path = path
+        os.makedirs(os.path.join(path, "tmp"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched REAL NOT NULL
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS images_sha256 ON images (sha256)")
+        self.db.commit()
+
+    def object_path(self, sha256: str) -> str:
+        """Path of the file of an image with the given content hash."""
+
+        return os.path.join(self.path, "objects", sha256[:2], sha256)
+
+    def get(self, url: str) -> Optional[str]:
+        """Gets the path of the stored image of a URL, None if it isn't stored."""
+
+        with self.lock:
+            row = self.db.execute("SELECT sha256 FROM images WHERE url = ?", (url,)).fetchone()
+
+        if row is None or not os.path.exists(self.object_path(row[0])):
+            return None
+
+        return self.object_path(row[0])
+
+    def session(self):
+        """Gets the requests session of this thread, to reuse its connections.
+
+        The session never goes through an installed requests_cache, which
+        would keep a second copy of every image and answer conditional
+        requests itself.
+        """
+
+        return plain_session()
+
+    def download(self, url: str, stats: Optional[DownloadStats] = None) -> str:
+        """Downloads an image into the store, unless the stored copy is current.
+
+        The body is streamed to a temporary file while it is hashed, then
+        moved to its content addressed path, or dropped if that content
+        is already stored.
+
+        Args:
+            url (str):
+                URL of the image
+            stats (DownloadStats, optional):
+                counters to update
+        Returns:
+            path (str):
+                path of the stored image
+        """
+
+        stats = DownloadStats() if stats is None else stats
+        with self.lock:
+            known = self.db.execute(
+                "SELECT sha256, etag, last_modified FROM images WHERE url = ?", (url,)
+            ).fetchone()
+
+        headers = {}
+        if known is not None and os.path.exists(self.object_path(known[0])):
+            if known[1]:
+                headers["If-None-Match"] = known[1]
+            if known[2]:
+                headers["If-Modified-Since"] = known[2]
+
+        timeout = request_timeout()
+        with self.session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304 and headers:
+                with self.lock:
+                    stats.not_modified += 1
+                return self.object_path(known[0])
+            response.raise_for_status()
+
+            digest = hashlib.sha256()
+            size = 0
+            with tempfile.NamedTemporaryFile(dir=os.path.join(self.path, "tmp"), delete=False) as f:
+                try:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                except BaseException:
+                    f.close()
+                    os.remove(f.name)
+                    raise
+
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256)
+            if os.path.exists(path):
+                os.remove(f.name)
+                duplicate = True
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(f.name, path)
+                duplicate = False
+
+            with self.lock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        sha256,
+                        size,
+                        response.headers.get("Content-Type"),
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                        time.time(),
+                    ),
+                )
+                self.db.commit()
+                stats.downloaded += 1
+                stats.bytes += size
+                stats.duplicates += duplicate
+
+        return path
+
+    def download_all(self, urls: Iterable[str], max_workers: int = 8) -> DownloadStats:
+        """Downloads many images concurrently, each distinct URL once.
+
+        Failed downloads are counted in the stats, the rest carry on.
+
+        Args:
+            urls (iterable of str):
+                image URLs, e.g. from `filter_urls.image_urls`
+            max_workers (int, optional):
+                number of download threads
+        Returns:
+            stats (DownloadStats):
+                what was downloaded
+        """
+
+        stats = DownloadStats()
+        start = time.perf_counter()
+
+        def download(url):
+            try:
+                self.download(url, stats)
+            except Exception as e:
+                print(f"Failed to download {url}: {e}")
+                with self.lock:
+                    stats.errors += 1
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(download, dict.fromkeys(urls)))
+
+        stats.seconds = time.perf_counter() - start
+
+        return stats
+
+    def archive_pages(self, page_urls: Iterable[str], max_workers: int = 8) -> Dict[str, set]:
+        """Downloads the images of every page, each distinct image once.
+
+        Args:
+            page_urls (iterable of str):
+                URLs of the pages
+            max_workers (int, optional):
+                number of threads fetching pages and downloading images
+        Returns:
+            images (dict):
+                the image URLs of every page, see `get` for where they are stored
+        """
+
+        page_urls = list(dict.fromkeys(page_urls))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            htmls = pool.map(get_html, page_urls)
+            images = {url: image_urls(html, base_url=url) for url, html in zip(page_urls, htmls)}
+
+        stats = self.download_all(
+            (url for urls in images.values() for url in urls), max_workers=max_workers
+        )
+        print(
+            f"{stats.downloaded} images downloaded ({stats.duplicates} duplicates),"
+            f" {stats.not_modified} not modified, {stats.errors} errors"
+        )
+
+        return images
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COUNT(DISTINCT sha256) FROM images").fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the index."""
+
+        self.db.close()
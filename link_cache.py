@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+## -- Persistent link graph cache -- ##
+
+
+class LinkCache:
+    """On-disk cache of the links of crawled articles, stored in SQLite.
+
+    Records the outgoing links of every article (kind "links"), and optionally
+    the incoming links found through backlink pages (kind "backlinks"),
+    along with when they were fetched and the page revision if known.
+    Entries older than `max_age` are treated as missing, so they get
+    refetched, and the least recently used pages are evicted once the
+    cache holds more than `max_pages` pages.
+
+    The cache can be shared by the worker threads of a search. Reads don't
+    write to the database: when pages were last used is kept in memory, and
+    written along with the next `put`, `prune` or `close`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_pages: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ):
+        """Opens the cache, creating it if it doesn't exist.
+
+        Args:
+            path (str):
+                path of the SQLite database
+            max_pages (int, optional):
+                how many pages to keep at most
+            max_age (float, optional):
+                seconds before a page is considered stale
+        """
+
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        # when pages were read, by (url, kind), not written to the database yet
+        self.used: Dict[Tuple[str, str], float] = {}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fetched REAL NOT NULL,
+                used REAL NOT NULL,
+                revision INTEGER,
+                links TEXT NOT NULL,
+                PRIMARY KEY (url, kind)
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+        self.db.commit()
+
+    def get(self, url: str, kind: str = "links") -> Optional[Set[str]]:
+        """Gets the cached links of an article.
+
+        Args:
+            url (str):
+                URL of the article
+            kind (str, optional):
+                "links" or "backlinks"
+        Returns:
+            links (set or None):
+                the links, or None if not cached or stale
+        """
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT fetched, links FROM pages WHERE url = ? AND kind = ?",
+                (url, kind),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            fetched, links = row
+            now = time.time()
+            if self.max_age is not None and now - fetched > self.max_age:
+                return None
+
+            self.used[url, kind] = now
+
+        return set(links.split("\n")) if links else set()
+
+    def write_used(self) -> None:
+        """Writes when the pages read since the last write were used, with the lock held."""
+
+        self.db.executemany(
+            "UPDATE pages SET used = ? WHERE url = ? AND kind = ?",
+            [(used, url, kind) for (url, kind), used in self.used.items()],
+        )
+        self.used.clear()
+
+    def put(
+        self,
+        url: str,
+        links: Iterable[str],
+        kind: str = "links",
+        revision: Optional[int] = None,
+    ) -> None:
+        """Stores the links of an article, replacing what was cached before.
+
+        Args:
+            url (str):
+                URL of the article
+            links (iterable of str):
+                the links of the article
+            kind (str, optional):
+                "links" or "backlinks"
+            revision (int, optional):
+                the revision of the page the links were found in
+        """
+
+        now = time.time()
+        with self.lock:
+            self.write_used()
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, kind, now, now, revision, "\n".join(sorted(links))),
+            )
+            if self.max_pages is not None:
+                self.db.execute(
+                    """DELETE FROM pages WHERE rowid IN (
+                        SELECT rowid FROM pages ORDER BY used DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_pages,),
+                )
+            self.db.commit()
+
+    def degree(self, url: str, kind: str = "links") -> int:
+        """Counts the cached links of an article, without marking it as used.
+
+        Args:
+            url (str):
+                URL of the article
+            kind (str, optional):
+                "links" or "backlinks"
+        Returns:
+            count (int):
+                number of links, 0 if not cached
+        """
+
+        with self.lock:
+            row = self.db.execute(
+                """SELECT length(links) - length(replace(links, char(10), '')) + (links != '')
+                FROM pages WHERE url = ? AND kind = ?""",
+                (url, kind),
+            ).fetchone()
+
+        return 0 if row is None else row[0]
+
+    def revision(self, url: str, kind: str = "links") -> Optional[int]:
+        """Gets the revision the cached links of an article were found in.
+
+        Args:
+            url (str):
+                URL of the article
+            kind (str, optional):
+                "links" or "backlinks"
+        Returns:
+            revision (int or None):
+                the revision, or None if unknown
+        """
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT revision FROM pages WHERE url = ? AND kind = ?", (url, kind)
+            ).fetchone()
+
+        return None if row is None else row[0]
+
+    def prune(self) -> int:
+        """Deletes all stale pages.
+
+        Returns:
+            count (int):
+                number of pages deleted
+        """
+
+        if self.max_age is None:
+            return 0
+
+        with self.lock:
+            self.write_used()
+            cursor = self.db.execute(
+                "DELETE FROM pages WHERE fetched < ?", (time.time() - self.max_age,)
+            )
+            self.db.commit()
+
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self) -> None:
+        """Writes when the pages were last used, and closes the database."""
+
+        with self.lock:
+            self.write_used()
+            self.db.commit()
+        self.db.close()
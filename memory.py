@@ -0,0 +1,150 @@
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+## -- Memory use of the scrapers -- ##
+
+
+def release(node) -> None:
+    """Frees the whole BeautifulSoup tree a tag or soup is part of, right away.
+
+    The tags of a tree refer to each other in cycles, so a tree that is no
+    longer used is only freed when the garbage collector gets to it. Tearing
+    it down with decompose frees it as soon as the last reference is gone.
+    Nothing in the tree can be used afterwards.
+
+    Args:
+        node (bs4.element.Tag):
+            any tag of the tree, or the soup itself
+    """
+
+    while node.parent is not None:
+        node = node.parent
+
+    # the soup itself isn't linked to its first element, so decomposing
+    # only the soup would leave the rest of the tree in place
+    for child in list(node.contents):
+        child.decompose()
+    node.decompose()
+
+
+def peak_rss(children: bool = False) -> Optional[int]:
+    """Gets the peak resident memory of this process, in bytes.
+
+    Args:
+        children (bool, optional):
+            get the largest peak of the finished child processes instead,
+            e.g. the parser processes of a `Pipeline`
+    Returns:
+        peak (int or None):
+            the peak, or None if it can't be measured on this platform
+    """
+
+    if resource is None:
+        return None
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+
+    # kilobytes on linux, bytes on mac
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class MemoryReport:
+    """Memory use of a block of code, see `memory_report`."""
+
+    peak: int = 0
+    top: List[Tuple[str, int, int]] = field(default_factory=list)
+    rss: Optional[int] = None
+    children_rss: Optional[int] = None
+    limit: int = 10
+    # traced memory when `top` was taken
+    sampled: int = -1
+    active: bool = False
+
+    def sample(self) -> None:
+        """Records the top allocating lines if more memory is in use than at the last sample.
+
+        Call it where memory use is likely highest, e.g. after each page of a batch.
+        """
+
+        if not self.active or not tracemalloc.is_tracing():
+            return
+
+        current, _ = tracemalloc.get_traced_memory()
+        if current <= self.sampled:
+            return
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        self.sampled = current
+        self.top = [
+            (str(stat.traceback), stat.size, stat.count)
+            for stat in snapshot.statistics("lineno")[: self.limit]
+        ]
+
+    def __str__(self) -> str:
+        def mib(size):
+            return "unknown" if size is None else f"{size / 2**20:.1f} MiB"
+
+        lines = [
+            f"peak traced memory: {mib(self.peak)}",
+            f"peak RSS: {mib(self.rss)}, of child processes: {mib(self.children_rss)}",
+            f"top allocations, with {mib(self.sampled)} in use:",
+        ]
+        lines += [f"  {mib(size)} in {count} blocks at {where}" for where, size, count in self.top]
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def memory_report(top: int = 10, enabled: bool = True) -> Iterator[MemoryReport]:
+    """Measures the memory use of the body of the with statement.
+
+    Python allocations are traced with tracemalloc, which slows down
+    allocation heavy code, so this is for diagnosing rather than every run.
+    The report is filled in when the with statement ends.
+
+    Args:
+        top (int, optional):
+            how many of the lines allocating the most memory to report
+        enabled (bool, optional):
+            measure nothing if False, so callers need no separate code path
+    Yields:
+        report (MemoryReport):
+            peak traced memory, the top allocating lines at the sample with
+            the most memory in use (see `MemoryReport.sample`, the end of the
+            block is always sampled), and the peak RSS of the process and
+            its finished child processes
+    """
+
+    report = MemoryReport(limit=top, active=enabled)
+    if not enabled:
+        yield report
+        return
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    try:
+        yield report
+    finally:
+        _, report.peak = tracemalloc.get_traced_memory()
+        report.sample()
+        if started:
+            tracemalloc.stop()
+
+        report.rss = peak_rss()
+        report.children_rss = peak_rss(children=True)
@@ -0,0 +1,503 @@
+import gzip
+import json
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+## -- Offline wiki race over a pagelinks dump -- ##
+
+# one row of the page table: (page_id, page_namespace, 'page_title', ...
+page_row_pat = re.compile(r"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)'")
+# one row of the pagelinks table: (pl_from, pl_namespace, 'pl_title', pl_from_namespace)
+link_row_pat = re.compile(r"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)',(-?\d+)\)")
+# one row of the pagelinks table since 2024: (pl_from, pl_from_namespace, pl_target_id)
+target_link_row_pat = re.compile(r"\((\d+),(-?\d+),(\d+)\)")
+# one row of the linktarget table: (lt_id, lt_namespace, 'lt_title')
+target_row_pat = re.compile(r"\((\d+),(-?\d+),'((?:[^'\\]|\\.)*)'\)")
+# backslash escapes in sql strings
+escape_pat = re.compile(r"\\(.)")
+
+# characters left as they are in article URLs, like wikipedia does
+url_safe = "/:(),'!*@$;"
+
+# rows of edges written to disk at a time while building
+chunk_size = 1_000_000
+
+
+def open_dump(path: str):
+    """Opens a dump file for reading as text, gzipped or not."""
+
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_pages(pages_path: str) -> Dict[int, str]:
+    """Reads the ids and titles of all articles in a page dump.
+
+    Args:
+        pages_path (str):
+            page table as an sql dump, or tsv with lines `id<tab>title`
+    Returns:
+        titles (dict):
+            title of every article (namespace 0), by page id
+    """
+
+    titles = {}
+
+    with open_dump(pages_path) as f:
+        if ".sql" in pages_path:
+            for line in f:
+                if not line.startswith("INSERT INTO"):
+                    continue
+                for page_id, namespace, title in page_row_pat.findall(line):
+                    if namespace == "0":
+                        titles[int(page_id)] = escape_pat.sub(r"\1", title)
+        else:
+            for line in f:
+                page_id, _, title = line.rstrip("\n").partition("\t")
+                titles[int(page_id)] = title
+
+    return titles
+
+
+def read_link_targets(targets_path: str) -> Dict[int, str]:
+    """Reads the ids and titles of all article link targets in a linktarget dump.
+
+    Args:
+        targets_path (str):
+            linktarget table as an sql dump
+    Returns:
+        titles (dict):
+            title of every link target in namespace 0, by link target id
+    """
+
+    titles = {}
+
+    with open_dump(targets_path) as f:
+        for line in f:
+            if not line.startswith("INSERT INTO"):
+                continue
+            for target_id, namespace, title in target_row_pat.findall(line):
+                if namespace == "0":
+                    titles[int(target_id)] = escape_pat.sub(r"\1", title)
+
+    return titles
+
+
+def read_links(
+    links_path: str, pages_path: Optional[str] = None, targets_path: Optional[str] = None
+) -> Iterator[Tuple[str, str]]:
+    """Streams the links between articles in a pagelinks dump, line by line.
+
+    Both layouts of the sql dump are read. The old one has the title of
+    the linked page in every row. The current one, since 2024, has the id
+    of a row of the linktarget table instead, so it needs that dump too.
+
+    Args:
+        links_path (str):
+            pagelinks table as an sql dump, which needs `pages_path`
+            to look up the titles of the linking pages,
+            or tsv with lines `from title<tab>to title`
+        pages_path (str, optional):
+            page dump, see `read_pages`
+        targets_path (str, optional):
+            linktarget dump, for the current layout, see `read_link_targets`
+    Yields:
+        from_title, to_title (tuple):
+            one link between two articles
+    """
+
+    titles = read_pages(pages_path) if pages_path is not None else None
+
+    with open_dump(links_path) as f:
+        if ".sql" in links_path:
+            if titles is None:
+                raise ValueError("An sql pagelinks dump needs the page dump as well")
+
+            targets = None
+            for line in f:
+                if not line.startswith("INSERT INTO"):
+                    # the table definition comes before the rows
+                    if "`pl_target_id`" in line and targets is None:
+                        if targets_path is None:
+                            raise ValueError(
+                                "This pagelinks dump links to linktarget ids, "
+                                "it needs the linktarget dump as well"
+                            )
+                        targets = read_link_targets(targets_path)
+                    continue
+
+                if targets is not None:
+                    for from_id, from_namespace, target_id in target_link_row_pat.findall(line):
+                        from_title = titles.get(int(from_id))
+                        to_title = targets.get(int(target_id))
+                        if from_namespace == "0" and None not in (from_title, to_title):
+                            yield from_title, to_title
+                    continue
+
+                for from_id, namespace, title, from_namespace in link_row_pat.findall(line):
+                    from_title = titles.get(int(from_id))
+                    if namespace == "0" and from_namespace == "0" and from_title is not None:
+                        yield from_title, escape_pat.sub(r"\1", title)
+        else:
+            for line in f:
+                from_title, _, to_title = line.rstrip("\n").partition("\t")
+                if to_title:
+                    yield from_title, to_title
+
+
+def edge_chunks(edges_path: str, new_id: np.ndarray) -> Iterator[np.ndarray]:
+    """Reads the edges written by `build_graph`, chunk_size at a time, renumbered by new_id."""
+
+    with open(edges_path, "rb") as f:
+        while True:
+            chunk = np.fromfile(f, dtype=np.int32, count=2 * chunk_size)
+            if not len(chunk):
+                return
+            yield new_id[chunk.reshape(-1, 2)]
+
+
+def write_csr(
+    edges_path: str, new_id: np.ndarray, out_dir: str, prefix: str, src: int, dst: int
+) -> None:
+    """Sorts the edges into CSR arrays, without ever holding all of them in memory.
+
+    A counting sort: the edges of every node are counted in one pass over
+    the edges, and put in place in a memory mapped array in a second. Then
+    the rows are sorted and their duplicate edges dropped, a block of rows
+    of at most chunk_size edges at a time. Memory stays bounded by the
+    number of nodes plus chunk_size, however many edges there are.
+    """
+
+    n = len(new_id)
+    counts = np.zeros(n, dtype=np.int64)
+    for edges in edge_chunks(edges_path, new_id):
+        counts += np.bincount(edges[:, src], minlength=n)
+
+    raw_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=raw_indptr[1:])
+    raw_path = os.path.join(out_dir, f"{prefix}raw.tmp")
+    raw = np.memmap(raw_path, dtype=np.int32, mode="w+", shape=(max(int(raw_indptr[-1]), 1),))
+
+    # next free position in every row
+    fill = raw_indptr[:-1].copy()
+    for edges in edge_chunks(edges_path, new_id):
+        order = np.argsort(edges[:, src], kind="stable")
+        rows = edges[order, src]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        sizes = np.diff(np.r_[starts, len(rows)])
+        rank = np.arange(len(rows)) - np.repeat(starts, sizes)
+        raw[fill[rows] + rank] = edges[order, dst]
+        fill[rows[starts]] += sizes
+    del fill
+
+    # sorted rows without duplicates, appended to a file
+    indices_path = os.path.join(out_dir, f"{prefix}indices.tmp")
+    start = 0
+    with open(indices_path, "wb") as out:
+        while start < n:
+            end = int(np.searchsorted(raw_indptr, raw_indptr[start] + chunk_size, side="right")) - 1
+            end = min(max(end, start + 1), n)
+            block = raw[raw_indptr[start]:raw_indptr[end]]
+            rows = np.repeat(np.arange(end - start, dtype=np.int64), counts[start:end])
+            keys = np.unique(rows << 32 | block)
+            (keys & 0xFFFFFFFF).astype(np.int32).tofile(out)
+            counts[start:end] = np.bincount(keys >> 32, minlength=end - start)
+            start = end
+    del raw
+    os.remove(raw_path)
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    np.save(os.path.join(out_dir, f"{prefix}indptr.npy"), indptr)
+
+    indices = np.lib.format.open_memmap(
+        os.path.join(out_dir, f"{prefix}indices.npy"),
+        mode="w+",
+        dtype=np.int32,
+        shape=(int(indptr[-1]),),
+    )
+    with open(indices_path, "rb") as f:
+        for start in range(0, len(indices), chunk_size):
+            indices[start:start + chunk_size] = np.fromfile(f, dtype=np.int32, count=chunk_size)
+    indices.flush()
+    del indices
+    os.remove(indices_path)
+
+
+def build_graph(
+    links_path: str,
+    out_dir: str,
+    pages_path: Optional[str] = None,
+    base_url: str = "https://en.wikipedia.org",
+    targets_path: Optional[str] = None,
+) -> None:
+    """Builds a compressed sparse row graph of a pagelinks dump.
+
+    The dump is streamed once. Titles get ids as they are seen, and edges
+    are written to disk in chunks. The titles are then sorted, so an id is
+    the position of its title in sorted order, and the edges are sorted
+    into CSR arrays of outgoing and incoming links, see `write_csr`.
+    Only the titles are held in memory, not the edges.
+
+    Writes to `out_dir`:
+
+    - titles.npy, title_offsets.npy: the utf-8 titles, in sorted order
+    - indptr.npy, indices.npy: outgoing links of every article
+    - rev_indptr.npy, rev_indices.npy: incoming links of every article
+    - meta.json: base url of the wiki
+
+    Args:
+        links_path (str):
+            pagelinks dump, see `read_links`
+        out_dir (str):
+            directory to write the graph to
+        pages_path (str, optional):
+            page dump, see `read_pages`
+        base_url (str, optional):
+            wiki the dump is from, used for the URLs of found paths
+        targets_path (str, optional):
+            linktarget dump, for pagelinks dumps of the current layout, see `read_links`
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    edges_path = os.path.join(out_dir, "edges.tmp")
+    ids = {}
+    chunk = []
+
+    def title_id(title):
+        id_ = ids.get(title)
+        if id_ is None:
+            id_ = ids[title] = len(ids)
+        return id_
+
+    with open(edges_path, "wb") as edges:
+        for from_title, to_title in read_links(links_path, pages_path, targets_path):
+            chunk.append(title_id(from_title))
+            chunk.append(title_id(to_title))
+            if len(chunk) >= 2 * chunk_size:
+                np.asarray(chunk, dtype=np.int32).tofile(edges)
+                chunk = []
+        np.asarray(chunk, dtype=np.int32).tofile(edges)
+
+    # renumber so ids follow sorted title order
+    titles = sorted(ids, key=lambda title: title.encode("utf-8"))
+    new_id = np.empty(len(titles), dtype=np.int32)
+    new_id[[ids[title] for title in titles]] = np.arange(len(titles), dtype=np.int32)
+    del ids
+
+    encoded = [title.encode("utf-8") for title in titles]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(title) for title in encoded], out=offsets[1:])
+    np.save(os.path.join(out_dir, "titles.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(out_dir, "title_offsets.npy"), offsets)
+    del encoded, titles
+
+    for prefix, src, dst in [("", 0, 1), ("rev_", 1, 0)]:
+        write_csr(edges_path, new_id, out_dir, prefix, src, dst)
+    os.remove(edges_path)
+
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"base_url": base_url}, f)
+
+
+class OfflineGraph:
+    """A link graph built by `build_graph`, memory mapped from disk.
+
+    Loading only maps the arrays, so it is near instant regardless of size,
+    and pages of the arrays are read from disk as the searches touch them.
+    """
+
+    def __init__(self, graph_dir: str):
+        """Loads a graph.
+
+        Args:
+            graph_dir (str):
+                directory written by `build_graph`
+        """
+
+        def load(name):
+            return np.load(os.path.join(graph_dir, name), mmap_mode="r")
+
+        self.titles = load("titles.npy")
+        self.title_offsets = load("title_offsets.npy")
+        self.indptr = load("indptr.npy")
+        self.indices = load("indices.npy")
+        self.rev_indptr = load("rev_indptr.npy")
+        self.rev_indices = load("rev_indices.npy")
+
+        with open(os.path.join(graph_dir, "meta.json")) as f:
+            self.base_url = json.load(f)["base_url"]
+
+    def __len__(self) -> int:
+        return len(self.title_offsets) - 1
+
+    def title(self, id_: int) -> str:
+        """Gets the title of an article id."""
+
+        start, end = self.title_offsets[id_], self.title_offsets[id_ + 1]
+        return self.titles[start:end].tobytes().decode("utf-8")
+
+    def title_id(self, title: str) -> Optional[int]:
+        """Finds the id of a title by binary search over the sorted titles.
+
+        Args:
+            title (str):
+                article title, with underscores for spaces
+        Returns:
+            id_ (int or None):
+                id of the article, or None if it isn't in the graph
+        """
+
+        key = title.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = self.title_offsets[mid], self.title_offsets[mid + 1]
+            if self.titles[start:end].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < len(self) and self.title(lo) == title:
+            return lo
+
+        return None
+
+    def url(self, id_: int) -> str:
+        """Gets the article URL of an article id."""
+
+        return f"{self.base_url}/wiki/{quote(self.title(id_), safe=url_safe)}"
+
+    def url_id(self, url: str) -> int:
+        """Gets the id of an article URL, raising ValueError if it is unknown."""
+
+        title = unquote(url.split("/wiki/", 1)[1])
+        id_ = self.title_id(title)
+        if id_ is None:
+            raise ValueError(f"{url} is not in the graph")
+
+        return id_
+
+    def find_path(self, start: str, finish: str) -> List[str]:
+        """Finds the shortest path from `start` to `finish` in the graph.
+
+        Searches breadth first from both ends, expanding the smaller frontier
+        a whole level at a time with array operations.
+
+        Args:
+            start (str):
+                wikipedia article URL to start from
+            finish (str):
+                wikipedia article URL to stop at
+        Returns:
+            urls (list[str]):
+                URLs of the path, in the same form as `wiki_race_challenge.find_path`
+        """
+
+        source = self.url_id(start)
+        target = self.url_id(finish)
+
+        # parent of every visited article, -1 if not visited
+        forward = np.full(len(self), -1, dtype=np.int32)
+        backward = np.full(len(self), -1, dtype=np.int32)
+        forward[source] = source
+        backward[target] = target
+        forward_frontier = np.array([source], dtype=np.int32)
+        backward_frontier = np.array([target], dtype=np.int32)
+        meet = source if source == target else None
+
+        while meet is None and len(forward_frontier) and len(backward_frontier):
+            if len(forward_frontier) <= len(backward_frontier):
+                meet, forward_frontier = expand_level(
+                    forward_frontier, self.indptr, self.indices, forward, backward
+                )
+            else:
+                meet, backward_frontier = expand_level(
+                    backward_frontier, self.rev_indptr, self.rev_indices, backward, forward
+                )
+
+        if meet is None:
+            raise ValueError(f"No path found from {start} to {finish}")
+
+        ids = [meet]
+        while ids[-1] != source:
+            ids.append(int(forward[ids[-1]]))
+        ids.reverse()
+        while ids[-1] != target:
+            ids.append(int(backward[ids[-1]]))
+
+        path = [self.url(id_) for id_ in ids]
+        path[0], path[-1] = start, finish
+
+        return path
+
+
+def expand_level(
+    frontier: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    parents: np.ndarray,
+    other: np.ndarray,
+) -> Tuple[Optional[int], np.ndarray]:
+    """Expands one level of a breadth first search.
+
+    Args:
+        frontier (np.ndarray): ids of the articles to expand
+        indptr, indices (np.ndarray): CSR arrays of the links to follow
+        parents (np.ndarray): parent pointers of this search, updated in place
+        other (np.ndarray): parent pointers of the search from the other end
+    Returns:
+        meet, next_frontier (tuple):
+            an article both searches have reached, or None,
+            and the articles reached for the first time
+    """
+
+    starts = indptr[frontier]
+    lengths = indptr[frontier + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return None, np.empty(0, dtype=np.int32)
+
+    # positions in `indices` of the links of every frontier article
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    links = np.asarray(indices[offsets + np.arange(total)])
+    sources = np.repeat(frontier, lengths)
+
+    new = parents[links] == -1
+    links, first = np.unique(links[new], return_index=True)
+    parents[links] = sources[new][first]
+
+    met = links[other[links] != -1]
+    if len(met):
+        return int(met[0]), links
+
+    return None, links
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline wiki race over a pagelinks dump")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a graph from a dump")
+    build.add_argument("links")
+    build.add_argument("graph_dir")
+    build.add_argument("--pages")
+    build.add_argument("--link-targets", help="linktarget dump, for current pagelinks dumps")
+    build.add_argument("--base-url", default="https://en.wikipedia.org")
+    path = commands.add_parser("path", help="find a path in a built graph")
+    path.add_argument("graph_dir")
+    path.add_argument("start")
+    path.add_argument("finish")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_graph(args.links, args.graph_dir, args.pages, args.base_url, args.link_targets)
+    else:
+        print("\n".join(OfflineGraph(args.graph_dir).find_path(args.start, args.finish)))
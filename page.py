@@ -0,0 +1,142 @@
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from collect_dates import find_dates
+from filter_urls import filter_articles, srcs_in_img_tags, tag_pat, urls_in_anchors
+from requesting_urls import get_html
+
+if TYPE_CHECKING:
+    import bs4
+
+## -- One parse per page -- ##
+
+
+class Page:
+    """A fetched html document, and the facts found in it.
+
+    Every fact is computed the first time it is accessed, and then kept.
+    `links`, `articles` and `images` share a single regex pass over the tags
+    of the page, and `text` and `tables` share a single BeautifulSoup parse,
+    so pipelines needing several facts about a page only pay for each once.
+    """
+
+    def __init__(
+        self,
+        html: str,
+        url: Optional[str] = None,
+        base_url: str = "https://en.wikipedia.org",
+    ):
+        """Wraps an html document.
+
+        Args:
+            html (str):
+                html of the page
+            url (str, optional):
+                where the page was fetched from
+            base_url (str, optional):
+                base url to add to relative links
+        """
+
+        self.html = html
+        self.url = url
+        self.base_url = base_url
+
+    @classmethod
+    def fetch(cls, url: str, params: Optional[Dict] = None, **kwargs) -> "Page":
+        """Fetches a page with `get_html`.
+
+        Args:
+            url (str):
+                the URL to retrieve
+            params (dict, optional):
+                URL parameters to add
+            **kwargs:
+                passed on to `Page`
+        Returns:
+            page (Page):
+                the fetched page
+        """
+
+        return cls(get_html(url, params=params), url=url, **kwargs)
+
+    @cached_property
+    def tags(self) -> Dict[str, List[str]]:
+        """The anchor and img tags of the page, found in one pass.
+
+        Returns:
+            tags (dict):
+                {"a": [anchor tags], "img": [img tags]}
+        """
+
+        tags = {"a": [], "img": []}
+        for match in tag_pat.finditer(self.html):
+            tags[match.group(1).lower()].append(match.group(0))
+
+        return tags
+
+    @cached_property
+    def links(self) -> set:
+        """All urls linked to, as by `filter_urls.find_urls`."""
+
+        return urls_in_anchors(self.tags["a"], self.base_url)
+
+    @cached_property
+    def articles(self) -> set:
+        """All wikipedia articles linked to, as by `filter_urls.find_articles`."""
+
+        return filter_articles(self.links)
+
+    @cached_property
+    def images(self) -> set:
+        """All image srcs, as by `filter_urls.find_img_src`."""
+
+        return srcs_in_img_tags(self.tags["img"])
+
+    @cached_property
+    def dates(self) -> list:
+        """All dates, as by `collect_dates.find_dates`."""
+
+        return find_dates(self.html)
+
+    @cached_property
+    def soup(self) -> "bs4.BeautifulSoup":
+        """The page parsed by BeautifulSoup."""
+
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(self.html, "html.parser")
+
+    @cached_property
+    def text(self) -> str:
+        """The text of the page, without tags."""
+
+        return self.soup.get_text()
+
+    @cached_property
+    def tables(self) -> List["bs4.element.Tag"]:
+        """All tables of the page."""
+
+        return self.soup.find_all("table")
+
+    def table_after(self, id_, n: int = 1, **attrs) -> "bs4.element.Tag":
+        """Finds the n-th table after the element with the given id.
+
+        Args:
+            id_ (str or re.Pattern):
+                id of the element, e.g. a section heading like "Calendar"
+            n (int, optional):
+                which table after the element, counting from 1
+            **attrs:
+                attributes the table must have, e.g. class_="wikitable sortable"
+        Returns:
+            table (bs4.element.Tag or None):
+                the table, or None if it isn't found
+        """
+
+        element = self.soup.find(id=id_)
+        for _ in range(n):
+            if element is None:
+                return None
+            element = element.find_next("table", **attrs)
+
+        return element
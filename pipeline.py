@@ -0,0 +1,334 @@
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from deadlines import check_deadline, fetch_context, fetch_context_set, time_left
+
+## -- Fetch/parse pipeline -- ##
+
+
+@dataclass
+class StageMetrics:
+    """Counters of one stage of a `Pipeline`.
+
+    `busy` is the time spent in the stage function, summed over all workers,
+    and `max_depth` the most items seen waiting in the queue in front of the stage.
+    """
+
+    name: str
+    items: int = 0
+    errors: int = 0
+    busy: float = 0.0
+    depth: int = 0
+    max_depth: int = 0
+
+    def waiting(self, depth: int) -> None:
+        """Records the current depth of the queue in front of the stage."""
+
+        self.depth = depth
+        self.max_depth = max(self.max_depth, depth)
+
+
+def timed(func: Callable, arg: Any) -> Tuple[Any, float]:
+    """Calls func(arg), returning the result and the seconds it took.
+
+    Runs in the parse worker processes, so the parse time excludes
+    the time spent waiting for a free worker and pickling.
+    """
+
+    start = time.perf_counter()
+    result = func(arg)
+
+    return result, time.perf_counter() - start
+
+
+# marks the end of a queue
+done = object()
+
+
+class Pipeline:
+    """Fetches items in I/O threads and parses them in worker processes.
+
+    Fetching is mostly waiting on the network, and runs in threads.
+    Parsing with BeautifulSoup is CPU-bound and holds the GIL, so the fetched
+    html is handed over a bounded queue to a pool of parser processes.
+    At most `max_pending` items are between being read from the input and
+    being yielded to the caller at any time, so a slow stage, or a slow
+    caller, holds back the stages before it instead of filling memory.
+
+    The parse function must be picklable, e.g. a module level function,
+    as do its input and output. The fetch function can be anything.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Any], Any],
+        parse: Callable[[Any], Any],
+        threads: int = 8,
+        processes: Optional[int] = None,
+        max_pending: int = 32,
+        ordered: bool = True,
+        errors: str = "raise",
+    ):
+        """Sets up a pipeline.
+
+        Args:
+            fetch (callable):
+                gets the raw data of an item, e.g. the html of a URL
+            parse (callable):
+                turns the raw data into the result
+            threads (int, optional):
+                number of fetch threads
+            processes (int, optional):
+                number of parser processes, one per cpu if not given,
+                0 parses in a thread of this process instead
+            max_pending (int, optional):
+                most items in the pipeline at once
+            ordered (bool, optional):
+                yield results in input order, otherwise as they complete
+            errors (str, optional):
+                "raise" raises the first exception from fetching or parsing
+                an item and cancels the run, "return" yields the exception
+                as the result of the item and carries on
+        """
+
+        self.fetch = fetch
+        self.parse = parse
+        self.threads = threads
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.max_pending = max(max_pending, 1)
+        self.ordered = ordered
+        self.errors = errors
+        self.metrics = {"fetch": StageMetrics("fetch"), "parse": StageMetrics("parse")}
+        self.seconds = 0.0
+        self.cancelled = threading.Event()
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """Runs the pipeline over the items.
+
+        The first exception raised while fetching or parsing an item is raised
+        here, and cancels the rest of the run, unless errors="return".
+        Closing the iterator also cancels the run, and exceptions raised
+        while reading the items are always raised.
+
+        The fetch threads share the deadline and hedging of the caller, see
+        `deadlines`. When the deadline passes, `DeadlineExceeded` is raised
+        here and the run is cancelled, even if a fetch is still waiting.
+
+        Args:
+            items (iterable):
+                items to fetch, read lazily
+        Yields:
+            item, result (tuple):
+                every item with its parsed result
+        """
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.cancelled.clear()
+        self.metrics = {"fetch": StageMetrics("fetch"), "parse": StageMetrics("parse")}
+        slots = threading.Semaphore(self.max_pending)
+        to_fetch = queue.Queue(self.max_pending)
+        to_parse = queue.Queue(self.max_pending)
+        results = queue.Queue()
+        fetch_metrics = self.metrics["fetch"]
+        parse_metrics = self.metrics["parse"]
+        lock = threading.Lock()
+        start = time.perf_counter()
+        context = fetch_context.get()
+
+        pool = ProcessPoolExecutor(self.processes) if self.processes else None
+        # parses in flight, so items wait in `to_parse` rather than in the pool
+        parsing = threading.Semaphore(max(self.processes, 1))
+
+        def feed():
+            count = 0
+            error = None
+            try:
+                for index, item in enumerate(items):
+                    while not slots.acquire(timeout=0.1):
+                        if self.cancelled.is_set():
+                            return
+                    if self.cancelled.is_set():
+                        return
+                    to_fetch.put((index, item))
+                    fetch_metrics.waiting(to_fetch.qsize())
+                    count += 1
+            except Exception as e:
+                error = e
+            finally:
+                results.put((done, count, error))
+                for _ in range(self.threads):
+                    to_fetch.put(done)
+
+        def fetch():
+            with fetch_context_set(context):
+                fetch_items()
+
+        def fetch_items():
+            while True:
+                task = to_fetch.get()
+                if task is done:
+                    break
+                index, item = task
+                if self.cancelled.is_set():
+                    continue
+
+                t = time.perf_counter()
+                try:
+                    raw = self.fetch(item)
+                except Exception as e:
+                    with lock:
+                        fetch_metrics.errors += 1
+                    results.put((index, item, e))
+                    continue
+                with lock:
+                    fetch_metrics.items += 1
+                    fetch_metrics.busy += time.perf_counter() - t
+
+                to_parse.put((index, item, raw))
+                parse_metrics.waiting(to_parse.qsize())
+
+        def dispatch():
+            finished = 0
+            while finished < self.threads:
+                task = to_parse.get()
+                if task is done:
+                    finished += 1
+                    continue
+                index, item, raw = task
+                parse_metrics.waiting(to_parse.qsize())
+                if self.cancelled.is_set():
+                    continue
+
+                parsing.acquire()
+                if pool is None:
+                    try:
+                        parsed(index, item, timed(self.parse, raw), None)
+                    except Exception as e:
+                        parsed(index, item, None, e)
+                    continue
+
+                try:
+                    future = pool.submit(timed, self.parse, raw)
+                except RuntimeError as e:
+                    # the pool was shut down by a cancel
+                    parsed(index, item, None, e)
+                    continue
+                future.add_done_callback(
+                    lambda future, index=index, item=item: collect(index, item, future)
+                )
+
+        def collect(index, item, future):
+            if future.cancelled():
+                parsing.release()
+            elif future.exception() is not None:
+                parsed(index, item, None, future.exception())
+            else:
+                parsed(index, item, future.result(), None)
+
+        def parsed(index, item, timed_result, error):
+            parsing.release()
+            if error is not None:
+                with lock:
+                    parse_metrics.errors += 1
+                results.put((index, item, error))
+                return
+
+            result, seconds = timed_result
+            with lock:
+                parse_metrics.items += 1
+                parse_metrics.busy += seconds
+            results.put((index, item, result))
+
+        def close():
+            # the dispatcher stops once every fetch thread has finished
+            for thread in fetchers:
+                thread.join()
+            for _ in range(self.threads):
+                to_parse.put(done)
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        fetchers = [threading.Thread(target=fetch, daemon=True) for _ in range(self.threads)]
+        dispatcher = threading.Thread(target=dispatch, daemon=True)
+        closer = threading.Thread(target=close, daemon=True)
+        for thread in [feeder, *fetchers, dispatcher, closer]:
+            thread.start()
+
+        total = None
+        yielded = 0
+        waiting = {}
+
+        try:
+            while total is None or yielded < total:
+                left = time_left(context.expires)
+                try:
+                    index, item, result = results.get(timeout=None if left is None else max(left, 0))
+                except queue.Empty:
+                    check_deadline(context.expires)
+                    continue
+                if index is done:
+                    if result is not None:
+                        raise result
+                    total = item
+                    continue
+
+                if isinstance(result, Exception) and self.errors == "raise":
+                    raise result
+
+                if not self.ordered:
+                    slots.release()
+                    yielded += 1
+                    yield item, result
+                    continue
+
+                waiting[index] = (item, result)
+                while yielded in waiting:
+                    slots.release()
+                    yield waiting.pop(yielded)
+                    yielded += 1
+        finally:
+            self.seconds = time.perf_counter() - start
+            if total is None or yielded < total:
+                self.cancel()
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self) -> None:
+        """Stops the current run; items not yet fetched are skipped."""
+
+        self.cancelled.set()
+
+    def throughput(self, stage: str) -> float:
+        """Items per second through a stage in the last run."""
+
+        return self.metrics[stage].items / self.seconds if self.seconds else 0.0
+
+    def report(self) -> str:
+        """Renders the metrics of every stage of the last run as markdown.
+
+        Returns:
+            markdown (str):
+                table with a row per stage
+        """
+
+        import pandas as pd
+
+        df = pd.DataFrame(
+            [
+                {
+                    "stage": stage,
+                    "items": metrics.items,
+                    "errors": metrics.errors,
+                    "busy_seconds": metrics.busy,
+                    "items_per_second": self.throughput(stage),
+                    "max_queue_depth": metrics.max_depth,
+                }
+                for stage, metrics in self.metrics.items()
+            ]
+        )
+
+        return df.to_markdown(tablefmt="grid", index=False)
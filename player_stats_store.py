@@ -0,0 +1,281 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from fetch_player_statistics import find_career_table
+from requesting_urls import get_html, get_revision_ids
+from time_planner import TableEntry, expand_row_col_span
+
+## -- Columnar store for career statistics -- ##
+
+# career statistics table headings, and the column names used in the store
+stat_columns = {
+    "GP": "gp",
+    "GS": "gs",
+    "MPG": "mpg",
+    "FG%": "fg_pct",
+    "3P%": "fg3_pct",
+    "FT%": "ft_pct",
+    "RPG": "rpg",
+    "APG": "apg",
+    "SPG": "spg",
+    "BPG": "bpg",
+    "PPG": "ppg",
+}
+
+# the text fields are made wider when longer values are stored, see `sized_dtype`
+stats_dtype = np.dtype(
+    [
+        ("player", "U64"),
+        ("url", "U200"),
+        ("team", "U32"),
+        ("season", "U16"),
+    ]
+    + [(column, "f4") for column in stat_columns.values()]
+)
+
+# season on the form 2021–22, also accepting a plain hyphen
+season_pat = re.compile(r"\d{4}[–-]\d{2}")
+
+
+def sized_dtype(data: np.ndarray, rows: List[tuple]) -> np.dtype:
+    """Gets `stats_dtype`, with text fields wide enough for the stored rows and the new ones.
+
+    NumPy cuts off strings longer than their field, which would store a
+    long url that no longer matches the url of its player.
+
+    Args:
+        data (np.ndarray):
+            the rows in the store
+        rows (list of tuples):
+            new rows, in `stats_dtype` order
+    Returns:
+        dtype (np.dtype):
+            structured dtype of the store
+    """
+
+    fields = []
+    for i, name in enumerate(stats_dtype.names):
+        field = stats_dtype[name]
+        if field.kind == "U":
+            # 4 bytes per character
+            width = max(field.itemsize, data.dtype[name].itemsize) // 4
+            width = max([width] + [len(row[i]) for row in rows])
+            field = np.dtype(f"U{width}")
+        fields.append((name, field))
+
+    return np.dtype(fields)
+
+
+def parse_career_table(table) -> List[tuple]:
+    """Parses every season of a career statistics table.
+
+    Rowspans and colspans are expanded, so seasons split over several teams
+    get one row per team. Rows that are not seasons (career totals, all-star)
+    are skipped, and stats that are missing become nan.
+
+    Args:
+        table (bs4.element.Tag):
+            career statistics table of a player page
+    Returns:
+        rows (list of tuples):
+            (team, season, *stats) for each row, stats in `stat_columns` order
+    """
+
+    rows = table.find_all("tr")
+    labels = [th.get_text(strip=True) for th in rows[0].find_all("th")]
+    data = []
+
+    for tr in rows[1:]:
+        row = []
+        for cell in tr.find_all(["th", "td"]):
+            row.append(
+                TableEntry(
+                    text=cell.get_text(strip=True),
+                    rowspan=int(cell.get("rowspan", 1)),
+                    colspan=int(cell.get("colspan", 1)),
+                )
+            )
+        data.append(row)
+
+    parsed = []
+    for row in expand_row_col_span(data):
+        cols = dict(zip(labels, row))
+        season = season_pat.search(row[0]) if row else None
+
+        if season is None or len(row) < 2:
+            continue
+
+        stats = tuple(to_float(cols.get(heading, "")) for heading in stat_columns)
+        parsed.append((row[1].rstrip("*†"), season.group(0).replace("-", "–")) + stats)
+
+    return parsed
+
+
+def to_float(text: str) -> float:
+    """Converts a table cell to a float, nan if it isn't a number.
+
+    Args:
+        text (str):
+            cell text, e.g. '29.9*' or '.553'
+    Returns:
+        (float):
+            the value of the cell
+    """
+
+    text = re.sub(r"\[.*\]", "", text).strip("*† ")
+
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
+
+
+class PlayerStatsStore:
+    """Career statistics of many players, stored as a NumPy structured array.
+
+    The store is a directory with the rows in `player_stats.npy`, memory
+    mapped when loaded, and the page revision of every stored player in
+    `revisions.json`. Updates only refetch players whose page has changed.
+    """
+
+    data_file = "player_stats.npy"
+    revisions_file = "revisions.json"
+
+    def __init__(self, path: str):
+        """Opens the store, creating an empty one if the directory doesn't exist.
+
+        Args:
+            path (str):
+                directory of the store
+        """
+
+        self.path = path
+        self.data = np.empty(0, dtype=stats_dtype)
+        self.revisions = {}
+
+        data_path = os.path.join(path, self.data_file)
+        if os.path.exists(data_path):
+            self.data = np.load(data_path, mmap_mode="r")
+
+        revisions_path = os.path.join(path, self.revisions_file)
+        if os.path.exists(revisions_path):
+            with open(revisions_path) as f:
+                self.revisions = json.load(f)
+
+    def update(
+        self, players: Iterable[Dict], revisions: Optional[Dict[str, int]] = None
+    ) -> List[str]:
+        """Fetches the players whose page revision changed since the last update.
+
+        Only the rows of those players are replaced, the rest of the store is kept.
+        If a fetch fails, the players fetched before it are still stored, and
+        the revision of a player is only recorded along with its rows, so
+        the rest are fetched again next time.
+
+        Args:
+            players (iterable of dicts):
+                players on the form {'name': player name, 'url': player page url}
+            revisions (dict, optional):
+                current revision id of each player url, those not given are
+                looked up with `get_revision_ids`
+        Returns:
+            updated (list):
+                urls of the players that were fetched
+        """
+
+        players = list(players)
+        revisions = dict(revisions or {})
+        # the revisions not given are looked up in bulk, 50 pages per request
+        missing = [player["url"] for player in players if player["url"] not in revisions]
+        if missing:
+            revisions.update(get_revision_ids(missing))
+
+        # revision of every fetched player, recorded once its rows are written
+        fetched = {}
+        new_rows = []
+
+        try:
+            for player in players:
+                url = player["url"]
+                revision = revisions.get(url)
+
+                if revision is not None and self.revisions.get(url) == revision:
+                    continue
+
+                print(f"Fetching career stats for player in {url}")
+                html = get_html(url)
+                table = find_career_table(html)
+
+                rows = [(player["name"], url) + row for row in parse_career_table(table)]
+                new_rows.extend(rows)
+                fetched[url] = revision
+        finally:
+            if fetched:
+                updated = list(fetched)
+                dtype = sized_dtype(self.data, new_rows)
+                keep = self.data[~np.isin(self.data["url"], updated)].astype(dtype)
+                new = np.array(new_rows, dtype=dtype)
+                self.data = np.concatenate([keep, new])
+                self.revisions.update(fetched)
+                self.save()
+
+        return list(fetched)
+
+    def query(
+        self,
+        season: Optional[str] = None,
+        team: Optional[str] = None,
+        player: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+    ) -> np.ndarray:
+        """Selects rows from the store.
+
+        Args:
+            season (str, optional):
+                season on the form '2021–22'
+            team (str, optional):
+                team name, case insensitive
+            player (str, optional):
+                player name or page url
+            columns (list, optional):
+                stat columns to return along with player, team and season
+        Returns:
+            rows (np.ndarray):
+                structured array with the matching rows
+        """
+
+        data = self.data
+        mask = np.ones(len(data), dtype=bool)
+
+        if season is not None:
+            mask &= data["season"] == season.replace("-", "–")
+        if team is not None:
+            mask &= np.char.lower(data["team"]) == team.lower()
+        if player is not None:
+            mask &= (data["player"] == player) | (data["url"] == player)
+
+        rows = data[mask]
+        if columns is not None:
+            rows = rows[["player", "url", "team", "season"] + list(columns)]
+
+        return np.asarray(rows)
+
+    def save(self) -> None:
+        """Writes the store to disk, replacing the old files atomically."""
+
+        os.makedirs(self.path, exist_ok=True)
+
+        data_path = os.path.join(self.path, self.data_file)
+        with open(data_path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(self.data))
+        os.replace(data_path + ".tmp", data_path)
+
+        revisions_path = os.path.join(self.path, self.revisions_file)
+        with open(revisions_path + ".tmp", "w") as f:
+            json.dump(self.revisions, f)
+        os.replace(revisions_path + ".tmp", revisions_path)
+
+        self.data = np.load(data_path, mmap_mode="r")
@@ -1,11 +1,211 @@
-from typing import Dict, Optional
-import requests
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
+from urllib.parse import quote, unquote, urljoin, urlsplit
+from weakref import WeakKeyDictionary
+
+from deadlines import (
+    DeadlineExceeded,
+    check_deadline,
+    default_timeout,
+    fetch_context,
+    fetch_context_set,
+    request_timeout,
+    time_left,
+)
+from tracing import traced
+
+# requests is imported in the functions using it, so that importing
+# this module (and the scrapers built on it) stays cheap
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
 
 ## -- Task 1 -- ##
 
-def get_html(url: str, params: Optional[Dict] = None, output: Optional[str] = None):
+@traced("fetch", size=len)
+def get_html(
+    url: str,
+    params: Optional[Dict] = None,
+    output: Optional[str] = None,
+    raw: bool = False,
+    timeout: Union[float, Tuple[float, float], None] = default_timeout,
+):
     """Gets an HTML page and return its contents.
 
+    Waits at most until the deadline of the job, see `deadlines.deadline`,
+    and sends a second request if the first is slow while hedging, see
+    `deadlines.hedging`.
+
+    Args:
+        url (str):
+            The URL to retrieve.
+        params (dict, optional):
+            URL parameters to add.
+        output (str, optional):
+            (optional) path where output should be saved.
+        raw (bool, optional):
+            return the undecoded body, for the extractors that scan bytes,
+            which saves decoding and copying the whole page
+        timeout (float or tuple, optional):
+            seconds to wait for the server, or (connect, read) seconds
+    Returns:
+        html (str or bytes):
+            The HTML of the page, as text, or as bytes if raw.
+    Raises:
+        DeadlineExceeded:
+            if the deadline of the job passes first
+    """
+
+    import requests
+
+    context = fetch_context.get()
+
+    def fetch():
+        if context.expires is None:
+            get = requests.get if context.cached else plain_session().get
+            response = get(url, params=params, timeout=timeout)
+        else:
+            response = get_before(url, params, timeout, context.expires, context.cached)
+        # read the body here, so a hedged request is done when it returns
+        return response.content if raw else response.text
+
+    try:
+        if context.hedger is None:
+            html_str = fetch()
+        else:
+            html_str = context.hedger.call(fetch, key=urlsplit(url).netloc)
+    except requests.Timeout as e:
+        left = time_left(context.expires)
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"deadline passed while fetching {url}") from e
+        raise
+
+    # write to file
+    if output:
+        print(f"Writing to: {output}")
+        with open(output, 'wb' if raw else 'w') as out:
+            header = "HTML code of url="+url+"\n"
+            out.write(header.encode("utf-8") if raw else header)
+            out.write(html_str)
+
+    return html_str
+
+
+# most bytes read from the server at a time while there is a deadline
+read_size = 65536
+
+
+def get_before(
+    url: str,
+    params: Optional[Dict],
+    timeout: Union[float, Tuple[float, float], None],
+    expires: float,
+    cached: bool = True,
+) -> "requests.Response":
+    """Gets a page for `get_html`, raising `DeadlineExceeded` once the deadline passes.
+
+    The read timeout of requests applies to each read from the server, so
+    a server sending a byte now and then would outlast it. The body is
+    streamed instead, checking the deadline after every read. An installed
+    requests_cache reads the whole body before returning, so the page is
+    looked up in the cache, and on a miss, fetched past it and saved.
+    """
+
+    import requests
+
+    session = requests.Session() if cached else None
+    cache = getattr(session, "cache", None)
+    try:
+        if cache is not None:
+            response = session.get(url, params=params, only_if_cached=True)
+            # a miss is answered 504 Gateway Timeout
+            if response.status_code != 504:
+                return response
+
+        response = plain_session().get(
+            url, params=params, timeout=request_timeout(timeout, expires), stream=True
+        )
+        # read1 returns as soon as the server sent anything, unlike iter_content
+        read = getattr(response.raw, "read1", None)
+        reads = (
+            iter(lambda: read(read_size, decode_content=True), b"")
+            if read is not None
+            else response.iter_content(read_size)
+        )
+        body = []
+        with response:
+            for data in reads:
+                check_deadline(expires)
+                body.append(data)
+        response._content = b"".join(body)
+
+        if cache is not None and response.status_code in session.settings.allowable_codes:
+            from requests_cache import get_expiration_datetime
+
+            expires_at = get_expiration_datetime(session.settings.expire_after)
+            cache.save_response(response, expires=expires_at)
+
+        return response
+    finally:
+        if session is not None:
+            session.close()
+
+
+# the pooled HTTP client of every event loop, see `async_session`
+async_sessions: "WeakKeyDictionary" = WeakKeyDictionary()
+
+
+def async_session() -> "aiohttp.ClientSession":
+    """Gets the HTTP client shared by the async scrapers on the running event loop.
+
+    The client keeps a pool of open connections, so many concurrent
+    requests to the same wiki reuse a few connections. It is created on
+    first use, and should be closed with `close_async_session` when done.
+
+    Returns:
+        session (aiohttp.ClientSession):
+            the client of the running event loop
+    """
+
+    import asyncio
+
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    session = async_sessions.get(loop)
+    if session is None or session.closed:
+        session = async_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20)
+        )
+
+    return session
+
+
+async def close_async_session() -> None:
+    """Closes the HTTP client of the running event loop, if it was created."""
+
+    import asyncio
+
+    session = async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+@traced("fetch", size=len)
+async def get_html_async(
+    url: str,
+    params: Optional[Dict] = None,
+    output: Optional[str] = None,
+    session: Optional["aiohttp.ClientSession"] = None,
+    timeout: Union[float, Tuple[float, float], None] = default_timeout,
+) -> str:
+    """Gets an HTML page without blocking the event loop, like `get_html`.
+
+    A request that is not needed any more, because its hedged copy answered
+    first or the deadline passed, is cancelled.
+
     Args:
         url (str):
             The URL to retrieve.
@@ -13,13 +213,43 @@ def get_html(url: str, params: Optional[Dict] = None, output: Optional[str] = No
             URL parameters to add.
         output (str, optional):
             (optional) path where output should be saved.
+        session (aiohttp.ClientSession, optional):
+            client to use, the shared one of `async_session` if not given
+        timeout (float or tuple, optional):
+            seconds to wait for the server, or (connect, read) seconds
     Returns:
         html (str):
             The HTML of the page, as text.
+    Raises:
+        DeadlineExceeded:
+            if the deadline of the job passes first
     """
 
-    response = requests.get(url, params=params)
-    html_str = response.text
+    import asyncio
+
+    import aiohttp
+
+    session = async_session() if session is None else session
+    context = fetch_context.get()
+
+    async def fetch():
+        limit = request_timeout(timeout, context.expires)
+        connect, read = limit if isinstance(limit, tuple) else (limit, limit)
+        left = time_left(context.expires)
+        client_timeout = aiohttp.ClientTimeout(total=left, connect=connect, sock_read=read)
+        async with session.get(url, params=params, timeout=client_timeout) as response:
+            return await response.text()
+
+    try:
+        if context.hedger is None:
+            html_str = await fetch()
+        else:
+            html_str = await context.hedger.call_async(fetch, key=urlsplit(url).netloc)
+    except asyncio.TimeoutError as e:
+        left = time_left(context.expires)
+        if left is not None and left <= 0 and not isinstance(e, DeadlineExceeded):
+            raise DeadlineExceeded(f"deadline passed while fetching {url}") from e
+        raise
 
     # write to file
     if output:
@@ -28,4 +258,233 @@ def get_html(url: str, params: Optional[Dict] = None, output: Optional[str] = No
             out.write("HTML code of url="+url+"\n")
             out.write(html_str)
 
-    return html_str
\ No newline at end of file
+    return html_str
+
+
+def get_revision_id(url: str) -> Optional[int]:
+    """Gets the id of the current revision of a wikipedia article.
+
+    Asks the MediaWiki API of the wiki the article is on, which is much
+    cheaper than downloading the page.
+
+    Args:
+        url (str):
+            URL of the article, e.g. https://en.wikipedia.org/wiki/Peace
+    Returns:
+        revision (int or None):
+            the revision id, or None if the page doesn't exist
+    """
+
+    params = {
+        "action": "query",
+        "prop": "revisions",
+        "rvprop": "ids",
+        "titles": article_title(url),
+    }
+    # a revision id served from an installed requests_cache would be stale
+    page = api_get(url, params, fresh=True)["query"]["pages"][0]
+
+    if "revisions" not in page:
+        return None
+
+    return page["revisions"][0]["revid"]
+
+
+@traced("fetch", size=len)
+def get_revision_ids(urls: Iterable[str], batch: int = 50) -> Dict[str, Optional[int]]:
+    """Gets the current revision ids of many articles, with one request per batch.
+
+    The MediaWiki API takes up to 50 titles per query, so checking
+    hundreds of pages for changes costs a handful of small requests.
+
+    Args:
+        urls (iterable of str):
+            URLs of the articles, can be on different wikis
+        batch (int, optional):
+            most titles per request, 50 is the API limit for normal users
+    Returns:
+        revisions (dict):
+            the revision id of every URL, None for pages that don't exist
+    """
+
+    by_wiki: Dict[str, List[str]] = {}
+    for url in dict.fromkeys(urls):
+        by_wiki.setdefault(urljoin(url, "/w/api.php"), []).append(url)
+
+    revisions = {}
+    for wiki_urls in by_wiki.values():
+        for i in range(0, len(wiki_urls), batch):
+            chunk = wiki_urls[i:i + batch]
+            titles = {url: article_title(url) for url in chunk}
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "rvprop": "ids",
+                "titles": "|".join(dict.fromkeys(titles.values())),
+            }
+            query = api_get(chunk[0], params, fresh=True)["query"]
+
+            # the API answers with normalized titles, e.g. spaces for underscores
+            normalized = {n["from"]: n["to"] for n in query.get("normalized", [])}
+            pages = {page["title"]: page for page in query["pages"]}
+            for url, title in titles.items():
+                page = pages.get(normalized.get(title, title), {})
+                revisions[url] = page["revisions"][0]["revid"] if "revisions" in page else None
+
+    return revisions
+
+
+def article_title(url: str) -> str:
+    """Gets the title of an article from its URL, e.g. Peace from .../wiki/Peace."""
+
+    return unquote(url.split("/wiki/", 1)[1])
+
+
+# characters left as they are in article URLs, like wikipedia does
+url_safe = "/:(),'!*@$;"
+
+
+def article_url(origin: str, title: str) -> str:
+    """Gets the URL of an article from its title, as the wiki links to it, e.g. .../wiki/Peace."""
+
+    return f"{origin}/wiki/{quote(title.replace(' ', '_'), safe=url_safe)}"
+
+
+@contextmanager
+def uncached(enabled: bool = True) -> Iterator[None]:
+    """Bypasses requests_cache, if it is installed, for the fetches inside the with statement.
+
+    Only the fetches of this thread or task, and of the `Pipeline` fetch
+    threads it starts, are affected. They go through `plain_session`,
+    while other threads keep using the cache.
+    """
+
+    if not enabled:
+        yield
+        return
+
+    with fetch_context_set(replace(fetch_context.get(), cached=False)):
+        yield
+
+
+# a requests session of every thread that never goes through requests_cache
+plain_sessions = threading.local()
+
+
+def plain_session() -> "requests.Session":
+    """Gets this thread's requests session that bypasses an installed requests_cache."""
+
+    import sys
+
+    import requests
+
+    if not hasattr(plain_sessions, "session"):
+        # only patched in if already imported, see fetch_player_statistics.install_cache
+        patcher = sys.modules.get("requests_cache.patcher")
+        session = requests.Session if patcher is None else patcher.OriginalSession
+        plain_sessions.session = session()
+
+    return plain_sessions.session
+
+
+def api_get(url: str, params: Dict, fresh: bool = False) -> Dict:
+    """Calls the MediaWiki API of the wiki an article is on.
+
+    Args:
+        url (str):
+            URL of any article on the wiki
+        params (dict):
+            API parameters, json format version 2 is added
+        fresh (bool, optional):
+            bypass requests_cache, if it is installed, for answers that change
+            over time, e.g. the current revision of a page
+    Returns:
+        response (dict):
+            the decoded response
+    """
+
+    import json
+
+    params = dict(params, format="json", formatversion="2")
+    with uncached(fresh):
+        response = json.loads(get_html(urljoin(url, "/w/api.php"), params=params))
+
+    if "error" in response:
+        raise ValueError(f"{response['error'].get('code')}: {response['error'].get('info')}")
+
+    return response
+
+
+# sections of every page revision seen, as (anchor, index) pairs in page order,
+# by (API URL, revision). A revision never changes, so these never go stale.
+section_indexes: Dict[Tuple[str, int], List[Tuple[str, str]]] = {}
+
+
+def get_sections(url: str, revision: Optional[int] = None) -> Tuple[int, List[Tuple[str, str]]]:
+    """Gets the sections of a page, from the cache if the revision is known.
+
+    Args:
+        url (str):
+            URL of the article
+        revision (int, optional):
+            revision of the page to get the sections of,
+            the current one if not given
+    Returns:
+        revision, sections (tuple):
+            the revision, and its (anchor, index) of every section in page order
+    """
+
+    api = urljoin(url, "/w/api.php")
+    if revision is not None and (api, revision) in section_indexes:
+        return revision, section_indexes[api, revision]
+
+    if revision is None:
+        params = {"action": "parse", "page": article_title(url), "prop": "sections|revid"}
+    else:
+        params = {"action": "parse", "oldid": revision, "prop": "sections|revid"}
+    # the current revision changes, so it can't come from requests_cache
+    parsed = api_get(url, params, fresh=revision is None)["parse"]
+
+    sections = [(section["anchor"], str(section["index"])) for section in parsed["sections"]]
+    section_indexes[api, parsed["revid"]] = sections
+
+    return parsed["revid"], sections
+
+
+def get_section_html(url: str, heading: Union[str, Pattern], revision: Optional[int] = None) -> str:
+    """Gets the rendered html of only one section of an article.
+
+    Uses the parse API of the wiki, so the rest of the page is never
+    downloaded or parsed. The html starts with the heading of the section
+    and includes its subsections, so scrapers looking for the table after
+    the heading work on it like on the whole page.
+
+    Takes two requests, for the sections of the page and for the section.
+    The sections are cached by the revision the API answers with, so a
+    caller that knows the revision, e.g. from `get_revision_ids`, saves
+    the first request for a revision seen before.
+
+    Args:
+        url (str):
+            URL of the article
+        heading (str or re.Pattern):
+            anchor of the section heading, e.g. "Calendar",
+            or a pattern searched for in the anchors, the first match is used
+        revision (int, optional):
+            revision of the page to get the section of, the current one if not given
+    Returns:
+        html (str):
+            html of the section
+    """
+
+    revision, sections = get_sections(url, revision)
+
+    for anchor, index in sections:
+        if anchor == heading if isinstance(heading, str) else heading.search(anchor):
+            break
+    else:
+        raise ValueError(f"{url} has no section {heading}")
+
+    params = {"action": "parse", "oldid": revision, "section": index, "prop": "text"}
+
+    return api_get(url, params)["parse"]["text"]
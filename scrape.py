@@ -0,0 +1,286 @@
+import json
+import sys
+import time
+from typing import IO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from collect_dates import find_dates
+from deadlines import DeadlineExceeded, default_timeout, job_limits
+from fetch_player_statistics import career_stats, season_stats
+from filter_urls import Html, filter_articles, find_img_src, find_urls
+from requesting_urls import get_html
+from time_planner import schedule_from_html
+
+## -- Batch runner for the extractors -- ##
+
+# the extractors are called with the html of a page in the parser processes,
+# so they are module level functions, and return json compatible data.
+# Relative links are resolved against base_url, and low_memory only matters
+# for the extractors parsing the page into a tree. The regex extractors scan
+# the undecoded page, see `raw_extractors`.
+
+
+def extract_urls(html: Html, base_url: str, low_memory: bool = False) -> List[str]:
+    return sorted(find_urls(html, base_url=base_url))
+
+
+def extract_articles(html: Html, base_url: str, low_memory: bool = False) -> List[str]:
+    return sorted(filter_articles(find_urls(html, base_url=base_url)))
+
+
+def extract_img_src(html: Html, base_url: str, low_memory: bool = False) -> List[str]:
+    return sorted(find_img_src(html))
+
+
+def extract_dates(html: Html, base_url: str, low_memory: bool = False) -> List[str]:
+    return find_dates(html)
+
+
+def extract_time_plan(html: str, base_url: str, low_memory: bool = False) -> str:
+    return schedule_from_html(html, low_memory=low_memory)
+
+
+def extract_player_stats(html: str, base_url: str, low_memory: bool = False) -> List[Dict]:
+    return career_stats(html, low_memory=low_memory)
+
+
+extractors: Dict[str, Callable[..., object]] = {
+    "find_urls": extract_urls,
+    "find_articles": extract_articles,
+    "find_img_src": extract_img_src,
+    "find_dates": extract_dates,
+    "time_plan": extract_time_plan,
+    "get_player_stats": extract_player_stats,
+}
+
+# extractors given the page as bytes, so it is never decoded as a whole
+raw_extractors = {"find_urls", "find_articles", "find_img_src", "find_dates"}
+
+
+def read_inputs(
+    lines: Iterable[str],
+    base_url: str = "https://en.wikipedia.org",
+) -> Iterable[Tuple[str, str, Optional[str]]]:
+    """Reads the URLs or titles to scrape, one per line.
+
+    Blank lines and lines starting with # are skipped. A line can have
+    an extra tab separated field, the team for get_player_stats.
+
+    Args:
+        lines (iterable of str):
+            the input lines, e.g. an open file
+        base_url (str, optional):
+            wiki to look titles up on
+    Yields:
+        line, url, team (tuple):
+            the input, its URL, and the team if given
+    """
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        input_, _, team = line.partition("\t")
+        if "://" in input_:
+            url = input_
+        else:
+            url = f"{base_url}/wiki/{quote(input_.replace(' ', '_'))}"
+
+        yield line, url, team or None
+
+
+def fetch_page(
+    input_: Tuple[str, str, Optional[str]],
+    raw: bool = False,
+    timeout: Union[float, Tuple[float, float]] = default_timeout,
+) -> Html:
+    """Fetches the page of an input of `read_inputs`."""
+
+    return get_html(input_[1], raw=raw, timeout=timeout)
+
+
+def run(
+    extractor: str,
+    lines: Iterable[str],
+    output: IO[str],
+    threads: int = 8,
+    processes: Optional[int] = None,
+    max_pending: int = 64,
+    base_url: str = "https://en.wikipedia.org",
+    progress: Optional[IO[str]] = sys.stderr,
+    progress_every: float = 1.0,
+    low_memory: bool = False,
+    report_memory: bool = False,
+    timeout: Union[float, Tuple[float, float]] = default_timeout,
+    deadline: Optional[float] = None,
+    hedge: bool = False,
+) -> Dict[str, int]:
+    """Runs an extractor on every input, writing a json line per input as it completes.
+
+    Every line is {"input", "url", "extractor", "result"}, or "error" instead
+    of "result" if fetching or extracting failed. get_player_stats gives the
+    stats of every season, or of the 2021–22 season if the input has a team.
+
+    Args:
+        extractor (str):
+            name of the extractor, see `extractors`
+        lines (iterable of str):
+            URLs or titles, see `read_inputs`
+        output (file):
+            where to write the json lines
+        threads (int, optional):
+            number of fetch threads
+        processes (int, optional):
+            number of parser processes, one per cpu if not given
+        max_pending (int, optional):
+            most pages in flight at once
+        base_url (str, optional):
+            wiki to look titles up on, and to resolve relative links against
+        progress (file, optional):
+            where to report progress, None to be quiet
+        progress_every (float, optional):
+            seconds between progress reports
+        low_memory (bool, optional):
+            free every parsed page right after use
+        report_memory (bool, optional):
+            add the peak memory, of this process and the parser processes,
+            and the top allocating lines to the final progress report
+        timeout (float or tuple, optional):
+            seconds to wait for the server on every fetch, see `get_html`
+        deadline (float, optional):
+            seconds the whole run may take, see `deadlines.deadline`
+        hedge (bool, optional):
+            send a second request for fetches slower than most, see `deadlines.hedging`
+    Returns:
+        counts (dict):
+            number of inputs "done", and how many of them were "errors"
+    Raises:
+        DeadlineExceeded:
+            if the deadline passes before every input is done. The
+            lines of the inputs done by then are already written
+    """
+
+    from functools import partial
+
+    from memory import memory_report
+    from pipeline import Pipeline
+
+    pipeline = Pipeline(
+        fetch=partial(fetch_page, raw=extractor in raw_extractors, timeout=timeout),
+        parse=partial(extractors[extractor], base_url=base_url, low_memory=low_memory),
+        threads=threads,
+        processes=processes,
+        max_pending=max_pending,
+        ordered=False,
+        errors="return",
+    )
+    counts = {"done": 0, "errors": 0}
+    start = last_report = time.perf_counter()
+
+    def report():
+        seconds = time.perf_counter() - start
+        rate = counts["done"] / seconds if seconds else 0.0
+        print(
+            f"{counts['done']} done, {counts['errors']} errors, {rate:.1f} pages/s",
+            file=progress,
+            flush=True,
+        )
+
+    limits = job_limits(deadline, hedge)
+
+    with memory_report(enabled=report_memory) as memory, limits as hedger:
+        for (line, url, team), result in pipeline.run(read_inputs(lines, base_url)):
+            record = {"input": line, "url": url, "extractor": extractor}
+            if isinstance(result, Exception):
+                record["error"] = f"{type(result).__name__}: {result}"
+                counts["errors"] += 1
+            elif extractor == "get_player_stats" and team is not None:
+                record["result"] = season_stats(result, team)
+            else:
+                record["result"] = result
+
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            counts["done"] += 1
+            memory.sample()
+
+            if progress is not None and time.perf_counter() - last_report >= progress_every:
+                last_report = time.perf_counter()
+                report()
+
+    if progress is not None:
+        report()
+        print(pipeline.report(), file=progress)
+        if hedger is not None:
+            print(hedger, file=progress)
+        if report_memory:
+            print(memory, file=progress)
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line interface of `run`, returns 1 if any input failed."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Run an extractor on URLs or titles, writing a json line per input"
+    )
+    parser.add_argument("extractor", choices=list(extractors))
+    parser.add_argument(
+        "inputs", nargs="?", default="-", help="file with a URL or title per line, - for stdin"
+    )
+    parser.add_argument("-o", "--output", default="-", help="jsonl file to write, - for stdout")
+    parser.add_argument("--threads", type=int, default=8, help="fetch threads")
+    parser.add_argument("--processes", type=int, default=None, help="parser processes")
+    parser.add_argument("--max-pending", type=int, default=64, help="most pages in flight")
+    parser.add_argument("--base-url", default="https://en.wikipedia.org")
+    parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    parser.add_argument(
+        "--low-memory", action="store_true", help="free every parsed page right after use"
+    )
+    parser.add_argument(
+        "--memory-report", action="store_true", help="report peak memory and top allocations"
+    )
+    parser.add_argument("--timeout", type=float, help="seconds to wait for the server per fetch")
+    parser.add_argument("--deadline", type=float, help="seconds the whole run may take")
+    parser.add_argument(
+        "--hedge", action="store_true", help="send a second request for slow fetches"
+    )
+    args = parser.parse_args(argv)
+
+    inputs = sys.stdin if args.inputs == "-" else open(args.inputs, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    try:
+        counts = run(
+            args.extractor,
+            inputs,
+            output,
+            threads=args.threads,
+            processes=args.processes,
+            max_pending=args.max_pending,
+            base_url=args.base_url,
+            progress=None if args.quiet else sys.stderr,
+            low_memory=args.low_memory,
+            report_memory=args.memory_report,
+            timeout=default_timeout if args.timeout is None else args.timeout,
+            deadline=args.deadline,
+            hedge=args.hedge,
+        )
+    except DeadlineExceeded as e:
+        print(f"Stopped: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if inputs is not sys.stdin:
+            inputs.close()
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,260 @@
+import hashlib
+import json
+import re
 import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import pytest
 
 assignment4 = Path(__file__).parent.parent.absolute()
 
 # Ensure assignment4 dir is on sys.path
 sys.path.insert(0, str(assignment4))
+
+
+class StandInWiki:
+    """A local stand-in for a wiki, serving a link graph as article pages.
+
+    Serves /wiki/<title> with a link to every article in graph[title],
+    and its revision in a configuration script, as wikipedia does,
+    and answers backlink queries listing the articles linking to a title,
+    `limit` at a time. Titles in `redirects` are redirects to another title,
+    listed as such in the backlinks of their target.
+    Articles in `pages` are served with the given html instead.
+    /w/api.php answers revision queries (of up to 50 titles, answered with
+    normalized titles), and parse requests for the
+    sections of a page, split at its <h2 id=...> and <h3 id=...> headings.
+    Files set in `files`, e.g. images, are served with an ETag, and answered
+    304 Not Modified to requests with the same If-None-Match.
+    Requests to a path in `delays` wait for the next of its delays first,
+    to stand in for a slow or stalled server. Pages of a path in `drips`
+    are sent a byte at a time, that many seconds apart.
+    Every request is recorded in `requests`, and the bytes sent in `sent`.
+    """
+
+    def __init__(self, graph, pages=None):
+        self.graph = dict(graph)
+        self.pages = {}
+        self.revisions = {}
+        self.next_revision = 1000
+        for title, html in (pages or {}).items():
+            self.edit(title, html)
+        # titles that are redirects, to the title they redirect to
+        self.redirects = {}
+        # most backlinks answered per query
+        self.limit = 500
+        self.backlinks = {title: [] for title in graph}
+        for title, links in graph.items():
+            for link in links:
+                self.backlinks.setdefault(link, []).append(title)
+        # other files, e.g. images, by path, served with an ETag
+        self.files = {}
+        # seconds to wait before answering the next requests, by path
+        self.delays = {}
+        # seconds between the bytes of the pages, by path
+        self.drips = {}
+        self.requests = []
+        self.sent = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def article(self, title):
+        return f"{self.url}/wiki/{quote(title)}"
+
+    def edit(self, title, html):
+        """Sets the html of a page, as a new revision."""
+
+        self.graph.setdefault(title, [])
+        self.pages[title] = html
+        self.next_revision += 1
+        self.revisions[title] = self.next_revision
+
+    def sections(self, html):
+        """(anchor, level, start, end) of every section of a page."""
+
+        headings = [
+            (m.group(2), int(m.group(1)), m.start())
+            for m in re.finditer(r'<h([23]) id="([^"]+)"', html)
+        ]
+        sections = []
+        for i, (anchor, level, start) in enumerate(headings):
+            ends = [s for _, l, s in headings[i + 1:] if l <= level]
+            sections.append((anchor, level, start, ends[0] if ends else len(html)))
+
+        return sections
+
+    def api(self, query):
+        action = query.get("action", [""])[0]
+
+        if action == "query" and query.get("list") == ["backlinks"]:
+            title = query["bltitle"][0].replace(" ", "_")
+            links = []
+            for link in self.backlinks.get(title, []):
+                links.append({"title": link.replace("_", " ")})
+                if link in self.redirects:
+                    links[-1]["redirect"] = True
+            if query.get("blfilterredir") == ["nonredirects"]:
+                links = [link for link in links if "redirect" not in link]
+            start = int(query.get("blcontinue", ["0"])[0])
+            result = {"query": {"backlinks": links[start:start + self.limit]}}
+            if start + self.limit < len(links):
+                result["continue"] = {"blcontinue": str(start + self.limit), "continue": "-||"}
+            return result
+
+        if action == "query":
+            titles = query.get("titles", [""])[0].split("|")
+            if len(titles) > 50:
+                return {"error": {"code": "toomanyvalues", "info": "at most 50 titles"}}
+            pages = []
+            # like the real API, titles are answered with spaces for underscores
+            normalized = [{"from": t, "to": t.replace("_", " ")} for t in titles if "_" in t]
+            for title in titles:
+                if title in self.graph:
+                    revision = self.revisions.setdefault(title, 1)
+                    pages.append(
+                        {"title": title.replace("_", " "), "revisions": [{"revid": revision}]}
+                    )
+                else:
+                    pages.append({"title": title.replace("_", " "), "missing": True})
+            result = {"pages": pages}
+            if normalized:
+                result["normalized"] = normalized
+            return {"query": result}
+
+        if action == "parse":
+            if "oldid" in query:
+                revision = int(query["oldid"][0])
+                titles = [t for t, r in self.revisions.items() if r == revision]
+                if not titles:
+                    return {"error": {"code": "nosuchrevid", "info": "no such revision"}}
+                title = titles[0]
+            else:
+                title = query.get("page", [""])[0]
+                if title not in self.pages:
+                    return {"error": {"code": "missingtitle", "info": "no such page"}}
+
+            html = self.pages[title]
+            sections = self.sections(html)
+            props = query.get("prop", ["text"])[0].split("|")
+            parsed = {"title": title, "revid": self.revisions[title]}
+            if "sections" in props:
+                parsed["sections"] = [
+                    {"index": str(i), "anchor": anchor, "line": anchor, "level": str(level)}
+                    for i, (anchor, level, _, _) in enumerate(sections, start=1)
+                ]
+            if "text" in props:
+                if "section" in query:
+                    _, _, start, end = sections[int(query["section"][0]) - 1]
+                    html = html[start:end]
+                parsed["text"] = f'<div class="mw-parser-output">{html}</div>'
+            return {"parse": parsed}
+
+        return {"error": {"code": "badvalue", "info": f"unknown action {action}"}}
+
+    def page(self, body):
+        # navigation links that are not part of the article
+        return (
+            '<html><body><a href="/wiki/Special:Random">Random</a>'
+            '<a href="/wiki/Help:Contents">Help</a>'
+            f"{body}</body></html>"
+        )
+
+    def links(self, titles):
+        return "".join(f'<li><a href="/wiki/{quote(t)}">{t}</a></li>' for t in titles)
+
+    def respond(self, path, query):
+        if path.startswith("/wiki/"):
+            title = unquote(path[len("/wiki/"):])
+            if title in self.pages:
+                return 200, self.pages[title]
+            if title not in self.graph:
+                return 404, "<html>no such page</html>"
+            revision = self.revisions.setdefault(title, 1)
+            body = f'<script>RLCONF={{"wgRevisionId":{revision}}};</script>'
+            return 200, self.page(f"{body}<ul>{self.links(self.graph[title])}</ul>")
+
+        if path == "/w/api.php":
+            return 200, json.dumps(self.api(query))
+
+        return 404, "<html>not found</html>"
+
+    def handler(self):
+        wiki = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                wiki.requests.append(self.path)
+                if wiki.delays.get(parts.path):
+                    time.sleep(wiki.delays[parts.path].pop(0))
+                if parts.path in wiki.files:
+                    return self.send_file(wiki.files[parts.path])
+                status, body = wiki.respond(parts.path, parse_qs(parts.query))
+                data = body.encode("utf-8")
+                wiki.sent += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if parts.path in wiki.drips:
+                    return self.drip(data, wiki.drips[parts.path])
+                self.wfile.write(data)
+
+            def drip(self, data, seconds):
+                try:
+                    for i in range(len(data)):
+                        self.wfile.write(data[i : i + 1])
+                        self.wfile.flush()
+                        time.sleep(seconds)
+                except OSError:
+                    # the client gave up
+                    pass
+
+            def send_file(self, data):
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                wiki.sent += len(data)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in_wiki():
+    """Starts local stand-in wikis, given their link graph, and optionally pages."""
+
+    wikis = []
+
+    def start(graph, pages=None):
+        wiki = StandInWiki(graph, pages).__enter__()
+        wikis.append(wiki)
+        return wiki
+
+    yield start
+
+    for wiki in wikis:
+        wiki.__exit__()
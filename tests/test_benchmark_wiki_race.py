@@ -0,0 +1,43 @@
+from benchmark_wiki_race import benchmark, graph_fetchers, summarize
+
+
+def peace_graph():
+    """A graph where the way to Peace is through articles sharing its words."""
+
+    graph = {"Start": [f"Noise_{i}" for i in range(30)] + ["Peace_movement"]}
+    for i in range(30):
+        graph[f"Noise_{i}"] = [f"Noise_{i}_{j}" for j in range(5)]
+        for j in range(5):
+            graph[f"Noise_{i}_{j}"] = ["Start"]
+    graph["Peace_movement"] = ["Noise_1", "World_peace"]
+    graph["World_peace"] = ["Peace", "Start"]
+    graph["Peace"] = []
+    # other articles linking to Peace, that the backward search has to go through
+    for i in range(20):
+        graph[f"Other_{i}"] = ["Peace"]
+
+    return graph
+
+
+def url(title):
+    return f"https://en.wikipedia.org/wiki/{title}"
+
+
+def test_benchmark():
+    get_links, get_backlinks = graph_fetchers(peace_graph())
+    pairs = [(url("Start"), url("Peace")), (url("Peace"), url("Start"))]
+    # one worker, so the same pages are fetched every run
+    results = benchmark(pairs, get_links, get_backlinks, max_workers=1)
+    assert len(results) == 6
+
+    by_mode = {r["mode"]: r for r in results if r["finish"] == url("Peace")}
+    assert {r["length"] for r in by_mode.values()} == {4}
+    assert by_mode["best_first"]["pages_fetched"] < by_mode["bidirectional"]["pages_fetched"]
+    assert by_mode["bidirectional"]["pages_fetched"] < by_mode["bfs"]["pages_fetched"]
+
+    # there is no way back from Peace
+    assert {r["length"] for r in results if r["start"] == url("Peace")} == {None}
+
+    table = summarize(results)
+    assert "best_first" in table
+    assert "pages_fetched" in table
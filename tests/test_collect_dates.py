@@ -1,3 +1,5 @@
+import mmap
+
 import pytest
 from collect_dates import find_dates
 from requesting_urls import get_html
@@ -29,6 +31,18 @@ def test_find_dates(date_str, date):
     assert dates == [date]
 
 
+def test_find_dates_bytes(tmp_path):
+    text = "Født 2 January 2020 i Tromsø – " + date_text
+    raw = text.encode("utf-8")
+    path = tmp_path / "page.html"
+    path.write_bytes(raw)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for page in (raw, memoryview(raw), mapped):
+            assert find_dates(page) == find_dates(text)
+    assert len(find_dates(raw)) == 5
+
+
 @pytest.mark.parametrize(
     "url, expected",
     [
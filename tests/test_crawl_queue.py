@@ -0,0 +1,97 @@
+import multiprocessing
+import time
+
+from crawl_queue import CrawlQueue, crawl
+
+
+def test_leases(tmp_path):
+    queue = CrawlQueue(str(tmp_path / "crawl.sqlite"), lease_timeout=0.2, max_attempts=3)
+    assert queue.add(["http://a/wiki/1", "http://a/wiki/2", "http://a/wiki/3"]) == 3
+    assert queue.add(["http://a/wiki/1"]) == 0
+
+    first = queue.lease("a", n=2)
+    second = queue.lease("b", n=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(first) & set(second)
+    assert queue.lease("b") == []
+
+    # leases of a crashed worker run out
+    time.sleep(0.3)
+    assert sorted(queue.lease("b")) == sorted(first + second)
+    url, depth = first[0]
+    assert queue.complete("b", url, ["http://a/wiki/4", "http://a/wiki/1"]) == 1
+    assert queue.complete("b", first[1][0], ["http://a/wiki/5"], max_depth=0) == 0
+    # the crashed worker lost its lease, and can't complete or fail the url
+    assert queue.complete("a", url, ["http://a/wiki/6"]) == 0
+    queue.fail("a", second[0][0], "timeout")
+    assert queue.counts() == {"pending": 1, "leased": 1, "done": 2, "failed": 0}
+    assert queue.lease("b") == [("http://a/wiki/4", depth + 1)]
+
+    # failed URLs are retried until max_attempts
+    queue.fail("b", second[0][0], "timeout")
+    assert queue.counts() == {"pending": 1, "leased": 1, "done": 2, "failed": 0}
+    assert queue.lease("b") == second
+    queue.fail("b", second[0][0], "timeout")
+    assert queue.counts()["failed"] == 1
+    assert not queue.finished()
+
+
+def test_expired_leases_fail(tmp_path):
+    queue = CrawlQueue(str(tmp_path / "crawl.sqlite"), lease_timeout=0.1, max_attempts=2)
+    queue.add(["http://a/wiki/crash", "http://a/wiki/2"])
+    assert queue.lease("a", n=1) == [("http://a/wiki/crash", 0)]
+
+    # a url that crashes every worker leasing it isn't leased again and again
+    time.sleep(0.2)
+    assert queue.lease("b", n=1) == [("http://a/wiki/crash", 0)]
+    time.sleep(0.2)
+    assert queue.lease("c", n=1) == [("http://a/wiki/2", 0)]
+    assert queue.counts() == {"pending": 0, "leased": 1, "done": 0, "failed": 1}
+    error = queue.db.execute("SELECT error FROM urls WHERE state = 'failed'").fetchone()
+    assert error == ("lease expired",)
+
+
+def test_lease_uses_index(tmp_path):
+    queue = CrawlQueue(str(tmp_path / "crawl.sqlite"), shards=2)
+    for shards in ("", "AND shard = 1"):
+        plan = queue.db.execute(
+            f"EXPLAIN QUERY PLAN SELECT url, depth FROM urls WHERE state = 'pending' {shards} "
+            "ORDER BY depth LIMIT 10"
+        ).fetchall()
+        assert "USING INDEX" in str(plan) and "TEMP B-TREE" not in str(plan)
+
+
+def test_crawl_workers(stand_in_wiki, tmp_path):
+    graph = {f"A{i}": [f"A{(i * 7 + j) % 40}" for j in range(1, 4)] for i in range(40)}
+    graph["Unreachable"] = ["A0"]
+    wiki = stand_in_wiki(graph)
+    path = str(tmp_path / "crawl.sqlite")
+    CrawlQueue(path).add([wiki.article("A0")])
+
+    # a worker that leases some urls and crashes
+    assert len(CrawlQueue(path, lease_timeout=0.5).lease("crashed", n=1)) == 1
+
+    workers = [
+        multiprocessing.Process(
+            target=crawl,
+            args=(path,),
+            kwargs={"worker": f"worker-{i}", "batch": 4, "lease_timeout": 0.5, "poll": 0.1},
+        )
+        for i in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    queue = CrawlQueue(path)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 40, "failed": 0}
+    assert queue.finished()
+    # every page fetched once, including the one leased by the crashed worker
+    assert sorted(wiki.requests) == sorted(f"/wiki/A{i}" for i in range(40))
+    workers = {row[0] for row in queue.db.execute("SELECT worker FROM urls")}
+    assert "crashed" not in workers
+
+    # a finished crawl has nothing to do
+    assert crawl(path).pages == 0
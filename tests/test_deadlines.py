@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from deadlines import (
+    DeadlineExceeded,
+    Hedger,
+    deadline,
+    hedging,
+    request_timeout,
+    time_left,
+)
+from pipeline import Pipeline
+from requesting_urls import get_html
+
+
+def test_request_timeout():
+    assert request_timeout((5, 30)) == (5, 30)
+    assert time_left() is None
+
+    with deadline(10):
+        connect, read = request_timeout((5, 30))
+        assert connect == 5 and 9 < read <= 10
+
+        # a nested deadline can only be sooner
+        with deadline(60):
+            assert time_left() <= 10
+        with deadline(1):
+            assert request_timeout(30) <= 1
+
+    with deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            request_timeout()
+
+
+def test_get_html_deadline(stand_in_wiki):
+    wiki = stand_in_wiki({"A": ["B"], "B": []})
+    wiki.delays["/wiki/A"] = [5.0]
+
+    start = time.perf_counter()
+    with deadline(0.5), pytest.raises(DeadlineExceeded):
+        get_html(wiki.article("A"))
+
+    assert time.perf_counter() - start < 2
+    # the next request isn't delayed
+    with deadline(5):
+        assert "/wiki/B" in get_html(wiki.article("A"))
+
+
+def test_get_html_deadline_drip(stand_in_wiki):
+    wiki = stand_in_wiki({"A": ["B"], "B": []})
+    # every read gets a byte well within the read timeout
+    wiki.drips["/wiki/A"] = 0.2
+
+    start = time.perf_counter()
+    with deadline(0.5), pytest.raises(DeadlineExceeded):
+        get_html(wiki.article("A"), timeout=(5, 1))
+
+    assert time.perf_counter() - start < 1
+
+
+def test_get_html_deadline_cached(stand_in_wiki, tmp_path):
+    requests_cache = pytest.importorskip("requests_cache")
+    wiki = stand_in_wiki({"A": ["B"], "B": []})
+
+    with requests_cache.enabled(str(tmp_path / "cache")):
+        with deadline(5):
+            first = get_html(wiki.article("A"))
+            # answered from the cache the page was saved to
+            assert get_html(wiki.article("A")) == first
+        assert get_html(wiki.article("A")) == first
+
+    assert wiki.requests == ["/wiki/A"]
+
+
+def test_pipeline_deadline():
+    def fetch(delay):
+        # the fetch threads get the deadline of the caller
+        assert time_left() is not None
+        time.sleep(delay)
+        return "x"
+
+    pipeline = Pipeline(fetch=fetch, parse=len, threads=2, processes=0)
+    results = []
+    start = time.perf_counter()
+
+    with deadline(0.5), pytest.raises(DeadlineExceeded):
+        for delay, _ in pipeline.run([0.0, 0.1, 5.0, 0.0]):
+            results.append(delay)
+
+    assert results == [0.0, 0.1]
+    assert time.perf_counter() - start < 2
+    assert pipeline.cancelled.is_set()
+
+
+def stalls_once(calls, stall):
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(len(calls))
+            n = calls[-1]
+        if n == stall:
+            time.sleep(3)
+            return "slow"
+        time.sleep(0.01)
+        return "fast"
+
+    return request
+
+
+def test_hedger():
+    hedger = Hedger(min_samples=10, budget=0.5)
+    calls = []
+    request = stalls_once(calls, stall=10)
+
+    assert all(hedger.call(request) == "fast" for _ in range(10))
+    assert 0 < hedger.delay() < 1
+
+    start = time.perf_counter()
+    assert hedger.call(request) == "fast"
+    assert time.perf_counter() - start < 1
+    assert (hedger.requests, hedger.hedges, hedger.wins) == (11, 1, 1)
+    hedger.close()
+
+
+def test_hedger_budget():
+    hedger = Hedger(min_samples=10, budget=0.0)
+    calls = []
+    request = stalls_once(calls, stall=10)
+
+    for _ in range(10):
+        hedger.call(request)
+
+    assert hedger.call(request) == "slow"
+    assert hedger.hedges == 0
+    assert len(calls) == 11
+    hedger.close()
+
+
+def test_hedger_async():
+    cancelled = []
+
+    async def main():
+        hedger = Hedger(min_samples=5, budget=1.0)
+        calls = []
+
+        async def request():
+            calls.append(None)
+            try:
+                await asyncio.sleep(3 if len(calls) == 6 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(len(calls))
+                raise
+            return len(calls)
+
+        for _ in range(5):
+            await hedger.call_async(request)
+
+        start = time.perf_counter()
+        await hedger.call_async(request)
+        assert time.perf_counter() - start < 1
+        assert hedger.wins == 1
+
+    asyncio.run(main())
+    # the stalled request was cancelled
+    assert len(cancelled) == 1
+
+
+def test_get_html_hedged(stand_in_wiki):
+    wiki = stand_in_wiki({"A": ["B"], "B": []})
+    # the 11th request stalls
+    wiki.delays["/wiki/A"] = [0.0] * 10 + [3.0]
+
+    with hedging(min_samples=10, budget=0.5) as hedger:
+        for _ in range(10):
+            get_html(wiki.article("A"))
+
+        start = time.perf_counter()
+        assert "/wiki/B" in get_html(wiki.article("A"))
+        assert time.perf_counter() - start < 2
+
+    assert hedger.hedges == 1
+    assert wiki.requests.count("/wiki/A") == 12
@@ -1,16 +1,52 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from operator import itemgetter
 from pathlib import Path
 
+import fetch_player_statistics
+import pandas as pd
 import pytest
 from fetch_player_statistics import (
+    career_id_pat,
+    career_stats,
+    best_players,
     find_best_players,
+    find_career_table,
+    find_table_fragment,
     get_player_stats,
+    get_player_stats_async,
     get_players,
+    get_players_async,
     get_teams,
+    get_teams_async,
+    playoff_season,
+    rank_players,
+    render_best,
+    render_seasons,
+    season_stats,
 )
+from requesting_urls import close_async_session
 
 playoff_url = "https://en.wikipedia.org/wiki/2022_NBA_playoffs"
 
+sample_player_page = """
+<html><body>
+<h2 id="Early_life">Early life</h2>
+<table><tr><td>not this one</td></tr></table>
+<h2 id="NBA_career_statistics">NBA career statistics</h2>
+<table><tr><td>Legend</td><td><table><tr><td>nested</td></tr></table></td></tr></table>
+<table class="wikitable sortable">
+  <tr><th>Year</th><th>Team</th><th>GP</th><th>GS</th><th>MPG</th><th>FG%</th>
+  <th>3P%</th><th>FT%</th><th>RPG</th><th>APG</th><th>SPG</th><th>BPG</th><th>PPG</th></tr>
+  <tr><td>2020–21</td><td>Milwaukee</td><td>61</td><td>61</td><td>33.0</td><td>.569</td>
+  <td>.303</td><td>.685</td><td>11.0</td><td>5.9</td><td>1.2</td><td>1.2</td><td>28.1</td></tr>
+  <tr><td>2021–22</td><td>Milwaukee</td><td>67</td><td>67</td><td>32.9</td><td>.553</td>
+  <td>.293</td><td>.722</td><td>11.6</td><td>5.8</td><td>1.1</td><td>1.4</td><td>29.9*</td></tr>
+</table>
+<table><tr><td>after</td></tr></table>
+</body></html>
+"""
+
 
 def test_get_teams():
     teams = get_teams(playoff_url)
@@ -119,6 +155,219 @@ def test_get_player_stats(player_url, team, stats):
         assert player_stats[key] == value
 
 
+def test_find_table_fragment():
+    # the nested table inside the legend counts, like find_next("table")
+    fragment = find_table_fragment(sample_player_page, career_id_pat, n=2)
+    assert fragment == "<table><tr><td>nested</td></tr></table>"
+
+    fragment = find_table_fragment(sample_player_page, career_id_pat, n=3)
+    assert fragment.startswith('<table class="wikitable sortable">')
+    assert fragment.endswith("</table>")
+    assert "after" not in fragment
+
+    assert find_table_fragment("<p>no anchor</p>", career_id_pat) is None
+
+
+def test_find_career_table_fast_matches_full():
+    page = sample_player_page.replace(
+        "<td>Legend</td><td><table><tr><td>nested</td></tr></table></td>",
+        "<td>Legend</td>",
+    )
+    fast = find_career_table(page, fast=True)
+    full = find_career_table(page, fast=False)
+    rows = lambda table: [
+        [td.get_text(strip=True) for td in tr.find_all("td")]
+        for tr in table.find_all("tr")
+    ]
+    assert rows(fast) == rows(full)
+    assert rows(fast)[2][12] == "29.9*"
+
+
+def test_career_stats():
+    page = sample_player_page.replace(
+        "<td>Legend</td><td><table><tr><td>nested</td></tr></table></td>",
+        "<td>Legend</td>",
+    )
+    seasons = career_stats(page)
+    assert [row["season"] for row in seasons] == ["2020–21", "2021–22"]
+    assert seasons[1] == {
+        "season": "2021–22",
+        "team": "Milwaukee",
+        "points": 29.9,
+        "assists": 5.8,
+        "rebounds": 11.6,
+    }
+
+    assert season_stats(seasons, "milwaukee") == {"points": 29.9, "assists": 5.8, "rebounds": 11.6}
+    assert season_stats(seasons, "Milwaukee", season="2020–21")["points"] == 28.1
+    assert season_stats(seasons, "Boston") == {}
+
+
+def test_get_player_stats_section(stand_in_wiki):
+    page = sample_player_page.replace(
+        "<td>Legend</td><td><table><tr><td>nested</td></tr></table></td>",
+        "<td>Legend</td>",
+    )
+    wiki = stand_in_wiki({}, pages={"Giannis": page})
+    url = wiki.article("Giannis")
+
+    stats = get_player_stats(url, "Milwaukee", section=True)
+    assert stats == {"points": 29.9, "assists": 5.8, "rebounds": 11.6}
+    assert not any(request.startswith("/wiki/") for request in wiki.requests)
+
+
+def test_rank_players():
+    players = pd.DataFrame(
+        [
+            ("A", "a1", 10.0, 1.0),
+            ("A", "a2", 20.0, None),
+            ("A", "a3", 20.0, 3.0),
+            ("A", "a4", 5.0, 4.0),
+            ("B", "b1", None, 2.0),
+            ("B", "b2", 7.0, 1.0),
+        ],
+        columns=["team", "name", "points", "assists"],
+    )
+
+    top = rank_players(players, stats=["points", "assists"], n=2)
+    points = top[top.stat == "points"]
+    # ties are broken by row order, players without the stat are skipped
+    assert list(points.name) == ["a2", "a3", "b2"]
+    assert list(points["rank"]) == [1, 2, 1]
+    assists = top[top.stat == "assists"]
+    assert list(assists.name) == ["a4", "a3", "b1", "b2"]
+    assert list(assists.value) == [4.0, 3.0, 2.0, 1.0]
+
+    top = rank_players(players, stats=["points"], n=1, ties="min")
+    assert list(top.name) == ["a2", "a3", "b2"]
+
+
+sample_best = {
+    "UiO": [{"name": "Oscar", "points": 10.0, "assists": 1.0, "rebounds": 3.0}],
+    "Simula": [
+        {"name": "Ingeborg", "points": 11.2, "assists": 2.5, "rebounds": 4.0},
+        {"name": "Min", "points": 4.5, "assists": 0.5, "rebounds": 1.0},
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        ({}, ["points.png", "assists.png", "rebounds.png"]),
+        ({"fmt": "svg"}, ["points.svg", "assists.svg", "rebounds.svg"]),
+        ({"subplots": True, "dpi": 30}, ["best.png"]),
+    ],
+)
+def test_render_best(tmp_path, kwargs, expected):
+    filenames = render_best(sample_best, stats_dir=str(tmp_path), **kwargs)
+    assert [Path(f).name for f in filenames] == expected
+    for name in expected:
+        assert tmp_path.joinpath(name).stat().st_size > 0
+
+
+def test_render_seasons(tmp_path):
+    filenames = render_seasons(
+        {"2021": sample_best, "2022": sample_best},
+        stats_dir=str(tmp_path),
+        processes=2,
+        stats=["points"],
+    )
+    assert set(filenames) == {"2021", "2022"}
+    assert tmp_path.joinpath("2022", "points.png").exists()
+
+
+def playoffs_page(teams):
+    # the first round seeds with team links, then the semifinal seeds
+    rows = ["<tr><th>First round</th></tr>", "<tr><th>Seeds</th></tr>"]
+    for i, team in enumerate(teams):
+        link = f'<a href="/wiki/{team}_season">{team}</a>'
+        rows.append(f"<tr><td></td><td>{'EW'[i // 8]}{i % 8 + 1}</td><td>{link}</td></tr>")
+    for i, team in enumerate(teams[:8]):
+        rows.append(f"<tr><td></td><td></td><td>{'EW'[i // 4]}{i % 4 + 1}</td><td>{team}</td></tr>")
+    return f'<h2 id="Bracket"></h2><table>{"".join(rows)}</table>'
+
+
+def roster_page(players):
+    rows = ["<tr><th>Players</th></tr>", "<tr><th>Roster</th></tr>", "<tr><th>Pos.</th></tr>"]
+    for player in players:
+        rows.append(f'<tr><td>F</td><td>1</td><td><a href="/wiki/{player}">{player}</a></td></tr>')
+    return f'<h2 id="Roster"></h2><table>{"".join(rows)}</table>'
+
+
+def test_best_players_fetches_players_once(monkeypatch):
+    player_page = sample_player_page.replace(
+        "<td>Legend</td><td><table><tr><td>nested</td></tr></table></td>",
+        "<td>Legend</td>",
+    )
+    teams = ["Milwaukee"] + [f"Team_{i}" for i in range(15)]
+    pages = {
+        "2021_NBA_playoffs": playoffs_page(teams),
+        "2022_NBA_playoffs": playoffs_page(teams),
+        **{f"{team}_season": roster_page(["Giannis", "Khris"]) for team in teams},
+        "Giannis": player_page,
+        "Khris": player_page.replace("28.1", "20.1").replace("29.9", "22.1"),
+    }
+    fetched = []
+
+    def get_html(url):
+        fetched.append(url)
+        return pages[url.rsplit("/", 1)[1]]
+
+    monkeypatch.setattr(fetch_player_statistics, "get_html", get_html)
+    urls = [f"https://en.wikipedia.org/wiki/{year}_NBA_playoffs" for year in [2021, 2022]]
+    playoffs = {playoff_season(url): url for url in urls}
+    assert list(playoffs) == ["2020–21", "2021–22"]
+
+    best = best_players(playoffs, cache=False)
+    # every player page once, for both seasons
+    assert sum(url.endswith("/Giannis") for url in fetched) == 1
+    assert sum(url.endswith("/Khris") for url in fetched) == 1
+
+    assert [p["points"] for p in best["2020–21"]["Milwaukee"]] == [28.1, 20.1]
+    assert [p["points"] for p in best["2021–22"]["Milwaukee"]] == [29.9, 22.1]
+    # other teams have no stats in these seasons
+    assert set(best["2021–22"]) == {"Milwaukee"}
+
+
+def test_async_scrapers(stand_in_wiki):
+    player_page = sample_player_page.replace(
+        "<td>Legend</td><td><table><tr><td>nested</td></tr></table></td>",
+        "<td>Legend</td>",
+    )
+    teams = ["Milwaukee"] + [f"Team_{i}" for i in range(15)]
+    wiki = stand_in_wiki(
+        {},
+        pages={
+            "Playoffs": playoffs_page(teams),
+            "Milwaukee": roster_page(["Giannis", "Khris"]),
+            "Giannis": player_page,
+        },
+    )
+    urls = [wiki.article(title) for title in ["Playoffs", "Milwaukee", "Giannis"]]
+
+    async def scrape(executor=None):
+        try:
+            return await asyncio.gather(
+                get_teams_async(urls[0], executor=executor),
+                get_players_async(urls[1], executor=executor),
+                get_player_stats_async(urls[2], "Milwaukee", executor=executor),
+                get_player_stats_async(urls[2], "Milwaukee", season="2020–21", executor=executor),
+            )
+        finally:
+            await close_async_session()
+
+    expected = [
+        get_teams(urls[0]),
+        get_players(urls[1]),
+        get_player_stats(urls[2], "Milwaukee"),
+        get_player_stats(urls[2], "Milwaukee", season="2020–21"),
+    ]
+    assert asyncio.run(scrape()) == expected
+    with ProcessPoolExecutor(1) as executor:
+        assert asyncio.run(scrape(executor)) == expected
+
+
 def test_find_best_players(tmpdir):
     tmpdir.chdir()
     find_best_players(playoff_url)
@@ -23,7 +23,7 @@ def test_location(assignment4):
         "filter_urls.py",
         "collect_dates.py",
         "time_planner.py",
-        # "wiki_race_challenge.py",
+        "wiki_race_challenge.py",
     ],
 )
 def test_files_exist(assignment4, filename):
@@ -1,3 +1,5 @@
+import mmap
+
 import pytest
 from filter_urls import find_articles, find_img_src, find_urls
 from requesting_urls import get_html
@@ -115,3 +117,21 @@ def test_find_img_src():
         "https://some.jpg",
         "/foo.png",
     }
+
+
+def test_bytes_input(tmp_path):
+    html = """
+    <a href="/wiki/Tromsø">non-ascii link</a>
+    <a title="Ærø" href="https://example.com/ø?a=1&amp;b=2">absolute URL</a>
+    <img alt="blåbær" src="/bær.png">
+    <IMG SRC="https://some.jpg">
+    """
+    raw = html.encode("utf-8")
+    path = tmp_path / "page.html"
+    path.write_bytes(raw)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for page in (raw, bytearray(raw), memoryview(raw), mapped):
+            assert find_urls(page) == find_urls(html)
+            assert find_img_src(page) == find_img_src(html) == {"/bær.png", "https://some.jpg"}
+    assert "https://en.wikipedia.org/wiki/Tromsø" in find_urls(raw)
@@ -0,0 +1,34 @@
+from freshness import RevisionLog
+
+
+def test_revision_log(stand_in_wiki, tmp_path):
+    wiki = stand_in_wiki({"A": [], "B": []})
+    a, b, missing = wiki.article("A"), wiki.article("B"), wiki.article("Nowhere")
+    path = str(tmp_path / "revisions.json")
+    scraped = []
+
+    def scrape(url):
+        scraped.append(url)
+        return {"url": url, "links": []}
+
+    log = RevisionLog(path)
+    assert log.check([a, b, missing]) == [a, b, missing]
+    for url in [a, b, missing]:
+        log.cached(url, "links", scrape)
+    log.save()
+
+    # a new run only scrapes the changed and missing pages
+    wiki.edit("B", "<html>new</html>")
+    log = RevisionLog(path)
+    assert log.check([a, b, missing]) == [b, missing]
+    results = [log.cached(url, "links", scrape) for url in [a, b, missing]]
+    assert scraped == [a, b, missing, b, missing]
+    assert results[0] == {"url": a, "links": []}
+
+    # recorded results are copies
+    results[0]["links"].append("changed")
+    assert log.get(a, "links") == {"url": a, "links": []}
+
+    # other results of a page are only kept for the same revision
+    assert not log.fresh(a, "teams")
+    assert log.fresh(a, "links")
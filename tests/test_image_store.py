@@ -0,0 +1,62 @@
+import os
+
+from filter_urls import image_urls, normalize_src
+from image_store import ImageStore
+
+
+def test_normalize_src():
+    assert normalize_src("//upload.wikimedia.org/a/ab/Cat.jpg") == (
+        "https://upload.wikimedia.org/a/ab/Cat.jpg"
+    )
+    assert normalize_src("/static/logo.png?a=1&amp;b=2") == (
+        "https://en.wikipedia.org/static/logo.png?a=1&b=2"
+    )
+    assert normalize_src("data:image/png;base64,AAAA") is None
+    assert image_urls('<img src="//x.org/a.png"><img src="//x.org/a.png#top">') == {
+        "https://x.org/a.png"
+    }
+
+
+def test_archive_pages(stand_in_wiki, tmp_path):
+    thumbnail = b"\x89PNG thumbnail" * 1000
+    page = '<p>{}</p><img src="{}"><img src="/images/logo.png">'
+    wiki = stand_in_wiki({})
+    host = wiki.url.split(":", 1)[1]
+    for i in range(20):
+        # the same thumbnail, protocol relative, on every page
+        wiki.edit(f"Page_{i}", page.format(i, f"{host}/images/thumb.png"))
+    # the same content under another URL
+    wiki.edit("Copy", page.format("copy", "/images/thumb_copy.png"))
+    wiki.files = {
+        "/images/thumb.png": thumbnail,
+        "/images/thumb_copy.png": thumbnail,
+        "/images/logo.png": b"logo",
+    }
+    pages = [wiki.article(f"Page_{i}") for i in range(20)] + [wiki.article("Copy")]
+
+    def image_requests():
+        return sum(request.startswith("/images/") for request in wiki.requests)
+
+    store = ImageStore(str(tmp_path / "images"))
+    images = store.archive_pages(pages)
+    assert images[pages[0]] == {f"{wiki.url}/images/thumb.png", f"{wiki.url}/images/logo.png"}
+    # every URL fetched once, and the copy stored once
+    assert image_requests() == 3
+    assert len(store) == 2
+    path = store.get(f"{wiki.url}/images/thumb_copy.png")
+    assert path == store.get(f"{wiki.url}/images/thumb.png")
+    with open(path, "rb") as f:
+        assert f.read() == thumbnail
+    assert os.listdir(tmp_path / "images" / "tmp") == []
+
+    # stored images are only checked, and a changed one is downloaded again
+    wiki.files["/images/logo.png"] = b"new logo"
+    sent = wiki.sent
+    stats = store.download_all(
+        [f"{wiki.url}/images/thumb.png", f"{wiki.url}/images/logo.png", f"{wiki.url}/missing.png"]
+    )
+    assert (stats.not_modified, stats.downloaded, stats.errors) == (1, 1, 1)
+    assert stats.bytes == len(b"new logo")
+    assert wiki.sent - sent < len(thumbnail)
+    with open(store.get(f"{wiki.url}/images/logo.png"), "rb") as f:
+        assert f.read() == b"new logo"
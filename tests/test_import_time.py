@@ -0,0 +1,70 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+assignment4 = Path(__file__).parent.parent.absolute()
+
+# modules that are slow to import, and should only be loaded when used
+heavy_modules = ["bs4", "pandas", "numpy", "matplotlib", "requests", "requests_cache", "aiohttp"]
+
+# upper limit on the cumulative import time of each module, in microseconds
+import_budget = 100_000
+
+
+def import_times(module: str) -> dict:
+    """Imports a module in a fresh interpreter with -X importtime.
+
+    Returns the cumulative import time in microseconds of every imported module.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=assignment4,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "requesting_urls",
+        "filter_urls",
+        "collect_dates",
+        "time_planner",
+        "fetch_player_statistics",
+        "tracing",
+        "memory",
+        "freshness",
+        "image_store",
+        "crawl_queue",
+        "deadlines",
+    ],
+)
+def test_import_is_lazy(module):
+    times = import_times(module)
+    assert module in times
+    for heavy in heavy_modules:
+        assert heavy not in times, f"importing {module} loads {heavy}"
+    assert times[module] < import_budget
+
+
+def test_import_has_no_side_effects(tmp_path):
+    subprocess.run(
+        [sys.executable, "-c", "import fetch_player_statistics"],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(assignment4)},
+        check=True,
+    )
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,59 @@
+import time
+
+from link_cache import LinkCache
+
+
+def test_get_put(tmp_path):
+    cache = LinkCache(str(tmp_path / "links.sqlite"))
+    assert cache.get("https://en.wikipedia.org/wiki/A") is None
+
+    cache.put("https://en.wikipedia.org/wiki/A", {"x", "y"}, revision=5)
+    cache.put("https://en.wikipedia.org/wiki/B", set())
+    cache.put("https://en.wikipedia.org/wiki/A", {"z"}, kind="backlinks")
+    cache.close()
+
+    # links survive reopening the cache
+    cache = LinkCache(str(tmp_path / "links.sqlite"))
+    assert cache.get("https://en.wikipedia.org/wiki/A") == {"x", "y"}
+    assert cache.get("https://en.wikipedia.org/wiki/B") == set()
+    assert cache.get("https://en.wikipedia.org/wiki/A", kind="backlinks") == {"z"}
+    assert cache.revision("https://en.wikipedia.org/wiki/A") == 5
+    assert len(cache) == 3
+
+
+def test_max_pages_evicts_least_recently_used(tmp_path):
+    cache = LinkCache(str(tmp_path / "links.sqlite"), max_pages=2)
+    cache.put("A", {"x"})
+    cache.put("B", {"x"})
+    time.sleep(0.01)
+    cache.get("A")
+    cache.put("C", {"x"})
+    assert len(cache) == 2
+    assert cache.get("B") is None
+    assert cache.get("A") == {"x"}
+
+
+def test_max_age(tmp_path):
+    cache = LinkCache(str(tmp_path / "links.sqlite"), max_age=0.05)
+    cache.put("A", {"x"})
+    assert cache.get("A") == {"x"}
+    time.sleep(0.1)
+    assert cache.get("A") is None
+    assert cache.prune() == 1
+    assert len(cache) == 0
+
+
+def test_get_writes_nothing(tmp_path):
+    cache = LinkCache(str(tmp_path / "links.sqlite"))
+    cache.put("A", {"x"})
+    changes = cache.db.total_changes
+
+    for _ in range(10):
+        assert cache.get("A") == {"x"}
+    assert cache.db.total_changes == changes
+
+    # when it was used is kept once the cache is closed
+    used = cache.used["A", "links"]
+    cache.close()
+    cache = LinkCache(str(tmp_path / "links.sqlite"))
+    assert cache.db.execute("SELECT used FROM pages").fetchone() == (used,)
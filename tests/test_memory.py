@@ -0,0 +1,69 @@
+import gc
+
+import fetch_player_statistics
+import time_planner
+from bs4 import BeautifulSoup
+from fetch_player_statistics import get_player_stats
+from memory import memory_report, peak_rss, release
+from test_fetch_player_statistics import sample_player_page
+from test_time_planner import sample_table
+
+
+def test_release():
+    soup = BeautifulSoup(sample_table, "html.parser")
+    table = soup.find("table")
+    cell = soup.find("td")
+    release(cell)
+    assert soup.decomposed
+    assert table.decomposed
+    assert soup.find("td") is None
+
+
+def test_low_memory_results(monkeypatch):
+    monkeypatch.setattr(fetch_player_statistics, "get_html", lambda url: sample_player_page)
+    for fast in [True, False]:
+        assert get_player_stats("player", "Milwaukee", fast=fast, low_memory=True) == (
+            get_player_stats("player", "Milwaukee", fast=fast)
+        )
+
+    page = sample_table.replace("<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">')
+    monkeypatch.setattr(time_planner, "get_html", lambda url: page)
+    assert time_planner.time_plan("season", low_memory=True) == time_planner.time_plan("season")
+
+
+def test_low_memory_frees_trees(monkeypatch):
+    page = sample_player_page.replace("<h2 id=\"Early_life\">", "<p>padding</p>" * 1000 + "<h2>")
+    monkeypatch.setattr(fetch_player_statistics, "get_html", lambda url: page)
+
+    def retained(low_memory):
+        gc.collect()
+        gc.disable()
+        try:
+            with memory_report() as report:
+                for _ in range(3):
+                    get_player_stats("player", "Milwaukee", fast=False, low_memory=low_memory)
+                report.sample()
+        finally:
+            gc.enable()
+        return report.sampled
+
+    # without the garbage collector, the cyclic trees are only freed if released
+    assert retained(low_memory=True) * 10 < retained(low_memory=False)
+
+
+def test_memory_report():
+    with memory_report(top=3) as report:
+        data = [bytes(1000) for _ in range(1000)]
+        report.sample()
+        del data
+
+    assert report.peak >= 1_000_000
+    assert report.sampled >= 1_000_000
+    assert 1 <= len(report.top) <= 3
+    assert "test_memory.py" in report.top[0][0]
+    assert report.rss is None or report.rss >= peak_rss() // 2
+    assert "peak RSS" in str(report)
+
+    with memory_report(enabled=False) as report:
+        report.sample()
+    assert report.top == []
@@ -0,0 +1,130 @@
+import gzip
+
+import numpy as np
+import offline_wiki_race
+import pytest
+from offline_wiki_race import OfflineGraph, build_graph, read_links
+
+links_tsv = """Start\tA
+Start\tB
+A\tC
+B\tC
+B\tB
+C\tFinish
+Finish\tStart
+Zürich\tStart
+Python_(programming_language)\tA
+"""
+
+pages_sql = """-- MySQL dump
+INSERT INTO `page` VALUES (1,0,'Start',0,0,0.1),(2,0,'A',0,0,0.1),(3,0,'It\\'s',0,0,0.1),(4,14,'Category',0,0,0.1);
+"""
+
+pagelinks_sql = """INSERT INTO `pagelinks` VALUES (1,0,'A',0),(1,0,'It\\'s',0),(2,0,'Finish',0),(4,0,'A',14),(1,2,'User',0);
+"""
+
+base_url = "https://en.wikipedia.org"
+
+
+def url(title):
+    return f"{base_url}/wiki/{title}"
+
+
+@pytest.fixture
+def graph(tmp_path):
+    links = tmp_path / "links.tsv.gz"
+    with gzip.open(links, "wt", encoding="utf-8") as f:
+        f.write(links_tsv)
+    build_graph(str(links), str(tmp_path / "graph"))
+    return OfflineGraph(str(tmp_path / "graph"))
+
+
+def test_read_links_sql(tmp_path):
+    pages = tmp_path / "page.sql"
+    pages.write_text(pages_sql)
+    links = tmp_path / "pagelinks.sql"
+    links.write_text(pagelinks_sql)
+
+    assert list(read_links(str(links), str(pages))) == [
+        ("Start", "A"),
+        ("Start", "It's"),
+        ("A", "Finish"),
+    ]
+
+
+def test_read_links_sql_linktarget(tmp_path):
+    pages = tmp_path / "page.sql"
+    pages.write_text(pages_sql)
+    links = tmp_path / "pagelinks.sql.gz"
+    with gzip.open(links, "wt", encoding="utf-8") as f:
+        f.write(
+            "CREATE TABLE `pagelinks` (\n  `pl_from` int(8) unsigned NOT NULL DEFAULT 0,\n"
+            "  `pl_from_namespace` int(11) NOT NULL DEFAULT 0,\n"
+            "  `pl_target_id` bigint(20) unsigned NOT NULL,\n);\n"
+            "INSERT INTO `pagelinks` VALUES (1,0,10),(1,0,11),(2,0,12),(4,14,10),(1,0,13);\n"
+        )
+    targets = tmp_path / "linktarget.sql"
+    targets.write_text(
+        "INSERT INTO `linktarget` VALUES (10,0,'A'),(11,0,'It\\'s'),(12,0,'Finish'),(13,2,'User');\n"
+    )
+
+    assert list(read_links(str(links), str(pages), str(targets))) == [
+        ("Start", "A"),
+        ("Start", "It's"),
+        ("A", "Finish"),
+    ]
+    with pytest.raises(ValueError, match="linktarget"):
+        list(read_links(str(links), str(pages)))
+
+
+def test_build_graph_in_chunks(tmp_path, monkeypatch):
+    links = tmp_path / "links.tsv"
+    # with a repeated link, stored once
+    links.write_text(links_tsv + "A\tC\n")
+    build_graph(str(links), str(tmp_path / "whole"))
+    assert len(np.load(tmp_path / "whole" / "indices.npy")) == len(links_tsv.splitlines())
+    # so small that the edges and the rows are sorted in many blocks
+    monkeypatch.setattr(offline_wiki_race, "chunk_size", 2)
+    build_graph(str(links), str(tmp_path / "chunked"))
+
+    for name in ["indptr", "indices", "rev_indptr", "rev_indices"]:
+        whole = np.load(tmp_path / "whole" / f"{name}.npy")
+        assert np.array_equal(np.load(tmp_path / "chunked" / f"{name}.npy"), whole)
+    assert sorted(p.name for p in (tmp_path / "chunked").iterdir() if p.suffix == ".tmp") == []
+
+
+def test_titles(graph):
+    assert len(graph) == 7
+    for title in ["A", "Finish", "Zürich", "Python_(programming_language)"]:
+        assert graph.title(graph.title_id(title)) == title
+    assert graph.title_id("Missing") is None
+    assert graph.url(graph.title_id("Python_(programming_language)")) == url(
+        "Python_(programming_language)"
+    )
+
+
+@pytest.mark.parametrize(
+    "start, finish, length",
+    [
+        ("Start", "Finish", 4),
+        ("Z%C3%BCrich", "C", 4),
+        ("Finish", "Start", 2),
+        ("A", "A", 1),
+    ],
+)
+def test_find_path(graph, start, finish, length):
+    path = graph.find_path(url(start), url(finish))
+    assert path[0] == url(start)
+    assert path[-1] == url(finish)
+    assert len(path) == length
+    for a, b in zip(path, path[1:]):
+        assert graph.title_id(b.split("/wiki/")[1]) in graph.indices[
+            graph.indptr[graph.url_id(a)]:graph.indptr[graph.url_id(a) + 1]
+        ]
+
+
+def test_find_path_errors(graph):
+    with pytest.raises(ValueError):
+        graph.find_path(url("Start"), url("Zürich"))
+    with pytest.raises(ValueError):
+        graph.find_path(url("Start"), url("Missing"))
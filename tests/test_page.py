@@ -0,0 +1,49 @@
+from collect_dates import find_dates
+from filter_urls import find_articles, find_img_src, find_urls
+from page import Page
+from time_planner import extract_events
+
+sample_page = """
+<html><body>
+<p>Born 2 January 2020, died on 2022-04-15.</p>
+<a href="/wiki/Peace#History">Peace</a>
+<a id="x" href="https://no.wikipedia.org/wiki/Fred">Fred</a>
+<a href="https://example.com">example</a>
+<abbr title="abbreviation">abbr</abbr>
+<img src="//upload.wikimedia.org/a.png"><IMG alt="b" src="/b.png"><img nosrc>
+<h2 id="Calendar">Calendar</h2>
+<table><tr><td>legend</td></tr></table>
+<table class="wikitable sortable">
+  <tr><th>Date</th><th>Venue</th><th>Type</th></tr>
+  <tr><td>October</td><td>Sölden</td><td>GS</td></tr>
+</table>
+</body></html>
+"""
+
+
+def test_page_matches_functions():
+    page = Page(sample_page)
+    assert page.links == find_urls(sample_page)
+    assert page.articles == find_articles(sample_page)
+    assert page.images == find_img_src(sample_page)
+    assert page.dates == find_dates(sample_page)
+    assert page.images == {"//upload.wikimedia.org/a.png", "/b.png"}
+    assert "Born 2 January 2020" in page.text
+    assert "<p>" not in page.text
+
+
+def test_page_parses_once():
+    page = Page(sample_page)
+    assert page.links is page.links
+    assert len(page.tags["a"]) == 4
+    assert page.soup is page.soup
+    assert len(page.tables) == 2
+    assert page.tables[0] is page.soup.find("table")
+
+
+def test_table_after():
+    page = Page(sample_page)
+    table = page.table_after("Calendar", class_="wikitable sortable")
+    assert list(extract_events(table)["Venue"]) == ["Sölden"]
+    assert page.table_after("Calendar", n=2) is table
+    assert page.table_after("Missing") is None
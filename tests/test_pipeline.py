@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from pipeline import Pipeline
+
+
+def test_pipeline_ordered():
+    pipeline = Pipeline(fetch=lambda n: "x" * n, parse=len, threads=4, processes=2)
+    items = [5, 0, 3, 8, 1, 2, 7]
+
+    assert list(pipeline.run(items)) == [(n, n) for n in items]
+    assert pipeline.metrics["fetch"].items == len(items)
+    assert pipeline.metrics["parse"].items == len(items)
+    assert pipeline.throughput("parse") > 0
+    assert "parse" in pipeline.report()
+
+
+def test_pipeline_as_completed():
+    def fetch(delay):
+        time.sleep(delay)
+        return "x"
+
+    pipeline = Pipeline(fetch=fetch, parse=len, threads=3, processes=0, ordered=False)
+    results = [delay for delay, _ in pipeline.run([0.3, 0.0, 0.15])]
+
+    assert results == [0.0, 0.15, 0.3]
+
+
+def test_pipeline_backpressure():
+    fetched = []
+    max_pending = 3
+
+    def fetch(n):
+        fetched.append(n)
+        return str(n)
+
+    pipeline = Pipeline(fetch=fetch, parse=len, threads=4, processes=0, max_pending=max_pending)
+
+    for yielded, (n, _) in enumerate(pipeline.run(range(20)), start=1):
+        # a slow caller holds back the fetching
+        time.sleep(0.02)
+        assert len(fetched) <= yielded + max_pending
+
+    assert pipeline.metrics["fetch"].max_depth <= max_pending
+
+
+def test_pipeline_error():
+    def fetch(n):
+        if n == 2:
+            raise ValueError("no such page")
+        return str(n)
+
+    pipeline = Pipeline(fetch=fetch, parse=int, threads=2, processes=1)
+
+    with pytest.raises(ValueError, match="no such page"):
+        list(pipeline.run(range(5)))
+    assert pipeline.metrics["fetch"].errors == 1
+
+
+def test_pipeline_return_errors():
+    def fetch(n):
+        if n == 2:
+            raise ValueError("no such page")
+        return str(n)
+
+    pipeline = Pipeline(fetch=fetch, parse=int, threads=2, processes=1, errors="return")
+    results = dict(pipeline.run(range(5)))
+
+    assert isinstance(results.pop(2), ValueError)
+    assert results == {0: 0, 1: 1, 3: 3, 4: 4}
+
+
+def test_pipeline_cancel():
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(n):
+        with lock:
+            fetched.append(n)
+        time.sleep(0.01)
+        return str(n)
+
+    pipeline = Pipeline(fetch=fetch, parse=len, threads=2, processes=0, max_pending=4)
+    results = pipeline.run(range(1000))
+    next(results)
+    results.close()
+    time.sleep(0.2)
+
+    assert pipeline.cancelled.is_set()
+    assert len(fetched) < 10
@@ -0,0 +1,131 @@
+import numpy as np
+import player_stats_store
+import pytest
+from bs4 import BeautifulSoup
+from player_stats_store import PlayerStatsStore, parse_career_table
+
+career_table = """
+<table class="wikitable sortable">
+  <tr><th>Year</th><th>Team</th><th>GP</th><th>GS</th><th>MPG</th><th>FG%</th>
+  <th>3P%</th><th>FT%</th><th>RPG</th><th>APG</th><th>SPG</th><th>BPG</th><th>PPG</th></tr>
+  <tr><td rowspan="2">2019–20</td><td>Dallas</td><td>20</td><td>0</td><td>10.0</td><td>.400</td>
+  <td>—</td><td>.700</td><td>2.0</td><td>1.0</td><td>.5</td><td>.1</td><td>4.0</td></tr>
+  <tr><td>Milwaukee</td><td>30</td><td>2</td><td>12.0</td><td>.450</td>
+  <td>.300</td><td>.750</td><td>3.0</td><td>1.5</td><td>.6</td><td>.2</td><td>6.0</td></tr>
+  <tr><td>2021–22†</td><td>Milwaukee*</td><td>67</td><td>67</td><td>32.9</td><td>.553</td>
+  <td>.293</td><td>.722</td><td>11.6</td><td>5.8</td><td>1.1</td><td>1.4</td><td>29.9*</td></tr>
+  <tr><td colspan="2">Career</td><td>117</td><td>69</td><td>20.0</td><td>.500</td>
+  <td>.290</td><td>.720</td><td>7.0</td><td>3.0</td><td>.8</td><td>.8</td><td>15.0</td></tr>
+</table>
+"""
+
+
+def player_page(ppg):
+    return (
+        '<h2 id="NBA_career_statistics">NBA</h2><table><tr><td>Legend</td></tr></table>'
+        + career_table.replace("29.9*", ppg)
+    )
+
+
+def test_parse_career_table():
+    table = BeautifulSoup(career_table, "html.parser").find("table")
+    rows = parse_career_table(table)
+    assert [row[:2] for row in rows] == [
+        ("Dallas", "2019–20"),
+        ("Milwaukee", "2019–20"),
+        ("Milwaukee", "2021–22"),
+    ]
+    assert rows[2][-1] == 29.9
+    assert np.isnan(rows[0][6])
+
+
+def test_store_incremental_update(tmp_path, monkeypatch):
+    pages = {"https://en.wikipedia.org/wiki/A": player_page("29.9")}
+    fetched = []
+
+    def get_html(url):
+        fetched.append(url)
+        return pages[url]
+
+    monkeypatch.setattr(player_stats_store, "get_html", get_html)
+    players = [{"name": "A", "url": "https://en.wikipedia.org/wiki/A"}]
+
+    store = PlayerStatsStore(str(tmp_path))
+    assert store.update(players, revisions={players[0]["url"]: 1}) == [players[0]["url"]]
+    assert len(store.query()) == 3
+
+    # unchanged revision, nothing is fetched
+    store = PlayerStatsStore(str(tmp_path))
+    assert store.update(players, revisions={players[0]["url"]: 1}) == []
+    assert len(fetched) == 1
+
+    # changed revision replaces the player's rows
+    pages[players[0]["url"]] = player_page("31.0")
+    store.update(players, revisions={players[0]["url"]: 2})
+    rows = store.query(season="2021-22", team="milwaukee", columns=["ppg"])
+    assert len(rows) == 1
+    assert rows["ppg"][0] == pytest.approx(31.0)
+    assert len(PlayerStatsStore(str(tmp_path)).query(player="A")) == 3
+
+
+def test_store_update_failure(tmp_path, monkeypatch):
+    pages = {"https://en.wikipedia.org/wiki/A": player_page("29.9")}
+
+    def get_html(url):
+        if url not in pages:
+            raise ConnectionError(f"no answer from {url}")
+        return pages[url]
+
+    monkeypatch.setattr(player_stats_store, "get_html", get_html)
+    players = [
+        {"name": name, "url": f"https://en.wikipedia.org/wiki/{name}"} for name in "AB"
+    ]
+    revisions = {player["url"]: 1 for player in players}
+
+    with pytest.raises(ConnectionError):
+        PlayerStatsStore(str(tmp_path)).update(players, revisions=revisions)
+
+    # the player fetched before the failure is stored, the other isn't marked current
+    store = PlayerStatsStore(str(tmp_path))
+    assert len(store.query(player="A")) == 3
+    assert store.revisions == {players[0]["url"]: 1}
+
+    pages[players[1]["url"]] = player_page("20.0")
+    assert store.update(players, revisions=revisions) == [players[1]["url"]]
+    assert len(store.query(player="B")) == 3
+
+
+def test_store_long_values(tmp_path, monkeypatch):
+    url = "https://en.wikipedia.org/wiki/" + "A" * 300
+    monkeypatch.setattr(player_stats_store, "get_html", lambda url: player_page("29.9"))
+    players = [{"name": "A" * 100, "url": url}]
+
+    store = PlayerStatsStore(str(tmp_path))
+    store.update(players, revisions={url: 1})
+    assert len(store.query(player=url)) == 3
+
+    # the rows of a long url are replaced, not duplicated
+    store = PlayerStatsStore(str(tmp_path))
+    store.update(players, revisions={url: 2})
+    assert len(store.query()) == 3
+    assert store.query()["player"][0] == "A" * 100
+
+
+def test_store_revisions_in_bulk(tmp_path, monkeypatch):
+    players = [
+        {"name": name, "url": f"https://en.wikipedia.org/wiki/{name}"} for name in "ABC"
+    ]
+    lookups = []
+
+    def get_revision_ids(urls):
+        lookups.append(list(urls))
+        return {url: 1 for url in urls}
+
+    monkeypatch.setattr(player_stats_store, "get_html", lambda url: player_page("29.9"))
+    monkeypatch.setattr(player_stats_store, "get_revision_ids", get_revision_ids)
+
+    store = PlayerStatsStore(str(tmp_path))
+    store.update(players, revisions={players[0]["url"]: 1})
+    # one request for the players whose revision wasn't given
+    assert lookups == [[players[1]["url"], players[2]["url"]]]
+    assert store.revisions == {player["url"]: 1 for player in players}
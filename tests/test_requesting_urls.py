@@ -1,7 +1,21 @@
 # Test with no params
+import asyncio
+import re
+import threading
+
 import pytest
+import requesting_urls
 from bs4 import BeautifulSoup
-from requesting_urls import get_html
+from requesting_urls import (
+    async_session,
+    close_async_session,
+    get_html,
+    get_html_async,
+    get_revision_id,
+    get_revision_ids,
+    get_section_html,
+    uncached,
+)
 
 @pytest.mark.parametrize(
     "url, expected",
@@ -48,3 +62,146 @@ def test_get_html_output(tmpdir):
     assert "<html" in rest
     assert "Higher Level Programming" in rest
     assert rest.strip().endswith("</html>")
+
+
+def world_cup_page(padding=2000):
+    return (
+        "<html><body>"
+        + "<p>history of the cup</p>" * padding
+        + '<h2 id="Calendar">Calendar</h2>'
+        + '<table class="wikitable sortable"><tr><th>Date</th></tr><tr><td>23 October 2022</td></tr></table>'
+        + '<h3 id="Cancelled">Cancelled</h3><table><tr><td>none</td></tr></table>'
+        + '<h2 id="Standings">Standings</h2>'
+        + "<p>results</p>" * padding
+        + "</body></html>"
+    )
+
+
+def test_get_section_html(stand_in_wiki):
+    wiki = stand_in_wiki({}, pages={"World_Cup": world_cup_page()})
+    url = wiki.article("World_Cup")
+
+    full = get_html(url)
+    sent = wiki.sent
+    html = get_section_html(url, "Calendar")
+    assert wiki.sent - sent < len(full) / 10
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find(id="Calendar").find_next("table", {"class": "wikitable sortable"})
+    assert "23 October 2022" in table.get_text()
+    # subsections are included, the next section is not
+    assert soup.find(id="Cancelled") is not None
+    assert soup.find(id="Standings") is None
+
+    assert get_section_html(url, re.compile("Cancel")).startswith(
+        '<div class="mw-parser-output"><h3 id="Cancelled">'
+    )
+    with pytest.raises(ValueError, match="no section"):
+        get_section_html(url, "Roster")
+
+
+def test_section_indexes_cached_per_revision(stand_in_wiki, monkeypatch):
+    # stand-in wikis can reuse the port and revisions of an earlier test
+    monkeypatch.setattr(requesting_urls, "section_indexes", {})
+    wiki = stand_in_wiki({}, pages={"World_Cup": world_cup_page(padding=1)})
+    url = wiki.article("World_Cup")
+
+    def section_requests():
+        return sum("prop=sections" in request for request in wiki.requests)
+
+    # the sections and the section, without looking up the revision first
+    get_section_html(url, "Calendar")
+    assert len(wiki.requests) == 2
+
+    # the sections of a known revision aren't looked up again
+    revision = wiki.revisions["World_Cup"]
+    get_section_html(url, "Standings", revision=revision)
+    assert section_requests() == 1
+    assert len(wiki.requests) == 3
+
+    # a new revision gets its sections looked up again
+    wiki.edit("World_Cup", '<h2 id="Intro"></h2>' + world_cup_page(padding=1))
+    assert 'id="Standings"' in get_section_html(url, "Standings")
+    assert section_requests() == 2
+
+    assert get_revision_id(url) == wiki.revisions["World_Cup"]
+    assert get_revision_id(wiki.article("Nowhere")) is None
+
+
+def test_get_revision_ids(stand_in_wiki):
+    titles = [f"Page_{i}" for i in range(120)]
+    wiki = stand_in_wiki({title: [] for title in titles})
+    urls = [wiki.article(title) for title in titles] + [wiki.article("Nowhere")]
+
+    revisions = get_revision_ids(urls)
+    assert revisions == {
+        **{wiki.article(title): wiki.revisions[title] for title in titles},
+        wiki.article("Nowhere"): None,
+    }
+    # at most 50 titles per request
+    assert sum("/w/api.php" in request for request in wiki.requests) == 3
+
+
+def test_uncached_is_per_thread(stand_in_wiki):
+    requests_cache = pytest.importorskip("requests_cache")
+    wiki = stand_in_wiki({"A": ["B"], "B": []})
+    url = wiki.article("A")
+    installed = requests_cache.is_installed()
+    if not installed:
+        requests_cache.install_cache(backend="memory")
+
+    def fetched():
+        return wiki.requests.count("/wiki/A")
+
+    inside = threading.Event()
+    leave = threading.Event()
+
+    def fresh():
+        with uncached():
+            get_html(url)
+            inside.set()
+            leave.wait(5)
+            get_html(url)
+
+    try:
+        get_html(url)
+        before = fetched()
+        thread = threading.Thread(target=fresh)
+        thread.start()
+        assert inside.wait(5)
+        assert fetched() == before + 1
+
+        # while the other thread bypasses the cache, this one still uses it
+        get_html(url)
+        assert fetched() == before + 1
+        leave.set()
+        thread.join()
+        assert fetched() == before + 2
+    finally:
+        leave.set()
+        if not installed:
+            requests_cache.uninstall_cache()
+
+
+def test_get_html_async(stand_in_wiki, tmpdir):
+    wiki = stand_in_wiki({"Start": ["Peace", "War"]})
+    url = wiki.article("Start")
+    output = str(tmpdir / "start.html")
+
+    async def fetch():
+        try:
+            session = async_session()
+            # one pooled client per event loop
+            assert async_session() is session
+            return await asyncio.gather(
+                get_html_async(url, output=output),
+                get_html_async(url, params={"action": "render"}),
+            )
+        finally:
+            await close_async_session()
+
+    html, with_params = asyncio.run(fetch())
+    assert html == with_params == get_html(url)
+    assert "/wiki/Peace" in html
+    assert open(output).read().startswith(f"HTML code of url={url}")
+    assert any("action=render" in request for request in wiki.requests)
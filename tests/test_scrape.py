@@ -0,0 +1,65 @@
+import io
+import json
+
+from scrape import main, read_inputs, run
+
+
+def test_read_inputs():
+    lines = [
+        "https://en.wikipedia.org/wiki/Peace\n",
+        "\n",
+        "# comment\n",
+        "Giannis Antetokounmpo\tMilwaukee\n",
+    ]
+    assert list(read_inputs(lines)) == [
+        ("https://en.wikipedia.org/wiki/Peace", "https://en.wikipedia.org/wiki/Peace", None),
+        (
+            "Giannis Antetokounmpo\tMilwaukee",
+            "https://en.wikipedia.org/wiki/Giannis_Antetokounmpo",
+            "Milwaukee",
+        ),
+    ]
+
+
+def test_run(stand_in_wiki):
+    wiki = stand_in_wiki({"A": ["B", "C"], "B": ["A"], "C": []})
+    output = io.StringIO()
+    progress = io.StringIO()
+
+    counts = run(
+        "find_urls",
+        ["A", "B", wiki.article("C")],
+        output,
+        threads=2,
+        processes=1,
+        base_url=wiki.url,
+        progress=progress,
+    )
+    assert counts == {"done": 3, "errors": 0}
+
+    records = {record["input"]: record for record in map(json.loads, output.getvalue().splitlines())}
+    assert set(records) == {"A", "B", wiki.article("C")}
+    assert records["A"]["url"] == wiki.article("A")
+    assert records["A"]["extractor"] == "find_urls"
+    assert wiki.article("B") in records["A"]["result"]
+    assert wiki.article("A") not in records["A"]["result"]
+    assert "3 done, 0 errors" in progress.getvalue()
+
+
+def test_main_errors(stand_in_wiki, tmp_path):
+    wiki = stand_in_wiki({"A": ["B"]})
+    inputs = tmp_path / "inputs.txt"
+    inputs.write_text("A\nhttp://127.0.0.1:1/wiki/Nowhere\n")
+    output = tmp_path / "out.jsonl"
+
+    status = main(
+        ["find_articles", str(inputs), "-o", str(output), "--base-url", wiki.url, "--quiet"]
+    )
+    assert status == 1
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(records) == 2
+    errors = [record for record in records if "error" in record]
+    assert len(errors) == 1
+    assert errors[0]["input"] == "http://127.0.0.1:1/wiki/Nowhere"
+    assert "ConnectionError" in errors[0]["error"]
@@ -1,7 +1,12 @@
+import asyncio
+
 import pandas as pd
 import pytest
 from bs4 import BeautifulSoup
-from time_planner import extract_events, render_schedule, time_plan
+import time_planner
+from deadlines import DeadlineExceeded
+from requesting_urls import close_async_session
+from time_planner import extract_events, render_schedule, time_plan, time_plan_async, time_plans
 
 sample_table = """
 <table>
@@ -56,6 +61,84 @@ def test_render_schedule():
     assert md.count("UiO") == 2
 
 
+def test_time_plans(monkeypatch):
+    pages = {
+        f"season-{i}": sample_table.replace(
+            "<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">'
+        ).replace("October", f"October {i}")
+        for i in range(4)
+    }
+    monkeypatch.setattr(time_planner, "get_html", pages.__getitem__)
+
+    schedules = time_plans(pages, threads=2, processes=2)
+    assert list(schedules) == list(pages)
+    for i, markdown in enumerate(schedules.values()):
+        assert f"October {i}" in markdown
+        assert markdown.count("UiO") == 2
+
+
+def test_time_plan_section(stand_in_wiki):
+    page = "<p>intro</p>" * 100 + sample_table.replace(
+        "<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">'
+    )
+    wiki = stand_in_wiki({}, pages={"Season": page})
+    url = wiki.article("Season")
+
+    assert time_plan(url, section=True) == time_plan(url)
+    assert time_plans([url], processes=1, section=True) == {url: time_plan(url)}
+
+
+def test_time_plan_async(stand_in_wiki):
+    page = sample_table.replace("<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">')
+    wiki = stand_in_wiki({}, pages={f"Season_{i}": page for i in range(20)})
+    urls = [wiki.article(f"Season_{i}") for i in range(20)]
+
+    async def plans():
+        try:
+            return await asyncio.gather(*(time_plan_async(url) for url in urls))
+        finally:
+            await close_async_session()
+
+    assert asyncio.run(plans()) == [time_plan(urls[0])] * 20
+
+
+def test_time_plans_freshness(stand_in_wiki, tmp_path):
+    page = sample_table.replace("<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">')
+    wiki = stand_in_wiki({}, pages={"Season_1": page, "Season_2": page, "Season_3": page})
+    urls = [wiki.article(f"Season_{i}") for i in range(1, 4)]
+    path = str(tmp_path / "revisions.json")
+
+    def page_requests():
+        return sum(request.startswith("/wiki/") for request in wiki.requests)
+
+    first = time_plans(urls, processes=0, freshness=path)
+    assert page_requests() == 3
+
+    # only the edited page is fetched again
+    wiki.edit("Season_2", page.replace("UiO", "NTNU"))
+    second = time_plans(urls, processes=0, freshness=path)
+    assert page_requests() == 4
+    assert list(second) == urls
+    assert second[urls[0]] == first[urls[0]]
+    assert "NTNU" in second[urls[1]]
+
+
+def test_time_plans_deadline_keeps_results(stand_in_wiki, tmp_path):
+    page = sample_table.replace("<table>", '<h2 id="Calendar"></h2><table class="wikitable sortable">')
+    wiki = stand_in_wiki({}, pages={"Season_1": page, "Season_2": page, "Season_3": page})
+    urls = [wiki.article(f"Season_{i}") for i in range(1, 4)]
+    path = str(tmp_path / "revisions.json")
+    wiki.delays["/wiki/Season_3"] = [5.0]
+
+    with pytest.raises(DeadlineExceeded):
+        time_plans(urls, processes=0, freshness=path, deadline=1.0)
+
+    # the pages done before the deadline aren't fetched again
+    before = len(wiki.requests)
+    time_plans(urls, processes=0, freshness=path)
+    assert [r for r in wiki.requests[before:] if r.startswith("/wiki/")] == ["/wiki/Season_3"]
+
+
 @pytest.mark.parametrize(
     "year",
     [
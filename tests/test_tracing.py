@@ -0,0 +1,99 @@
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import tracing
+from collect_dates import find_dates
+from time_planner import TableEntry, expand_row_col_span
+from tracing import span, traced, tracing as tracing_on
+
+assignment4 = Path(__file__).parent.parent.absolute()
+
+
+@traced("parse", size=len)
+def slow_parse(text):
+    with span("tokenize", "parse", size=len(text)):
+        time.sleep(0.02)
+    time.sleep(0.01)
+    return text.split()
+
+
+@traced("fetch", size=len)
+async def slow_fetch(text):
+    await asyncio.sleep(0.02)
+    return text
+
+
+def test_concurrent_async_spans():
+    async def fetch_all():
+        return await asyncio.gather(slow_fetch("a"), slow_fetch("bb"), slow_fetch("ccc"))
+
+    with tracing_on() as tracer:
+        assert asyncio.run(fetch_all()) == ["a", "bb", "ccc"]
+
+    assert sorted(event["args"]["size"] for event in tracer.events) == [1, 2, 3]
+    for event in tracer.events:
+        # the whole await is recorded, and the tasks are not nested in each other
+        assert event["dur"] >= 0.02e6
+        assert event["args"]["self_us"] == event["dur"]
+
+
+def test_tracing_off():
+    assert tracing.tracer is None
+    assert slow_parse("a b") == ["a", "b"]
+    with span("nothing", "parse") as facts:
+        facts["size"] = 1
+
+
+def test_nested_spans(tmp_path):
+    path = tmp_path / "trace.json"
+    with tracing_on(path) as tracer:
+        slow_parse("a b c")
+    assert tracing.tracer is None
+
+    events = {event["name"]: event for event in tracer.events}
+    outer = events["slow_parse"]
+    inner = events["tokenize"]
+    assert outer["cat"] == inner["cat"] == "parse"
+    assert outer["args"]["size"] == 3
+    assert inner["args"]["size"] == 5
+    # the inner span is nested inside the outer one
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert outer["args"]["self_us"] < outer["dur"] - inner["dur"] + 1
+
+    trace = json.loads(path.read_text())
+    assert [event["name"] for event in trace["traceEvents"]] == ["tokenize", "slow_parse"]
+    assert all(event["ph"] == "X" for event in trace["traceEvents"])
+
+
+def test_scraper_spans():
+    data = [[TableEntry("a", rowspan=2, colspan=1), TableEntry("b", rowspan=1, colspan=1)], [TableEntry("c", rowspan=1, colspan=1)]]
+    with tracing_on() as tracer:
+        find_dates("13 October 2020 and 2020-10-14")
+        expand_row_col_span(data)
+
+    stages = {event["name"]: (event["cat"], event["args"]["size"]) for event in tracer.events}
+    assert stages == {"find_dates": ("extract", 2), "expand_row_col_span": ("parse", 2)}
+
+    summary = tracer.summary()
+    assert "find_dates" in summary
+    assert "expand_row_col_span" in summary
+
+
+def test_trace_from_env(tmp_path):
+    path = tmp_path / "trace.json"
+    result = subprocess.run(
+        [sys.executable, "-c", "from collect_dates import find_dates; find_dates('13 October 2020')"],
+        cwd=assignment4,
+        env={"SCRAPER_TRACE": str(path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["find_dates"]
+    assert "find_dates" in result.stderr
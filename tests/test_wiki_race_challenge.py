@@ -0,0 +1,370 @@
+import os
+import shutil
+
+import pytest
+from benchmark_wiki_race import graph_fetchers
+from link_cache import LinkCache
+from wiki_race_challenge import (
+    SearchStats,
+    article_anchors,
+    article_links,
+    find_path,
+    find_paths,
+    get_backlinks,
+    title_tokens,
+)
+
+
+def layered_graph(width=6, depth=3):
+    """A graph where every article links to `width` new articles, `depth` levels down.
+
+    The finish article is only linked from one article on the last level,
+    and links back to the start.
+    """
+
+    graph = {"Start": []}
+    level = ["Start"]
+    for d in range(depth):
+        next_level = []
+        for title in level:
+            children = [f"{title}/{i}" for i in range(width)]
+            graph[title] = children
+            next_level.extend(children)
+        level = next_level
+    for title in level:
+        graph[title] = ["Start"]
+    graph[level[-1]] = ["Finish"]
+    graph["Finish"] = ["Start"]
+
+    return graph
+
+
+def shortest_length(graph, start, finish):
+    """Number of articles on the shortest path, by plain breadth first search."""
+
+    seen = {start}
+    level = [start]
+    length = 1
+    while finish not in level:
+        next_level = []
+        for title in level:
+            for link in graph[title]:
+                if link not in seen:
+                    seen.add(link)
+                    next_level.append(link)
+        level = next_level
+        length += 1
+
+    return length
+
+
+def assert_valid_path(wiki, graph, path, start, finish):
+    titles = [url[len(wiki.url + "/wiki/"):] for url in path]
+    assert titles[0] == start
+    assert titles[-1] == finish
+    for a, b in zip(titles, titles[1:]):
+        assert b in graph[a]
+    assert len(titles) == shortest_length(graph, start, finish)
+
+
+def test_article_links():
+    html = """
+    <a href="/wiki/Peace">article</a>
+    <a href="/wiki/Category:Peace">category</a>
+    <a href="/w/index.php?title=Peace&action=edit">edit</a>
+    <a href="https://other.org/wiki/Peace">other wiki</a>
+    """
+    assert article_links(html, "https://en.wikipedia.org") == {
+        "https://en.wikipedia.org/wiki/Peace"
+    }
+
+
+def test_article_anchors():
+    html = """
+    <a href="/wiki/Peace" title="Peace"><i>World</i> peace</a>
+    <a class="x" href="/wiki/Peace#History">Peace &amp; quiet</a>
+    <a href="/wiki/War"><img src="war.png"></a>
+    <a href="/wiki/Category:Peace">category</a>
+    """
+    assert article_anchors(html, "https://en.wikipedia.org") == {
+        "https://en.wikipedia.org/wiki/Peace": "World peace Peace & quiet",
+        "https://en.wikipedia.org/wiki/War": "",
+    }
+
+
+def test_title_tokens():
+    assert title_tokens("https://en.wikipedia.org/wiki/History_of_the_Peace_movement") == {
+        "history",
+        "peace",
+        "movement",
+    }
+    assert title_tokens("Z%C3%BCrich (city)") == {"zürich", "city"}
+
+
+@pytest.mark.parametrize(
+    "start, finish",
+    [
+        ("Start", "Finish"),
+        ("Start", "Start/0/3"),
+        ("Start/1", "Start/5/5/5"),
+        ("Finish", "Finish"),
+    ],
+)
+def test_find_path(stand_in_wiki, start, finish):
+    graph = layered_graph()
+    wiki = stand_in_wiki(graph)
+    path = find_path(wiki.article(start), wiki.article(finish))
+    assert_valid_path(wiki, graph, path, start, finish)
+
+
+def test_get_backlinks(stand_in_wiki):
+    graph = {f"A{i}": ["Finish"] for i in range(5)}
+    graph.update({"Finish": [], "Elsewhere": ["A0"]})
+    wiki = stand_in_wiki(graph)
+    wiki.limit = 2
+
+    # the links are listed over several requests
+    assert get_backlinks(wiki.article("Finish")) == {wiki.article(f"A{i}") for i in range(5)}
+    assert len(wiki.requests) == 3
+
+
+def test_find_path_skips_redirects(stand_in_wiki):
+    # X only links to a redirect to the finish, not to the finish itself
+    graph = {
+        "Start": ["X", "A"],
+        "X": ["Redirect"],
+        "Redirect": ["Finish"],
+        "A": ["B"],
+        "B": ["Finish"],
+        "Finish": [],
+    }
+    wiki = stand_in_wiki(graph)
+    wiki.redirects = {"Redirect": "Finish"}
+
+    assert get_backlinks(wiki.article("Finish")) == {wiki.article("B")}
+    path = find_path(wiki.article("Start"), wiki.article("Finish"))
+    assert path == [wiki.article(title) for title in ["Start", "A", "B", "Finish"]]
+
+
+def test_bidirectional_fetches_fewer_pages(stand_in_wiki):
+    graph = layered_graph()
+    wiki = stand_in_wiki(graph)
+    start, finish = wiki.article("Start"), wiki.article("Finish")
+
+    bfs = SearchStats()
+    find_path(start, finish, mode="bfs", stats=bfs)
+    bidirectional = SearchStats()
+    find_path(start, finish, stats=bidirectional)
+    print(f"bfs: {bfs}, bidirectional: {bidirectional}")
+
+    assert bidirectional.pages_fetched * 10 < bfs.pages_fetched
+
+
+def test_find_path_reuses_cached_links(stand_in_wiki, tmp_path):
+    graph = layered_graph()
+    wiki = stand_in_wiki(graph)
+    cache = LinkCache(str(tmp_path / "links.sqlite"))
+
+    first = SearchStats()
+    path = find_path(wiki.article("Start"), wiki.article("Finish"), cache=cache, stats=first)
+    assert first.pages_fetched == len(wiki.requests) > 0
+
+    # the second race through the same pages needs no fetches at all
+    wiki.requests.clear()
+    second = SearchStats()
+    assert path == find_path(
+        wiki.article("Start"), wiki.article("Finish"), cache=cache, stats=second
+    )
+    assert wiki.requests == []
+    assert second.pages_fetched == 0
+    # along with the revision of the pages the links are from
+    assert cache.revision(wiki.article("Start")) == wiki.revisions["Start"]
+    assert second.cache_hits == first.pages_fetched
+
+
+@pytest.mark.parametrize("mode", ["bidirectional", "bfs", "best_first"])
+def test_find_path_no_path(stand_in_wiki, mode):
+    wiki = stand_in_wiki({"A": ["B"], "B": [], "C": ["A"]})
+    with pytest.raises(ValueError):
+        find_path(wiki.article("A"), wiki.article("C"), mode=mode)
+
+
+def test_find_path_best_first(stand_in_wiki):
+    graph = layered_graph()
+    wiki = stand_in_wiki(graph)
+    path = find_path(wiki.article("Start"), wiki.article("Finish"), mode="best_first")
+    assert path[0] == wiki.article("Start")
+    assert path[-1] == wiki.article("Finish")
+    assert len(path) == 5
+
+
+def test_find_path_best_first_anchor_text(stand_in_wiki):
+    # the titles of Q1 and Q2 say nothing, only the text of the link to Q2 does
+    graph = {"Start": ["Q1", "Q2"], "Q1": ["R1"], "Q2": ["R2"], "R1": ["Zebra"], "R2": ["Zebra"]}
+    graph["Zebra"] = []
+    start = '<a href="/wiki/Q1">Something</a><a href="/wiki/Q2">Zebra facts</a>'
+    wiki = stand_in_wiki(graph, pages={"Start": start})
+
+    path = find_path(wiki.article("Start"), wiki.article("Zebra"), mode="best_first", max_workers=1)
+    assert path == [wiki.article(title) for title in ["Start", "Q2", "R2", "Zebra"]]
+    assert "/wiki/Q1" not in wiki.requests
+
+
+def test_find_paths_shares_crawl(stand_in_wiki):
+    graph = layered_graph()
+    wiki = stand_in_wiki(graph)
+    pairs = [("Start", "Start")]
+    pairs += [("Start", f"Start/{i}/{5 - i}") for i in range(6)]
+    pairs += [("Start/1", f"Start/1/{i}/0") for i in range(6)]
+
+    separate = 0
+    for start, finish in pairs:
+        stats = SearchStats()
+        find_path(wiki.article(start), wiki.article(finish), mode="bfs", stats=stats)
+        separate += stats.pages_fetched
+
+    stats = SearchStats()
+    results = list(
+        find_paths(
+            [(wiki.article(start), wiki.article(finish)) for start, finish in pairs],
+            stats=stats,
+        )
+    )
+    assert len(results) == len(pairs)
+    # the article reached in the fewest steps comes first
+    assert results[0][2] == [wiki.article("Start")]
+
+    paths = {(start, finish): path for start, finish, path in results}
+    for start, finish in pairs:
+        path = paths[wiki.article(start), wiki.article(finish)]
+        assert_valid_path(wiki, graph, path, start, finish)
+
+    print(f"separate: {separate} pages, batch: {stats.pages_fetched} pages")
+    assert stats.pages_fetched * 3 < separate
+
+
+def test_find_paths_no_path(stand_in_wiki):
+    wiki = stand_in_wiki({"A": ["B"], "B": ["A"], "C": ["A"]})
+    pairs = [(wiki.article("A"), wiki.article("C")), (wiki.article("A"), wiki.article("B"))]
+    assert list(find_paths(pairs)) == [
+        (wiki.article("A"), wiki.article("B"), [wiki.article("A"), wiki.article("B")]),
+        (wiki.article("A"), wiki.article("C"), None),
+    ]
+
+
+class Preempted(BaseException):
+    """Stands in for the worker being stopped in the middle of a search."""
+
+
+def test_find_path_resumes_from_checkpoint(tmp_path):
+    graph = layered_graph(width=5, depth=4)
+    graph["Finish"] = []
+    get_links, get_backlinks = graph_fetchers(graph)
+    start = "https://en.wikipedia.org/wiki/Start"
+    finish = "https://en.wikipedia.org/wiki/Finish"
+    checkpoint = str(tmp_path / "search.npz")
+
+    expected = SearchStats()
+    path = find_path(start, finish, get_links, get_backlinks, mode="bfs", max_workers=1, stats=expected)
+
+    calls = []
+
+    def interrupted_get_links(url):
+        calls.append(url)
+        if len(calls) == 40:
+            raise Preempted
+        return get_links(url)
+
+    def counted_get_links(url):
+        calls.append(url)
+        return get_links(url)
+
+    with pytest.raises(Preempted):
+        find_path(
+            start,
+            finish,
+            interrupted_get_links,
+            get_backlinks,
+            mode="bfs",
+            max_workers=1,
+            checkpoint=checkpoint,
+            checkpoint_every=0,
+        )
+    assert os.path.exists(checkpoint)
+
+    # the resumed search doesn't refetch what was fetched before the interruption
+    calls.clear()
+    stats = SearchStats()
+    resumed = find_path(
+        start,
+        finish,
+        counted_get_links,
+        get_backlinks,
+        mode="bfs",
+        max_workers=1,
+        stats=stats,
+        checkpoint=checkpoint,
+    )
+    assert resumed == path
+    assert len(calls) == expected.pages_fetched - 39
+    assert stats.pages_fetched == expected.pages_fetched
+    assert not os.path.exists(checkpoint)
+
+
+def test_find_path_resumes_at_level_boundary(tmp_path):
+    graph = layered_graph(width=5, depth=4)
+    graph["Finish"] = []
+    get_links, get_backlinks = graph_fetchers(graph)
+    start = "https://en.wikipedia.org/wiki/Start"
+    finish = "https://en.wikipedia.org/wiki/Finish"
+    checkpoint = str(tmp_path / "search.npz")
+    killed = str(tmp_path / "killed.npz")
+
+    path = find_path(start, finish, get_links, get_backlinks, mode="bfs", max_workers=1)
+    # the first fetch of level 2, after every page of level 1
+    level_2 = 2 + len(list(get_links(start)))
+    calls = []
+
+    def killed_get_links(url):
+        calls.append(url)
+        if len(calls) == level_2:
+            # the checkpoint left by a worker killed outright, taken after level 1
+            shutil.copy(checkpoint, killed)
+            raise Preempted
+        return get_links(url)
+
+    with pytest.raises(Preempted):
+        find_path(
+            start,
+            finish,
+            killed_get_links,
+            get_backlinks,
+            mode="bfs",
+            max_workers=1,
+            checkpoint=checkpoint,
+            checkpoint_every=0,
+        )
+
+    resumed = find_path(
+        start, finish, get_links, get_backlinks, mode="bfs", max_workers=1, checkpoint=killed
+    )
+    assert resumed == path
+
+    # a checkpoint only resumes a search of the same mode
+    shutil.copy(checkpoint, killed)
+    with pytest.raises(ValueError, match="bfs"):
+        find_path(start, finish, get_links, get_backlinks, checkpoint=killed)
+
+
+def test_checkpoint_of_other_search(tmp_path):
+    get_links, get_backlinks = graph_fetchers(layered_graph())
+    checkpoint = str(tmp_path / "search.npz")
+
+    def interrupted(url):
+        raise Preempted
+
+    start = "https://en.wikipedia.org/wiki/Start"
+    with pytest.raises(Preempted):
+        find_path(start, start + "/1", interrupted, get_backlinks, checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        find_path(start, start + "/2", get_links, get_backlinks, checkpoint=checkpoint)
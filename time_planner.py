@@ -1,11 +1,20 @@
 import re
 from copy import copy
 from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
 
-import bs4
-import pandas as pd
-from bs4 import BeautifulSoup
-from requesting_urls import get_html
+from deadlines import job_limits
+from memory import release
+from requesting_urls import get_html, get_html_async, get_section_html, uncached
+from tracing import traced
+
+# pandas and bs4 are slow to import, so they are imported where they are used
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    import bs4
+    import pandas as pd
 
 ## --- Task 5, 6, and 7 ---- ##
 
@@ -19,27 +28,177 @@ event_types = {
 }
 
 
-def time_plan(url: str) -> str:
+def time_plan(url: str, low_memory: bool = False, section: bool = False) -> str:
     """Parses table from html text, extracts wanted information
     and displays it as markdown.
 
     Args:
         url (str): 
             URL for page with calendar table
+        low_memory (bool, optional):
+            free the parsed page right after use
+        section (bool, optional):
+            only download the Calendar section,
+            see `requesting_urls.get_section_html`
     Returns:
         markdown (str): 
             string containing the markdown schedule
     """
 
-    html = get_html(url)
+    fetch = partial(get_section_html, heading="Calendar") if section else get_html
+
+    return schedule_from_html(fetch(url), low_memory=low_memory)
+
+
+async def time_plan_async(
+    url: str, low_memory: bool = False, executor: Optional["Executor"] = None
+) -> str:
+    """Renders the schedule of a page like `time_plan`, without blocking the event loop.
+
+    The page is fetched with `requesting_urls.get_html_async`, and parsed in an executor.
+
+    Args:
+        url (str):
+            URL for page with calendar table
+        low_memory (bool, optional):
+            free the parsed page right after use
+        executor (concurrent.futures.Executor, optional):
+            where to parse the page, the default thread pool of the event loop
+            if not given, a ProcessPoolExecutor parses outside the GIL
+    Returns:
+        markdown (str):
+            string containing the markdown schedule
+    """
+
+    import asyncio
+
+    html = await get_html_async(url)
+    parse = partial(schedule_from_html, html, low_memory=low_memory)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, parse)
+
+
+@traced("parse")
+def schedule_from_html(html: str, low_memory: bool = False) -> str:
+    """Finds the calendar table in the html of a page and renders it as markdown.
+
+    Only needs the html, so it can run in a worker process of a `Pipeline`.
+
+    Args:
+        html (str):
+            html of a page with a calendar table
+        low_memory (bool, optional):
+            free the parsed page as soon as the events are taken out of it
+    Returns:
+        markdown (str):
+            string containing the markdown schedule
+    """
+
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     calendar = soup.find(id="Calendar")
     soup_table = calendar.find_next("table", {"class":"wikitable sortable"})
     df = extract_events(soup_table)
 
+    if low_memory:
+        release(soup)
+
     return render_schedule(df)
 
 
+def time_plans(
+    urls: Iterable[str],
+    threads: int = 4,
+    processes: Optional[int] = None,
+    low_memory: bool = False,
+    report_memory: bool = False,
+    section: bool = False,
+    freshness: Optional[str] = None,
+    deadline: Optional[float] = None,
+    hedge: bool = False,
+) -> Dict[str, str]:
+    """Renders the schedules of many pages, e.g. of several seasons.
+
+    The pages are fetched in threads and parsed in worker processes,
+    with a `pipeline.Pipeline`.
+
+    Args:
+        urls (iterable of str):
+            URLs of pages with calendar tables
+        threads (int, optional):
+            number of fetch threads
+        processes (int, optional):
+            number of parser processes, one per cpu if not given
+        low_memory (bool, optional):
+            free every parsed page right after use
+        report_memory (bool, optional):
+            print the peak memory, of this process and the parser
+            processes, and the top allocating lines when done
+        section (bool, optional):
+            only download the Calendar sections
+        freshness (str, optional):
+            json file with the last seen revision and schedule of every page.
+            The revisions are looked up in bulk, and only the pages that
+            changed since the last run are fetched, bypassing requests_cache,
+            see `freshness.RevisionLog`
+        deadline (float, optional):
+            seconds the whole run may take, see `deadlines.deadline`
+        hedge (bool, optional):
+            send a second request for fetches slower than most, see `deadlines.hedging`
+    Returns:
+        schedules (dict):
+            the markdown schedule of every URL, in the order given
+    Raises:
+        DeadlineExceeded:
+            if the deadline passes before all schedules are rendered
+    """
+
+    from memory import memory_report
+    from pipeline import Pipeline
+
+    pipeline = Pipeline(
+        fetch=partial(get_section_html, heading="Calendar") if section else get_html,
+        parse=partial(schedule_from_html, low_memory=low_memory),
+        threads=threads,
+        processes=processes,
+    )
+    urls = list(urls)
+    schedules = {}
+
+    log = None
+    # the results so far are kept if the deadline passes
+    try:
+        with job_limits(deadline, hedge) as hedger:
+            if freshness is not None:
+                from freshness import RevisionLog
+
+                log = RevisionLog(freshness)
+                changed = log.check(urls)
+                print(f"{len(changed)} of {len(urls)} pages changed")
+                schedules = {
+                    url: log.get(url, "time_plan") for url in urls if log.fresh(url, "time_plan")
+                }
+
+            with memory_report(enabled=report_memory) as report, uncached(log is not None):
+                for url, schedule in pipeline.run(url for url in urls if url not in schedules):
+                    schedules[url] = schedule
+                    if log is not None:
+                        log.put(url, "time_plan", schedule)
+                    report.sample()
+
+            if hedger is not None:
+                print(hedger)
+    finally:
+        if log is not None:
+            log.save()
+
+    if report_memory:
+        print(report)
+
+    return {url: schedules[url] for url in urls}
+
+
 @dataclass
 class TableEntry:
     """Data class representing a single entry in a table.
@@ -52,7 +211,8 @@ class TableEntry:
     colspan: int
 
 
-def extract_events(table: bs4.element.Tag) -> pd.DataFrame:
+@traced("extract", size=len)
+def extract_events(table: "bs4.element.Tag") -> "pd.DataFrame":
     """Gets the events from a table.
 
     Args:
@@ -63,6 +223,8 @@ def extract_events(table: bs4.element.Tag) -> pd.DataFrame:
             DataFrame containing filtered and parsed data
     """
 
+    import pandas as pd
+
     headings = table.find_all("th")
     labels = [th.text.strip() for th in headings]
     data = []
@@ -98,7 +260,8 @@ def extract_events(table: bs4.element.Tag) -> pd.DataFrame:
     return df
 
 
-def render_schedule(data: pd.DataFrame) -> str:
+@traced("render", size=len)
+def render_schedule(data: "pd.DataFrame") -> str:
     """Renders the schedule data to markdown.
 
     Args:
@@ -160,10 +323,13 @@ def filter_data(keys: list, data: list, wanted: list) -> list:
             after discarding the columns not in `wanted`.
     """
 
+    import pandas as pd
+
     filtered = pd.DataFrame(data, columns=keys)
 
     return filtered[wanted]
 
+@traced("parse", size=len)
 def expand_row_col_span(data):
     """Applies row/colspan to tabular data.
 
@@ -221,10 +387,10 @@ def expand_row_col_span(data):
 
 
 if __name__ == "__main__":
-    for year in range(20, 23):
-        url = (
-            f"https://en.wikipedia.org/wiki/20{year}–{year+1}_FIS_Alpine_Ski_World_Cup"
-        )
+    urls = [
+        f"https://en.wikipedia.org/wiki/20{year}–{year+1}_FIS_Alpine_Ski_World_Cup"
+        for year in range(20, 23)
+    ]
+    for url, md in time_plans(urls).items():
         print(url)
-        md = time_plan(url)
         print(md)
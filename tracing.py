@@ -0,0 +1,242 @@
+import atexit
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+## -- Tracing of the scraper stages -- ##
+
+# the active tracer, None when tracing is off
+tracer = None
+
+# the open spans of the current thread or asyncio task, as cells holding the
+# time spent in their nested spans, so concurrent tasks don't nest in each other
+open_spans: ContextVar[tuple] = ContextVar("open_spans", default=())
+
+
+class Tracer:
+    """Records nested, timed spans of the fetch, parse, extract, aggregate
+    and render stages of a run.
+
+    Spans are kept as Chrome trace events, so a run can be viewed in
+    chrome://tracing or https://ui.perfetto.dev, and summarized per stage.
+    Spans can be recorded from several threads, and asyncio tasks, at once.
+    """
+
+    def __init__(self):
+        self.events: List[Dict] = []
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, stage: str, **args) -> Iterator[Dict]:
+        """Records a span around the body of the with statement.
+
+        Args:
+            name (str):
+                what is being done, e.g. the function name
+            stage (str):
+                fetch, parse, extract, aggregate or render
+            **args:
+                extra facts to record, e.g. the size of the input
+        Yields:
+            args (dict):
+                the recorded facts, add to it to record more, e.g. the size of the output
+        """
+
+        # time spent in nested spans, to find the time spent in this span itself
+        nested = [0.0]
+        token = open_spans.set(open_spans.get() + (nested,))
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            duration = end - start
+            open_spans.reset(token)
+            parents = open_spans.get()
+            if parents:
+                parents[-1][0] += duration
+
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": stage,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": dict(args, self_us=(duration - nested[0]) * 1e6),
+                }
+            )
+
+    def chrome_trace(self) -> Dict:
+        """Returns the spans in the Chrome trace event format."""
+
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> None:
+        """Writes the spans to a Chrome trace json file."""
+
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self) -> str:
+        """Renders the calls and time of every stage as a markdown table.
+
+        Total time includes nested spans, so a fetch inside a parse
+        counts for both, while self time only counts the stage itself.
+        Written without pandas, so it also works while the program exits.
+
+        Returns:
+            markdown (str):
+                table with a row per stage and span name, most self time first
+        """
+
+        rows = {}
+        for event in self.events:
+            row = rows.setdefault((event["cat"], event["name"]), [0, 0.0, 0.0, 0])
+            row[0] += 1
+            row[1] += event["dur"] / 1e6
+            row[2] += event["args"]["self_us"] / 1e6
+            row[3] += event["args"].get("size", 0)
+
+        lines = [
+            "| stage | name | calls | seconds | self_seconds | size |",
+            "|---|---|---:|---:|---:|---:|",
+        ]
+        for (stage, name), (calls, seconds, self_seconds, size) in sorted(
+            rows.items(), key=lambda item: -item[1][2]
+        ):
+            lines.append(
+                f"| {stage} | {name} | {calls} | {seconds:.4f} | {self_seconds:.4f} | {size} |"
+            )
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def tracing(path: Optional[str] = None) -> Iterator[Tracer]:
+    """Turns tracing on inside the with statement.
+
+    Args:
+        path (str, optional):
+            Chrome trace json file to write the spans to when done
+    Yields:
+        tracer (Tracer):
+            the tracer recording the spans
+    """
+
+    global tracer
+
+    previous = tracer
+    tracer = Tracer()
+    try:
+        yield tracer
+    finally:
+        if path is not None:
+            tracer.save(path)
+        tracer = previous
+
+
+@contextmanager
+def _no_span(*args, **kwargs):
+    yield {}
+
+
+def span(name: str, stage: str, **args):
+    """Records a span with the active tracer, if tracing is on.
+
+    Usage: `with span("find_table", "parse", size=len(html)) as facts: ...`
+    See `Tracer.span` for the arguments.
+    """
+
+    if tracer is None:
+        return _no_span()
+
+    return tracer.span(name, stage, **args)
+
+
+def traced(stage: str, size: Optional[Callable] = None) -> Callable:
+    """Decorates a function to be recorded as a span when tracing is on.
+
+    When tracing is off, calling the function only costs one extra call
+    and check of the active tracer. Coroutine functions are recorded
+    until they finish, not just until the coroutine is created.
+
+    Args:
+        stage (str):
+            fetch, parse, extract, aggregate or render
+        size (callable, optional):
+            gets the size of the return value to record, e.g. len
+    Returns:
+        decorator (callable)
+    """
+
+    def decorate(func):
+        name = func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                active = tracer
+                if active is None:
+                    return await func(*args, **kwargs)
+
+                with active.span(name, stage) as facts:
+                    result = await func(*args, **kwargs)
+                    if size is not None:
+                        facts["size"] = size(result)
+
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = tracer
+            if active is None:
+                return func(*args, **kwargs)
+
+            with active.span(name, stage) as facts:
+                result = func(*args, **kwargs)
+                if size is not None:
+                    facts["size"] = size(result)
+
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def trace_from_env() -> None:
+    """Turns tracing on for the whole program if SCRAPER_TRACE is set.
+
+    SCRAPER_TRACE is the path to write the Chrome trace json to at exit,
+    and the summary is printed to stderr.
+    """
+
+    global tracer
+
+    path = os.environ.get("SCRAPER_TRACE")
+    if not path or tracer is not None:
+        return
+
+    tracer = Tracer()
+
+    def save(tracer=tracer):
+        tracer.save(path)
+        print(tracer.summary(), file=sys.stderr)
+
+    atexit.register(save)
+
+
+trace_from_env()
@@ -1,12 +1,450 @@
 from typing import List  # isort:skip
+import heapq
+import html as html_lib
+import itertools
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+from urllib.parse import unquote, urljoin, urlsplit
 
+from filter_urls import find_urls
+from link_cache import LinkCache
+from requesting_urls import api_get, article_url, get_html
 
-def find_path(start: str, finish: str) -> List[str]:
+# namespaces of pages that are not articles, e.g. /wiki/Category:Peace
+namespaces = {
+    "Special",
+    "File",
+    "Category",
+    "Help",
+    "Wikipedia",
+    "Template",
+    "Template_talk",
+    "Portal",
+    "Talk",
+    "User",
+    "User_talk",
+    "Module",
+    "Draft",
+    "MediaWiki",
+    "TimedText",
+}
+
+
+@dataclass
+class SearchStats:
+    """Data class recording the cost of a path search.
+
+    Records number of pages fetched, pages found in the link cache,
+    fetches that failed, and the time it took to find the path.
+    """
+
+    pages_fetched: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+def split_article(url: str) -> Tuple[str, str]:
+    """Splits an article URL into the wiki it is on and the article title.
+
+    Args:
+        url (str):
+            article URL, e.g. https://en.wikipedia.org/wiki/Peace
+    Returns:
+        origin, title (tuple):
+            e.g. ('https://en.wikipedia.org', 'Peace')
+    """
+
+    parts = urlsplit(url)
+    title = parts.path.split("/wiki/", 1)[1]
+
+    return f"{parts.scheme}://{parts.netloc}", title
+
+
+def article_links(html: str, origin: str) -> Set[str]:
+    """Finds all links to articles on the same wiki in an html text.
+
+    Args:
+        html (str):
+            html string to search
+        origin (str):
+            the wiki, e.g. https://en.wikipedia.org
+    Returns:
+        articles (set):
+            URLs of the linked articles
+    """
+
+    return {url for url in find_urls(html, base_url=origin) if is_article(url, origin)}
+
+
+def is_article(url: str, origin: str) -> bool:
+    """Tells if a URL is of an article on the wiki, not of a special page or a file."""
+
+    prefix = origin + "/wiki/"
+    if not url.startswith(prefix) or "?" in url:
+        return False
+
+    title = url[len(prefix):]
+
+    return bool(title) and unquote(title).split(":", 1)[0] not in namespaces
+
+
+# anchor tags with an href, and the html inside them
+anchor_text_pat = re.compile(r'<a\b[^>]*?\bhref="([^"]*)"[^>]*>(.*?)</a>', flags=re.I | re.S)
+html_tag_pat = re.compile(r"<[^>]+>")
+
+
+def article_anchors(html: str, origin: str) -> Dict[str, str]:
+    """Finds all links to articles on the same wiki in an html text, with their text.
+
+    Args:
+        html (str):
+            html string to search
+        origin (str):
+            the wiki, e.g. https://en.wikipedia.org
+    Returns:
+        anchors (dict):
+            the text of the links to every linked article, by URL
+    """
+
+    anchors: Dict[str, str] = {}
+
+    for match in anchor_text_pat.finditer(html):
+        url = urljoin(origin, match.group(1).split("#")[0])
+        if not is_article(url, origin):
+            continue
+
+        text = html_lib.unescape(html_tag_pat.sub("", match.group(2))).strip()
+        # an article linked more than once gets the text of every link
+        if url not in anchors:
+            anchors[url] = text
+        elif text and text not in anchors[url]:
+            anchors[url] = f"{anchors[url]} {text}".strip()
+
+    return anchors
+
+
+# the revision of a page, in the configuration script wikipedia pages carry
+revision_pat = re.compile(r'"wgRevisionId":\s*(\d+)')
+
+
+class Links(dict):
+    """The text of the links of an article, by URL, and the revision of the page they are from."""
+
+    revision: Optional[int] = None
+
+
+def get_links(url: str) -> Links:
+    """Gets the articles an article links to.
+
+    Args:
+        url (str):
+            URL of the article
+    Returns:
+        articles (Links):
+            the text of the links, by URL of the linked article, with the
+            revision of the page if it says
+    """
+
+    origin, _ = split_article(url)
+    html = get_html(url)
+
+    links = Links(article_anchors(html, origin))
+    revision = revision_pat.search(html)
+    if revision is not None:
+        links.revision = int(revision.group(1))
+
+    return links
+
+
+def get_backlinks(url: str) -> Set[str]:
+    """Gets the articles linking to an article, from the MediaWiki API.
+
+    Redirects to the article are left out, and so are the articles linking
+    to them, since those don't link to the article itself.
+
+    Args:
+        url (str):
+            URL of the article
+    Returns:
+        articles (set):
+            URLs of the articles linking to it
+    """
+
+    origin, title = split_article(url)
+    params = {
+        "action": "query",
+        "list": "backlinks",
+        "bltitle": unquote(title),
+        "blnamespace": "0",
+        "blfilterredir": "nonredirects",
+        "bllimit": "max",
+    }
+
+    articles = set()
+    while True:
+        response = api_get(url, params)
+        for page in response["query"]["backlinks"]:
+            articles.add(article_url(origin, page["title"]))
+        # more than bllimit links are listed over several requests
+        if "continue" not in response:
+            return articles
+        params = dict(params, **response["continue"])
+
+
+def expand(
+    pool: ThreadPoolExecutor,
+    frontier: List[str],
+    fetch: Callable[[str], Iterable[str]],
+    kind: str,
+    cache: Optional[LinkCache],
+    stats: SearchStats,
+) -> Iterator[Tuple[str, Iterable[str]]]:
+    """Gets the links of every article in a frontier.
+
+    Cached links are used first, the rest are fetched concurrently
+    and yielded as they complete. Failed fetches are skipped.
+
+    Args:
+        pool (ThreadPoolExecutor): pool to fetch with
+        frontier (list): URLs of the articles
+        fetch (callable): gets the links of an article
+        kind (str): "links" or "backlinks", what `fetch` gets
+        cache (LinkCache or None): cache to consult and update
+        stats (SearchStats): counts fetches, cache hits and errors
+    Yields:
+        url, links (tuple): an article and its links
+    """
+
+    missing = []
+    for url in frontier:
+        links = None if cache is None else cache.get(url, kind)
+        if links is None:
+            missing.append(url)
+        else:
+            stats.cache_hits += 1
+            yield url, links
+
+    futures = {pool.submit(fetch, url): url for url in missing}
+
+    for future in as_completed(futures):
+        url = futures[future]
+
+        try:
+            links = future.result()
+        except Exception as e:
+            print(f"Failed to fetch links of {url}: {e}")
+            stats.pages_fetched += 1
+            stats.errors += 1
+            continue
+
+        stats.pages_fetched += 1
+
+        if cache is not None:
+            cache.put(url, links, kind, revision=getattr(links, "revision", None))
+        yield url, links
+
+
+@dataclass
+class SearchState:
+    """Data class holding the state of a bidirectional search.
+
+    Records the parent pointers of both searches, their frontiers, and,
+    while a level is being expanded, which side it is and the articles
+    reached so far on the next level. The frontier of the side being
+    expanded then only holds the articles not expanded yet.
+    """
+
+    forward: Dict[str, Optional[str]]
+    backward: Dict[str, Optional[str]]
+    forward_frontier: List[str]
+    backward_frontier: List[str]
+    expanding: Optional[str] = None
+    next_frontier: List[str] = field(default_factory=list)
+
+    def remaining(self, done: Set[str]) -> "SearchState":
+        """Gets the state with the articles in `done` taken out of the level being expanded."""
+
+        if self.expanding == "forward":
+            frontier = [url for url in self.forward_frontier if url not in done]
+            return replace(self, forward_frontier=frontier)
+        if self.expanding == "backward":
+            frontier = [url for url in self.backward_frontier if url not in done]
+            return replace(self, backward_frontier=frontier)
+
+        return self
+
+    def finish_level(self) -> None:
+        """Moves on to the next level of the side that was being expanded."""
+
+        if self.expanding == "forward":
+            self.forward_frontier = self.next_frontier
+        elif self.expanding == "backward":
+            self.backward_frontier = self.next_frontier
+        self.expanding = None
+        self.next_frontier = []
+
+
+def save_checkpoint(
+    path: str,
+    start: str,
+    finish: str,
+    state: SearchState,
+    stats: SearchStats,
+    mode: str = "bidirectional",
+) -> None:
+    """Saves the state of a search to a compressed NumPy .npz file.
+
+    Every URL is stored once, in a newline separated utf-8 array, and the
+    parent pointers and frontiers as arrays of indexes into it.
+    The file is replaced atomically, so a crash while saving keeps the
+    previous checkpoint.
+
+    Args:
+        path (str): file to write
+        start, finish (str): the articles searched between
+        state (SearchState): the state to save
+        stats (SearchStats): the pages fetched so far are saved as well
+        mode (str, optional): the search mode, see `find_path`
+    """
+
+    import numpy as np
+
+    urls = list(dict.fromkeys(itertools.chain(state.forward, state.backward)))
+    ids = {url: i for i, url in enumerate(urls)}
+    ids[None] = -1
+
+    def parents(pointers):
+        pairs = [(ids[node], ids[parent]) for node, parent in pointers.items()]
+        return np.array(pairs, dtype=np.int32).reshape(-1, 2)
+
+    def frontier(urls):
+        return np.array([ids[url] for url in urls], dtype=np.int32)
+
+    meta = {
+        "start": start,
+        "finish": finish,
+        "mode": mode,
+        "expanding": state.expanding,
+        "pages_fetched": stats.pages_fetched,
+    }
+    with open(path + ".tmp", "wb") as f:
+        np.savez_compressed(
+            f,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            urls=np.frombuffer("\n".join(urls).encode("utf-8"), dtype=np.uint8),
+            forward=parents(state.forward),
+            backward=parents(state.backward),
+            forward_frontier=frontier(state.forward_frontier),
+            backward_frontier=frontier(state.backward_frontier),
+            next_frontier=frontier(state.next_frontier),
+        )
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(
+    path: str, start: str, finish: str, stats: SearchStats, mode: str = "bidirectional"
+) -> SearchState:
+    """Loads the state of a search saved by `save_checkpoint`.
+
+    A checkpoint taken after the last page of a level is moved on to the
+    next level, so the search carries on from there.
+
+    Args:
+        path (str): file to read
+        start, finish (str): the articles searched between,
+            must be the same as in the checkpoint
+        stats (SearchStats): gets the pages fetched before the checkpoint
+        mode (str, optional): the search mode, must be the same as in the checkpoint
+    Returns:
+        state (SearchState): the saved state
+    """
+
+    import numpy as np
+
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        if (meta["start"], meta["finish"]) != (start, finish):
+            raise ValueError(
+                f"{path} is a checkpoint of a search from {meta['start']} to {meta['finish']}"
+            )
+        if meta.get("mode", mode) != mode:
+            raise ValueError(f"{path} is a checkpoint of a {meta['mode']} search, not {mode}")
+
+        urls = data["urls"].tobytes().decode("utf-8").split("\n")
+
+        def parents(name):
+            return {
+                urls[node]: urls[parent] if parent >= 0 else None
+                for node, parent in data[name].tolist()
+            }
+
+        def frontier(name):
+            return [urls[i] for i in data[name].tolist()]
+
+        stats.pages_fetched += meta["pages_fetched"]
+
+        state = SearchState(
+            forward=parents("forward"),
+            backward=parents("backward"),
+            forward_frontier=frontier("forward_frontier"),
+            backward_frontier=frontier("backward_frontier"),
+            expanding=meta["expanding"],
+            next_frontier=frontier("next_frontier"),
+        )
+
+    # every page of the level being expanded was done
+    expanded = {"forward": state.forward_frontier, "backward": state.backward_frontier}
+    if state.expanding is not None and not expanded[state.expanding]:
+        state.finish_level()
+
+    return state
+
+
+def find_path(
+    start: str,
+    finish: str,
+    get_links: Callable[[str], Iterable[str]] = get_links,
+    get_backlinks: Callable[[str], Iterable[str]] = get_backlinks,
+    mode: str = "bidirectional",
+    max_workers: int = 8,
+    stats: Optional[SearchStats] = None,
+    cache: Optional[LinkCache] = None,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: float = 60.0,
+) -> List[str]:
     """Find the shortest path from `start` to `finish`
 
+    Searches breadth first from both ends at once, following links forwards
+    from `start` and backwards from `finish`, always expanding the smaller
+    frontier. The pages of one level are fetched concurrently, and fetches
+    still waiting are cancelled as soon as the two searches meet.
+
     Arguments:
       start (str): wikipedia article URL to start from
       finish (str): wikipedia article URL to stop at
+      get_links (callable, optional): gets the articles an article links to
+      get_backlinks (callable, optional): gets the articles linking to an article,
+        e.g. the `get` of a local backlink index
+      mode (str, optional): how to search,
+        "bidirectional" searches breadth first from both ends,
+        "bfs" is a plain breadth first search from `start`,
+        "best_first" expands the most promising articles first, see `best_first_path`
+      max_workers (int, optional): how many pages to fetch at once
+      stats (SearchStats, optional): filled with pages fetched and time used
+      cache (LinkCache, optional): consulted before fetching any page,
+        and updated with the links of every fetched page
+      checkpoint (str, optional): file to save the search state to every
+        `checkpoint_every` seconds and when interrupted, see `save_checkpoint`.
+        If the file exists the search resumes from it, and it is removed
+        once the path is found. Not used in best_first mode.
+      checkpoint_every (float, optional): seconds between checkpoints
 
     Returns:
       urls (list[str]):
@@ -16,14 +454,365 @@ def find_path(start: str, finish: str) -> List[str]:
         All items of the list should be URLs for wikipedia articles.
         Each article should have a direct link to the next article in the list.
     """
-    path = ...
-    ...
+    if mode not in ("bidirectional", "bfs", "best_first"):
+        raise ValueError(f"Unknown search mode {mode!r}")
+
+    stats = SearchStats() if stats is None else stats
+    t0 = time.perf_counter()
+
+    if mode == "best_first":
+        path = best_first_path(
+            start, finish, get_links, get_backlinks, max_workers, stats, cache
+        )
+        stats.seconds = time.perf_counter() - t0
+        return path
+
+    state = None
+    if checkpoint is not None and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint, start, finish, stats, mode)
+        print(f"Resuming search from {checkpoint}")
+    if state is None:
+        state = SearchState(
+            forward={start: None},
+            backward={finish: None},
+            forward_frontier=[start],
+            backward_frontier=[finish],
+        )
+
+    meet = start if start == finish else None
+    last_saved = time.perf_counter()
+    done = set()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while meet is None and state.forward_frontier and state.backward_frontier:
+            if state.expanding is None:
+                forward_first = len(state.forward_frontier) <= len(state.backward_frontier)
+                state.expanding = "forward" if mode == "bfs" or forward_first else "backward"
+                state.next_frontier = []
+
+            if state.expanding == "forward":
+                frontier, fetch, kind = state.forward_frontier, get_links, "links"
+                parents, other = state.forward, state.backward
+            else:
+                frontier, fetch, kind = state.backward_frontier, get_backlinks, "backlinks"
+                parents, other = state.backward, state.forward
+
+            done = set()
+
+            for url, links in expand(pool, frontier, fetch, kind, cache, stats):
+                done.add(url)
+                for link in sorted(links):
+                    if link in parents:
+                        continue
+                    parents[link] = url
+                    if link in other:
+                        meet = link
+                        break
+                    state.next_frontier.append(link)
+
+                if meet is not None:
+                    break
+
+                due = time.perf_counter() - last_saved > checkpoint_every
+                if checkpoint is not None and due:
+                    save_checkpoint(checkpoint, start, finish, state.remaining(done), stats, mode)
+                    last_saved = time.perf_counter()
+
+            state.finish_level()
+    except BaseException:
+        # save where we got to if interrupted, so the search can be resumed
+        if checkpoint is not None and meet is None:
+            save_checkpoint(checkpoint, start, finish, state.remaining(done), stats, mode)
+        raise
+    finally:
+        # don't wait for fetches that are no longer needed
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    stats.seconds = time.perf_counter() - t0
+
+    if meet is None:
+        raise ValueError(f"No path found from {start} to {finish}")
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    path = []
+    node = meet
+    while node is not None:
+        path.append(node)
+        node = state.forward[node]
+    path.reverse()
+
+    node = state.backward[meet]
+    while node is not None:
+        path.append(node)
+        node = state.backward[node]
+
+    assert path[0] == start
+    assert path[-1] == finish
+    return path
+
+
+def title_tokens(text: str) -> Set[str]:
+    """Splits an article URL or title into lowercase words, without stop words.
+
+    Args:
+        text (str):
+            e.g. https://en.wikipedia.org/wiki/History_of_the_Peace_movement
+    Returns:
+        tokens (set):
+            e.g. {'history', 'peace', 'movement'}
+    """
+
+    title = unquote(text.rsplit("/wiki/", 1)[-1]).lower()
+
+    return set(re.findall(r"[^\W_]+", title)) - stop_words
+
+
+# words that say nothing about what an article is about
+stop_words = {"a", "an", "and", "at", "by", "for", "in", "list", "of", "on", "or", "the", "to"}
+
+
+def link_score(
+    link: str,
+    anchor: str,
+    target: Set[str],
+    cache: Optional[LinkCache],
+) -> float:
+    """Scores how promising a link is for reaching the target, lower is better.
+
+    Counts the words the title and anchor text of the link share with the
+    target title. Ties are broken by how many links the article has,
+    if it is known from the link cache, as well-linked articles are good hubs.
+
+    Args:
+        link (str): URL of the linked article
+        anchor (str): text of the link, may be empty
+        target (set): words of the target title
+        cache (LinkCache or None): cache to look up the number of links in
+    Returns:
+        score (float): the score of the link
+    """
+
+    overlap = len((title_tokens(link) | title_tokens(anchor)) & target)
+    degree = cache.degree(link) if cache is not None else 0
+
+    return -(10 * overlap + math.log1p(degree))
+
+
+def best_first_path(
+    start: str,
+    finish: str,
+    get_links: Callable[[str], Iterable[str]],
+    get_backlinks: Callable[[str], Iterable[str]],
+    max_workers: int,
+    stats: SearchStats,
+    cache: Optional[LinkCache] = None,
+) -> List[str]:
+    """Finds a path from `start` to `finish` fetching as few pages as possible.
+
+    First gets the articles linking to `finish`, so the search can stop as
+    soon as it reaches one of them. Then expands the articles with the best
+    `link_score` first, from a priority queue, fetching `max_workers` of them
+    at a time. The anchor text of the links is scored as well, if `get_links`
+    returns a dict of URL to anchor text, as the default one does. Links read
+    from the cache have no anchor text. The path found is short, but not
+    always the shortest.
+
+    Arguments are the same as for `find_path`.
+
+    Returns:
+      urls (list[str]): the path, as for `find_path`
+    """
+
+    target = title_tokens(finish)
+    parents = {start: None}
+    queue = []
+    order = itertools.count()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        near = set()
+        if start != finish:
+            for _, links in expand(pool, [finish], get_backlinks, "backlinks", cache, stats):
+                near = set(links)
+
+        meet = start if start == finish or start in near else None
+        heapq.heappush(queue, (0, next(order), start))
+
+        while meet is None and queue:
+            batch = [heapq.heappop(queue)[2] for _ in range(min(max_workers, len(queue)))]
+
+            for url, links in expand(pool, batch, get_links, "links", cache, stats):
+                anchors = links if isinstance(links, dict) else {}
+
+                for link in sorted(links):
+                    if link in parents:
+                        continue
+                    parents[link] = url
+                    if link == finish or link in near:
+                        meet = link
+                        break
+                    score = link_score(link, anchors.get(link, ""), target, cache)
+                    heapq.heappush(queue, (score, next(order), link))
+
+                if meet is not None:
+                    break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if meet is None:
+        raise ValueError(f"No path found from {start} to {finish}")
+
+    path = []
+    node = meet
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    path.reverse()
+
+    if path[-1] != finish:
+        path.append(finish)
+
     assert path[0] == start
     assert path[-1] == finish
     return path
 
 
+@dataclass
+class SearchTree:
+    """Data class holding the breadth first search tree from one start article.
+
+    Records the parent of every reached article, the articles of the
+    current and next level, and the finish articles not reached yet.
+    """
+
+    start: str
+    remaining: Set[str] = field(default_factory=set)
+    parents: Dict[str, Optional[str]] = field(default_factory=dict)
+    frontier: List[str] = field(default_factory=list)
+    next_frontier: List[str] = field(default_factory=list)
+
+    def visit(self, url: str, links: Iterable[str]) -> List[str]:
+        """Adds the links of an article on the current level to the tree.
+
+        Returns:
+            found (list): the finish articles reached through the links
+        """
+
+        found = []
+        for link in sorted(links):
+            if link in self.parents:
+                continue
+            self.parents[link] = url
+            self.next_frontier.append(link)
+            if link in self.remaining:
+                self.remaining.discard(link)
+                found.append(link)
+
+        return found
+
+    def path(self, finish: str) -> List[str]:
+        """Follows the parent pointers from a reached article back to the start."""
+
+        path = []
+        node = finish
+        while node is not None:
+            path.append(node)
+            node = self.parents[node]
+
+        return path[::-1]
+
+
+def find_paths(
+    pairs: Iterable[Tuple[str, str]],
+    get_links: Callable[[str], Iterable[str]] = get_links,
+    max_workers: int = 8,
+    stats: Optional[SearchStats] = None,
+    cache: Optional[LinkCache] = None,
+) -> Iterator[Tuple[str, str, Optional[List[str]]]]:
+    """Finds the shortest paths for a batch of start and finish articles.
+
+    Runs one breadth first search per distinct start article, and reuses it
+    for all finish articles of that start. The searches advance a level at a
+    time together: the articles wanted by any search are fetched once,
+    concurrently, and the links of every fetched article are kept for the
+    whole batch, so overlapping searches share their pages.
+    Paths are yielded as soon as they are found.
+
+    Arguments:
+      pairs (iterable): (start, finish) article URLs
+      get_links (callable, optional): gets the articles an article links to
+      max_workers (int, optional): how many pages to fetch at once
+      stats (SearchStats, optional): filled with pages fetched and time used
+      cache (LinkCache, optional): consulted before fetching any page
+
+    Yields:
+      start, finish, path (tuple):
+        the path is a list of URLs as for `find_path`,
+        or None if there is no path from start to finish
+    """
+    stats = SearchStats() if stats is None else stats
+    t0 = time.perf_counter()
+
+    trees = {}
+    for start, finish in pairs:
+        tree = trees.setdefault(start, SearchTree(start, parents={start: None}, frontier=[start]))
+        tree.remaining.add(finish)
+
+    # links of every article fetched in this batch
+    links_of = {}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for tree in trees.values():
+            if tree.start in tree.remaining:
+                tree.remaining.discard(tree.start)
+                yield tree.start, tree.start, [tree.start]
+
+        active = [tree for tree in trees.values() if tree.remaining]
+
+        while active:
+            # which searches want the links of each article on this level
+            wanted = {}
+            for tree in active:
+                for url in tree.frontier:
+                    wanted.setdefault(url, []).append(tree)
+
+            known = [(url, links_of[url]) for url in wanted if url in links_of]
+            missing = [url for url in wanted if url not in links_of]
+            fetched = expand(pool, missing, get_links, "links", cache, stats)
+
+            for url, links in itertools.chain(known, fetched):
+                links_of[url] = links
+
+                for tree in wanted[url]:
+                    if not tree.remaining:
+                        continue
+                    for finish in tree.visit(url, links):
+                        yield tree.start, finish, tree.path(finish)
+
+                if not any(tree.remaining for tree in active):
+                    break
+
+            for tree in active:
+                tree.frontier, tree.next_frontier = tree.next_frontier, []
+                if tree.remaining and not tree.frontier:
+                    for finish in sorted(tree.remaining):
+                        yield tree.start, finish, None
+                    tree.remaining.clear()
+
+            active = [tree for tree in active if tree.remaining]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        stats.seconds = time.perf_counter() - t0
+
+
 if __name__ == "__main__":
     start = "https://en.wikipedia.org/wiki/Python_(programming_language)"
     finish = "https://en.wikipedia.org/wiki/Peace"
-    find_path(start, finish)
+    stats = SearchStats()
+    path = find_path(start, finish, stats=stats)
+    print("\n".join(path))
+    print(f"Fetched {stats.pages_fetched} pages in {stats.seconds:.1f} s")